@@ -1,4 +1,5 @@
 import { NextResponse } from "next/server"
+import { alphaVantageFetch } from "@/lib/alpha-vantage"
 
 // Alpha Vantage Crypto API
 const ALPHA_VANTAGE_API_KEY = process.env.ALPHA_VANTAGE_API_KEY
@@ -35,12 +36,12 @@ export async function GET(request: Request) {
       }
 
       // Fetch from Alpha Vantage Crypto API
-      const response = await fetch(
+      const response = await alphaVantageFetch(
         `${ALPHA_VANTAGE_BASE_URL}?function=CURRENCY_EXCHANGE_RATE&from_currency=${symbol}&to_currency=USD&apikey=${ALPHA_VANTAGE_API_KEY}`,
         { next: { revalidate: 60 } },
       )
 
-      if (!response.ok) continue
+      if (!response || !response.ok) continue
 
       const data = await response.json()
 
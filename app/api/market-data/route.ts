@@ -1,4 +1,5 @@
 import { NextResponse } from "next/server"
+import { alphaVantageFetch } from "@/lib/alpha-vantage"
 
 // Configuration
 const FINNHUB_API_KEY = process.env.FINNHUB_API_KEY
@@ -58,11 +59,11 @@ async function fetchFinnhubQuote(symbol: string): Promise<QuoteData | null> {
 async function fetchAlphaVantageQuote(symbol: string): Promise<QuoteData | null> {
   if (!ALPHA_VANTAGE_API_KEY) return null
   try {
-    const response = await fetch(
+    const response = await alphaVantageFetch(
       `${ALPHA_VANTAGE_BASE_URL}?function=GLOBAL_QUOTE&symbol=${symbol}&apikey=${ALPHA_VANTAGE_API_KEY}`,
       { next: { revalidate: 60 } }
     )
-    if (!response.ok) return null
+    if (!response || !response.ok) return null
     const data = await response.json()
     
     // Check for limits
@@ -95,9 +96,10 @@ async function fetchAlphaVantageHistory(symbol: string) {
   console.log(`[Historical] Falling back to Alpha Vantage for ${symbol}...`)
   
   try {
-    const response = await fetch(
+    const response = await alphaVantageFetch(
       `${ALPHA_VANTAGE_BASE_URL}?function=TIME_SERIES_DAILY&symbol=${symbol}&apikey=${ALPHA_VANTAGE_API_KEY}`
     )
+    if (!response) return null
     const data = await response.json()
 
     if (data["Error Message"] || data["Note"]) {
@@ -1,4 +1,5 @@
 import { NextResponse } from "next/server"
+import { alphaVantageFetch } from "@/lib/alpha-vantage"
 
 const ALPHA_VANTAGE_API_KEY = process.env.ALPHA_VANTAGE_API_KEY
 const ALPHA_VANTAGE_BASE_URL = "https://www.alphavantage.co/query"
@@ -88,7 +89,11 @@ async function fetchAlphaVantageNews(tickers: string, topics: string, limit: num
     url.searchParams.set("limit", String(Math.min(limit + 5, 50)))
     url.searchParams.set("apikey", ALPHA_VANTAGE_API_KEY)
 
-    const response = await fetch(url.toString(), { next: { revalidate: 300 } })
+    const response = await alphaVantageFetch(url.toString(), { next: { revalidate: 300 } })
+
+    if (!response) {
+      throw new Error("Alpha Vantage quota exhausted")
+    }
 
     if (!response.ok) {
       throw new Error(`Alpha Vantage API error: ${response.status}`)
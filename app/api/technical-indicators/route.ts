@@ -1,4 +1,5 @@
 import { NextResponse } from "next/server"
+import { alphaVantageFetch } from "@/lib/alpha-vantage"
 
 const ALPHA_VANTAGE_API_KEY = process.env.ALPHA_VANTAGE_API_KEY
 const ALPHA_VANTAGE_BASE_URL = "https://www.alphavantage.co/query"
@@ -104,7 +105,11 @@ async function fetchIndicator(symbol: string, indicator: string, params: Record<
       url.searchParams.set(key, String(value))
     })
 
-    const response = await fetch(url.toString(), { next: { revalidate: 300 } })
+    const response = await alphaVantageFetch(url.toString(), { next: { revalidate: 300 } })
+
+    if (!response) {
+      throw new Error("Alpha Vantage quota exhausted")
+    }
 
     if (!response.ok) {
       throw new Error(`Alpha Vantage error: ${response.status}`)
@@ -0,0 +1,55 @@
+// Alpha Vantage calls from the API routes, under the quota the Python services share.
+// Each call first takes a permit from the market data service, which hands them out
+// from the same Redis bucket its own calls use, then reports whether it was throttled.
+// Without QUOTA_SERVICE_URL (running the frontend on its own) calls go straight out.
+
+const QUOTA_SERVICE_URL = process.env.QUOTA_SERVICE_URL
+const PERMIT_TIMEOUT_SECONDS = 5
+
+async function acquirePermit(): Promise<boolean> {
+  if (!QUOTA_SERVICE_URL) return true
+  try {
+    const response = await fetch(
+      `${QUOTA_SERVICE_URL}/api/v1/upstream/alpha-vantage/permit?timeout=${PERMIT_TIMEOUT_SECONDS}`,
+      { method: "POST", cache: "no-store" },
+    )
+    if (response.status === 429) {
+      console.warn("[Alpha Vantage] Shared quota exhausted, skipping call")
+      return false
+    }
+    return true
+  } catch (error) {
+    // Quota service unreachable: don't take the routes down with it
+    console.warn("[Alpha Vantage] Quota service unavailable, calling without a permit")
+    return true
+  }
+}
+
+async function reportResult(throttled: boolean) {
+  if (!QUOTA_SERVICE_URL) return
+  try {
+    await fetch(`${QUOTA_SERVICE_URL}/api/v1/upstream/alpha-vantage/result?throttled=${throttled}`, {
+      method: "POST",
+      cache: "no-store",
+    })
+  } catch (error) {
+    // Feedback only; the permit was already counted
+  }
+}
+
+// Fetch an Alpha Vantage URL once a permit is granted; null when the shared quota is used up
+export async function alphaVantageFetch(url: string, init?: RequestInit & { next?: { revalidate?: number } }) {
+  if (!(await acquirePermit())) return null
+  const response = await fetch(url, init)
+  let throttled = response.status === 429
+  if (response.ok) {
+    try {
+      const data = await response.clone().json()
+      throttled = Boolean(data && (data["Note"] || data["Information"]))
+    } catch (error) {
+      // Not JSON; leave it to the caller
+    }
+  }
+  void reportResult(throttled)
+  return response
+}
@@ -189,6 +189,17 @@ SELECT
 FROM market_data
 GROUP BY symbol, bucket;
 
+-- Serve buckets not materialized yet from raw rows (real-time aggregation,
+-- off by default since TimescaleDB 2.13), and materialize settled buckets in
+-- the background. start_offset stays inside the raw retention window, so a
+-- refresh never recomputes buckets whose raw rows were already dropped.
+ALTER MATERIALIZED VIEW market_data_hourly SET (timescaledb.materialized_only = false);
+SELECT add_continuous_aggregate_policy('market_data_hourly',
+    start_offset => INTERVAL '3 days',
+    end_offset => INTERVAL '1 hour',
+    schedule_interval => INTERVAL '30 minutes',
+    if_not_exists => TRUE);
+
 -- Retention policy: keep raw data for 30 days, aggregates forever
 SELECT add_retention_policy('market_data', INTERVAL '30 days', if_not_exists => TRUE);
 SELECT add_retention_policy('service_health', INTERVAL '7 days', if_not_exists => TRUE);
@@ -0,0 +1,177 @@
+"""
+Bulk Sentiment Scoring
+Streaming request parsing and chunked, bounded-concurrency scoring for bulk jobs.
+
+Input is NDJSON or a JSON array of texts (strings or {"id", "text"} objects), parsed
+incrementally as the request body arrives. Items are grouped into chunks, scored
+with at most `max_in_flight` chunks outstanding, and emitted as NDJSON in input
+order, so memory stays bounded on both sides regardless of payload size. A
+malformed NDJSON line gets its own error record and the stream carries on; in
+an array there is no way to resynchronize, so the stream ends with an error.
+"""
+
+import asyncio
+import codecs
+import json
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from fastapi.responses import StreamingResponse
+
+Score = Tuple[float, str, float]
+ChunkScorer = Callable[[List[str]], Awaitable[List[Score]]]
+
+_WHITESPACE = " \t\r\n"
+
+class InvalidItem:
+    """Placeholder the parser yields for an input line that is not valid JSON"""
+    __slots__ = ("error",)
+
+    def __init__(self, error: str):
+        self.error = error
+
+class BulkItemParser:
+    """Incremental parser for NDJSON or a top-level JSON array"""
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._buffer = ""
+        self._mode: Optional[str] = None  # "array" or "ndjson"
+        self._closed = False
+
+    def feed(self, data: bytes, final: bool = False) -> Iterator[Any]:
+        self._buffer += self._decoder.decode(data, final=final)
+        if self._mode is None:
+            stripped = self._buffer.lstrip(_WHITESPACE)
+            if not stripped:
+                return
+            if stripped[0] == "[":
+                self._mode = "array"
+                self._buffer = stripped[1:]
+            else:
+                self._mode = "ndjson"
+        if self._mode == "array":
+            yield from self._drain_array(final)
+        else:
+            yield from self._drain_ndjson(final)
+
+    def _drain_ndjson(self, final: bool) -> Iterator[Any]:
+        lines = self._buffer.split("\n")
+        self._buffer = "" if final else lines.pop()
+        for line in lines:
+            line = line.strip()
+            if line:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield InvalidItem(f"invalid JSON: {e}")
+
+    def _drain_array(self, final: bool) -> Iterator[Any]:
+        pos = 0
+        buffer = self._buffer
+        while not self._closed:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE + ",":
+                pos += 1
+            if pos >= len(buffer):
+                break
+            if buffer[pos] == "]":
+                self._closed = True
+                pos += 1
+                break
+            try:
+                item, end = self._json.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if final:
+                    raise ValueError("Truncated JSON array")
+                break  # Element not complete yet, wait for more bytes
+            if end == len(buffer) and not final and buffer[pos] not in '"[{':
+                break  # A number may continue in the next chunk (12|3); wait for its delimiter
+            yield item
+            pos = end
+        self._buffer = buffer[pos:]
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose body is produced while the request body is still being read.
+    The stock response listens for disconnects on receive(), which would swallow the
+    request body chunks; here the body iterator is the only consumer of receive().
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+Item = Tuple[Any, Optional[str], Optional[str]]
+
+def normalize_item(item: Any, index: int) -> Item:
+    """(id, text, error) for a bulk item; id defaults to the item's position"""
+    if isinstance(item, str):
+        return index, item, None
+    if isinstance(item, dict):
+        text = item.get("text", item.get("headline"))
+        if isinstance(text, str):
+            return item.get("id", index), text, None
+        return item.get("id", index), None, "expected a string or an object with 'text'"
+    if isinstance(item, InvalidItem):
+        return index, None, item.error
+    return index, None, "expected a string or an object with 'text'"
+
+async def stream_bulk_scores(
+    body: AsyncIterator[bytes],
+    score_chunk: ChunkScorer,
+    chunk_size: int = 500,
+    max_in_flight: int = 4
+) -> AsyncIterator[bytes]:
+    """Parse `body`, score it chunk by chunk and yield NDJSON result lines in input order"""
+    parser = BulkItemParser()
+    pending: Deque[Tuple[List[Tuple[int, Item]], "asyncio.Task"]] = deque()
+    chunk: List[Tuple[int, Item]] = []
+    index = 0
+
+    def submit():
+        nonlocal chunk
+        texts = [text for _, (_, text, _) in chunk if text is not None]
+        pending.append((chunk, asyncio.ensure_future(score_chunk(texts))))
+        chunk = []
+
+    async def emit_oldest() -> bytes:
+        items, task = pending.popleft()
+        scores = iter(await task)
+        lines = []
+        for position, (item_id, text, error) in items:
+            if text is None:
+                record: Dict[str, Any] = {"id": item_id, "index": position, "error": error}
+            else:
+                score, label, confidence = next(scores)
+                record = {"id": item_id, "score": score, "label": label, "confidence": confidence}
+            lines.append(json.dumps(record))
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+    try:
+        async for data in body:
+            for item in parser.feed(data):
+                chunk.append((index, normalize_item(item, index)))
+                index += 1
+                if len(chunk) >= chunk_size:
+                    submit()
+                # Backpressure: stop reading input until the oldest chunk is written out
+                while len(pending) >= max_in_flight:
+                    yield await emit_oldest()
+        for item in parser.feed(b"", final=True):
+            chunk.append((index, normalize_item(item, index)))
+            index += 1
+        if chunk:
+            submit()
+        while pending:
+            yield await emit_oldest()
+    except ValueError as e:
+        if chunk:
+            submit()
+        while pending:
+            yield await emit_oldest()
+        yield (json.dumps({"error": f"Invalid input after {index} items: {e}"}) + "\n").encode("utf-8")
+    finally:
+        for _, task in pending:
+            task.cancel()
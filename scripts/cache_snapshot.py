@@ -0,0 +1,141 @@
+"""
+Cache Snapshots
+Warm-start persistence for in-memory caches across restarts and deploys.
+
+Each service registers its caches as named sections. A section has a dump
+function that returns entries ({"key", "value", "expires_at"} with JSON-ready
+key and value) and a load function that puts entries back. The snapshotter
+writes every section to one gzip-compressed JSON file: periodically, and
+again during lifespan shutdown. The file is written to a temp file and
+renamed, so a crash mid-write never leaves a torn snapshot. On startup, before
+the service accepts traffic, restore() loads only entries that are still
+valid. A rollout then serves from cache instead of refetching everything from
+rate-limited upstreams.
+"""
+
+import asyncio
+import gzip
+import json
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+SNAPSHOT_VERSION = 1
+
+Entry = Dict[str, Any]
+
+class CacheSnapshotter:
+    def __init__(self, path: str, interval_seconds: float = 60.0, min_remaining_seconds: float = 1.0):
+        self.path = path
+        self.interval_seconds = interval_seconds
+        self.min_remaining_seconds = min_remaining_seconds
+        self._sections: Dict[str, Tuple[Callable[[], List[Entry]], Callable[[List[Entry]], int]]] = {}
+        self.stats = {"snapshots": 0, "failures": 0, "last_snapshot": None, "last_entries": 0, "restored": {}}
+
+    def register(self, name: str, dump: Callable[[], List[Entry]], load: Callable[[List[Entry]], int]):
+        self._sections[name] = (dump, load)
+
+    def _collect(self, now: float) -> Dict:
+        sections = {}
+        for name, (dump, _) in self._sections.items():
+            sections[name] = [e for e in dump() if e["expires_at"] > now]
+        return {"version": SNAPSHOT_VERSION, "written_at": now, "sections": sections}
+
+    def _write(self, payload: Dict):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+            json.dump(payload, f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+    async def save(self) -> int:
+        """Snapshot all sections; returns the number of entries written"""
+        now = time.time()
+        try:
+            # Collect on the loop so the caches are read consistently, compress and write off it
+            payload = self._collect(now)
+            await asyncio.get_running_loop().run_in_executor(None, self._write, payload)
+        except Exception as e:
+            self.stats["failures"] += 1
+            print(f"[Snapshot] Could not write {self.path}: {e}")
+            return 0
+        count = sum(len(entries) for entries in payload["sections"].values())
+        self.stats["snapshots"] += 1
+        self.stats["last_snapshot"] = now
+        self.stats["last_entries"] = count
+        return count
+
+    def restore(self, now: Optional[float] = None) -> Dict[str, int]:
+        """Load still-valid entries from the last snapshot; returns restored counts per section"""
+        now = time.time() if now is None else now
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                payload = json.load(f)
+        except Exception as e:
+            print(f"[Snapshot] Could not read {self.path}: {e}")
+            return {}
+        if payload.get("version") != SNAPSHOT_VERSION:
+            print(f"[Snapshot] Ignoring {self.path}: version {payload.get('version')}")
+            return {}
+        restored = {}
+        for name, entries in payload.get("sections", {}).items():
+            if name not in self._sections:
+                continue
+            valid = [e for e in entries if e["expires_at"] - now >= self.min_remaining_seconds]
+            try:
+                restored[name] = self._sections[name][1](valid)
+            except Exception as e:
+                print(f"[Snapshot] Could not restore section {name}: {e}")
+                restored[name] = 0
+        self.stats["restored"] = restored
+        age = now - payload.get("written_at", now)
+        print(f"[Snapshot] Restored {restored} from {self.path} ({age:.0f}s old)")
+        return restored
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            await self.save()
+
+    def metrics(self) -> Dict:
+        return {"path": self.path, "interval_seconds": self.interval_seconds, **self.stats}
+
+def _epoch(dt: datetime) -> float:
+    return dt.replace(tzinfo=timezone.utc).timestamp()
+
+def timestamped_model_section(
+    cache: Dict[Hashable, Tuple[BaseModel, datetime]],
+    model: Type[BaseModel],
+    ttl_seconds: float
+) -> Tuple[Callable[[], List[Entry]], Callable[[List[Entry]], int]]:
+    """
+    dump/load for the services' `key -> (pydantic model, naive UTC fetch time)` caches.
+    Restored entries keep their original fetch time, so they expire on schedule.
+    """
+    def dump() -> List[Entry]:
+        return [
+            {
+                "key": key,
+                "value": value.model_dump(mode="json"),
+                "fetched_at": _epoch(fetched),
+                "expires_at": _epoch(fetched) + ttl_seconds
+            }
+            for key, (value, fetched) in list(cache.items())
+        ]
+
+    def load(entries: List[Entry]) -> int:
+        for entry in entries:
+            fetched = datetime.utcfromtimestamp(entry["fetched_at"])
+            current = cache.get(entry["key"])
+            if current is None or current[1] < fetched:
+                cache[entry["key"]] = (model.model_validate(entry["value"]), fetched)
+        return len(entries)
+
+    return dump, load
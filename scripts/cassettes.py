@@ -0,0 +1,251 @@
+"""
+Upstream Cassettes
+Record/replay transport for the shared upstream HTTP client.
+
+UPSTREAM_MODE=record passes requests through to the live APIs and appends each
+request/response pair, with its measured latency, to a gzip-compressed JSONL
+cassette. UPSTREAM_MODE=replay serves those responses without network access,
+so the services can be load-tested and profiled offline at any request rate.
+
+Requests are matched on method, host, path and sorted query parameters; API keys
+and tokens are never written or matched. A key recorded several times replays
+its responses in turn. When nothing matches exactly, the parameters named in
+REPLAY_WILDCARD_PARAMS are ignored, so a cassette recorded for a few symbols can
+answer any symbol. Replay latency is either sampled from what was recorded for
+the endpoint, fixed, log-normal, or zero.
+"""
+
+import asyncio
+import base64
+import glob
+import gzip
+import itertools
+import json
+import math
+import os
+import random
+import socket
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+UPSTREAM_MODE = os.getenv("UPSTREAM_MODE", "live").lower()  # live | record | replay
+CASSETTE_DIR = os.getenv("CASSETTE_DIR", "cassettes")
+CASSETTE_FLUSH_EVERY = int(os.getenv("CASSETTE_FLUSH_EVERY", "25"))
+REPLAY_LATENCY = os.getenv("REPLAY_LATENCY", "recorded")  # recorded | none | fixed:<ms> | lognormal:<median_ms>:<sigma>
+REPLAY_LATENCY_SCALE = float(os.getenv("REPLAY_LATENCY_SCALE", "1.0"))
+REPLAY_ON_MISS = os.getenv("REPLAY_ON_MISS", "error")  # error | live
+REPLAY_WILDCARD_PARAMS = {
+    p.strip() for p in os.getenv("REPLAY_WILDCARD_PARAMS", "symbol,tickers,topics,time_from").split(",") if p.strip()
+}
+REPLAY_SEED = os.getenv("REPLAY_SEED")
+
+# Never recorded and never part of a match key
+SECRET_PARAMS = {"apikey", "token", "api_key"}
+
+# Headers that describe the original encoding of the body, which is stored decoded
+_DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+MatchKey = Tuple[str, str, Tuple[Tuple[str, str], ...]]
+
+def _params(request: httpx.Request) -> List[Tuple[str, str]]:
+    return sorted((k, v) for k, v in request.url.params.multi_items() if k.lower() not in SECRET_PARAMS)
+
+def match_key(method: str, endpoint: str, params, wildcard: bool = False) -> MatchKey:
+    if wildcard:
+        params = [(k, v) for k, v in params if k not in REPLAY_WILDCARD_PARAMS]
+    return method.upper(), endpoint, tuple(tuple(p) for p in params)
+
+def _endpoint(request: httpx.Request) -> str:
+    return f"{request.url.host}{request.url.path}"
+
+def _encode_body(content: bytes) -> Dict:
+    try:
+        return {"body": content.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"body_b64": base64.b64encode(content).decode("ascii")}
+
+def _decode_body(entry: Dict) -> bytes:
+    if "body_b64" in entry:
+        return base64.b64decode(entry["body_b64"])
+    return entry.get("body", "").encode("utf-8")
+
+def parse_latency(spec: str):
+    """Returns a sampler(rng, recorded_ms_list) -> seconds for a REPLAY_LATENCY spec"""
+    kind, _, args = spec.partition(":")
+    if kind == "none":
+        return lambda rng, recorded: 0.0
+    if kind == "fixed":
+        ms = float(args or 0)
+        return lambda rng, recorded: ms / 1000.0
+    if kind == "lognormal":
+        median, _, sigma = args.partition(":")
+        mu, sigma = math.log(float(median)), float(sigma or 0.5)
+        return lambda rng, recorded: rng.lognormvariate(mu, sigma) / 1000.0
+    if kind == "recorded":
+        return lambda rng, recorded: rng.choice(recorded) / 1000.0 if recorded else 0.0
+    raise ValueError(f"Unknown REPLAY_LATENCY spec: {spec}")
+
+def load_cassettes(directory: str) -> List[Dict]:
+    entries = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.jsonl.gz"))):
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entries.append(json.loads(line))
+        except (OSError, EOFError, json.JSONDecodeError) as e:
+            # A cassette cut short by a crash still yields the members written before it
+            print(f"[Cassettes] Stopped reading {path}: {e}")
+    return entries
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Live transport that appends every exchange to a cassette file"""
+
+    def __init__(self, directory: str = CASSETTE_DIR, flush_every: int = CASSETTE_FLUSH_EVERY, **transport_kwargs):
+        self.inner = httpx.AsyncHTTPTransport(**transport_kwargs)
+        os.makedirs(directory, exist_ok=True)
+        # One file per process, so several services can record into the same directory
+        self.path = os.path.join(directory, f"upstream-{socket.gethostname()}-{os.getpid()}-{int(time.time())}.jsonl.gz")
+        self.flush_every = flush_every
+        self._buffer: List[str] = []
+        self.stats = {"recorded": 0, "flushes": 0}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        response = await self.inner.handle_async_request(request)
+        content = await response.aread()
+        latency_ms = (time.perf_counter() - started) * 1000
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in _DROPPED_HEADERS}
+        entry = {
+            "method": request.method,
+            "endpoint": _endpoint(request),
+            "params": _params(request),
+            "status": response.status_code,
+            "headers": headers,
+            "latency_ms": round(latency_ms, 2),
+            "recorded_at": time.time(),
+            **_encode_body(content)
+        }
+        self._buffer.append(json.dumps(entry, separators=(",", ":")))
+        self.stats["recorded"] += 1
+        if len(self._buffer) >= self.flush_every:
+            self.flush()
+        return response
+
+    def flush(self):
+        """Append buffered entries as one gzip member"""
+        if not self._buffer:
+            return
+        with gzip.open(self.path, "at", encoding="utf-8") as f:
+            f.write("\n".join(self._buffer) + "\n")
+        self._buffer.clear()
+        self.stats["flushes"] += 1
+
+    async def aclose(self):
+        self.flush()
+        await self.inner.aclose()
+
+    def metrics(self) -> Dict:
+        return {"mode": "record", "path": self.path, "buffered": len(self._buffer), **self.stats}
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """Serves recorded responses, with simulated latency, instead of calling upstream"""
+
+    def __init__(
+        self,
+        entries: List[Dict],
+        latency: str = REPLAY_LATENCY,
+        latency_scale: float = REPLAY_LATENCY_SCALE,
+        on_miss: str = REPLAY_ON_MISS,
+        seed: Optional[int] = None,
+        **transport_kwargs
+    ):
+        self._exact: Dict[MatchKey, List[Dict]] = defaultdict(list)
+        self._loose: Dict[MatchKey, List[Dict]] = defaultdict(list)
+        self._latencies: Dict[str, List[float]] = defaultdict(list)
+        for entry in entries:
+            self._exact[match_key(entry["method"], entry["endpoint"], entry["params"])].append(entry)
+            self._loose[match_key(entry["method"], entry["endpoint"], entry["params"], wildcard=True)].append(entry)
+            self._latencies[entry["endpoint"]].append(entry.get("latency_ms", 0.0))
+        self._cursors: Dict[MatchKey, itertools.count] = defaultdict(itertools.count)
+        self.sample_latency = parse_latency(latency)
+        self.latency_spec = latency
+        self.latency_scale = latency_scale
+        self.on_miss = on_miss
+        self.rng = random.Random(seed)
+        self.live = httpx.AsyncHTTPTransport(**transport_kwargs) if on_miss == "live" else None
+        self.stats = {"entries": len(entries), "hits": 0, "wildcard_hits": 0, "misses": 0}
+
+    def _lookup(self, request: httpx.Request) -> Optional[Dict]:
+        params = _params(request)
+        endpoint = _endpoint(request)
+        for table, wildcard, stat in ((self._exact, False, "hits"), (self._loose, True, "wildcard_hits")):
+            key = match_key(request.method, endpoint, params, wildcard=wildcard)
+            candidates = table.get(key)
+            if candidates:
+                self.stats[stat] += 1
+                return candidates[next(self._cursors[(stat,) + key]) % len(candidates)]
+        return None
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        entry = self._lookup(request)
+        if entry is None:
+            self.stats["misses"] += 1
+            if self.live is not None:
+                return await self.live.handle_async_request(request)
+            return httpx.Response(
+                404,
+                json={"error": "No cassette entry for request", "endpoint": _endpoint(request)},
+                headers={"X-Cassette": "miss"},
+                request=request
+            )
+        delay = self.sample_latency(self.rng, self._latencies[entry["endpoint"]]) * self.latency_scale
+        if delay > 0:
+            await asyncio.sleep(delay)
+        headers = dict(entry.get("headers", {}))
+        headers["X-Cassette"] = "hit"
+        return httpx.Response(entry["status"], headers=headers, content=_decode_body(entry), request=request)
+
+    async def aclose(self):
+        if self.live is not None:
+            await self.live.aclose()
+
+    def metrics(self) -> Dict:
+        return {
+            "mode": "replay",
+            "latency": self.latency_spec,
+            "latency_scale": self.latency_scale,
+            "endpoints": len(self._latencies),
+            **self.stats
+        }
+
+def transport_from_env(**transport_kwargs) -> Optional[httpx.AsyncBaseTransport]:
+    """Transport for UPSTREAM_MODE, or None for the default live transport"""
+    if UPSTREAM_MODE == "record":
+        print(f"[Cassettes] Recording upstream traffic to {CASSETTE_DIR}")
+        return RecordingTransport(**transport_kwargs)
+    if UPSTREAM_MODE == "replay":
+        entries = load_cassettes(CASSETTE_DIR)
+        print(f"[Cassettes] Replaying {len(entries)} recorded responses from {CASSETTE_DIR} (latency {REPLAY_LATENCY})")
+        return ReplayTransport(entries, seed=int(REPLAY_SEED) if REPLAY_SEED else None, **transport_kwargs)
+    return None
+
+def summarize(entries: List[Dict]) -> Dict[str, Dict]:
+    """Per-endpoint entry counts and recorded latency percentiles"""
+    by_endpoint: Dict[str, List[float]] = defaultdict(list)
+    for entry in entries:
+        by_endpoint[entry["endpoint"]].append(entry.get("latency_ms", 0.0))
+    summary = {}
+    for endpoint, latencies in sorted(by_endpoint.items()):
+        latencies.sort()
+        pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+        summary[endpoint] = {"entries": len(latencies), "p50_ms": pick(0.5), "p95_ms": pick(0.95), "max_ms": latencies[-1]}
+    return summary
+
+if __name__ == "__main__":
+    import sys
+    directory = sys.argv[1] if len(sys.argv) > 1 else CASSETTE_DIR
+    print(json.dumps(summarize(load_cassettes(directory)), indent=2))
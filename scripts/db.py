@@ -0,0 +1,41 @@
+"""
+Database Access
+Lazily created asyncpg connection pool shared by a service's endpoints.
+
+The pool is created on first use from DATABASE_URL and closed from the service
+lifespan. When DATABASE_URL is unset (local runs without TimescaleDB) get_pool()
+returns None and callers fall back or report the store as unavailable.
+"""
+
+import asyncio
+import os
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+DATABASE_POOL_MIN_SIZE = int(os.getenv("DATABASE_POOL_MIN_SIZE", "1"))
+DATABASE_POOL_MAX_SIZE = int(os.getenv("DATABASE_POOL_MAX_SIZE", "10"))
+
+_pool = None
+_pool_lock = asyncio.Lock()
+
+async def get_pool():
+    global _pool
+    if _pool is not None or not DATABASE_URL:
+        return _pool
+    async with _pool_lock:
+        if _pool is None:
+            import asyncpg
+            try:
+                _pool = await asyncpg.create_pool(
+                    DATABASE_URL, min_size=DATABASE_POOL_MIN_SIZE, max_size=DATABASE_POOL_MAX_SIZE
+                )
+                print(f"[DB] Connection pool ready ({DATABASE_POOL_MIN_SIZE}-{DATABASE_POOL_MAX_SIZE})")
+            except (OSError, asyncpg.PostgresError) as e:
+                print(f"[DB] Connection failed: {e}")
+                return None
+    return _pool
+
+async def close_pool():
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
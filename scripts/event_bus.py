@@ -0,0 +1,453 @@
+"""
+Event Bus
+Topic transport behind the services' publishers: an in-process asyncio bus or Kafka.
+
+EVENT_TRANSPORT selects the implementation ("memory" or "kafka"). Both have
+the same publish/subscribe interface, so switching between a single-node
+deployment and a broker is a configuration change. Topics and their partition
+counts come from kafka_producer.TOPICS.
+
+The memory transport partitions each topic. A keyed message goes to partition
+crc32(key) % partitions, so messages with the same key stay in order; unkeyed
+messages are spread round robin. Every consumer group on a topic has its own
+bounded queue per partition. One worker task drains each queue, so a group
+sees each message once, in key order. A group with several members splits the
+partitions between them. When a queue is full, the topic's overflow policy
+applies:
+
+- "block": publish() waits for space, up to EVENT_BUS_BLOCK_TIMEOUT, then
+  raises BusFull. This is backpressure on the producer.
+- "drop_newest": the new message is discarded.
+- "drop_oldest": the oldest queued message is evicted.
+
+Every drop is counted. There is no retention: messages published while no
+group is subscribed are discarded. Values reach handlers as the same objects,
+without serialization, so handlers must treat them as read-only.
+
+The kafka transport sends JSON through aiokafka and runs one AIOKafkaConsumer
+per subscription. The broker provides retention, ordering and backpressure.
+A broker that is not reachable yet does not fail startup: the producer and
+each consumer keep reconnecting in the background, backing off from
+KAFKA_RETRY_INITIAL_SECONDS to KAFKA_RETRY_MAX_SECONDS. Publishes made while
+the producer is down are counted as failed.
+"""
+
+import asyncio
+import json
+import os
+import time
+import zlib
+from collections import deque
+from itertools import count
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from kafka_producer import TOPICS
+from tracing import extract_context, kafka_headers, span
+
+EVENT_TRANSPORT = os.getenv("EVENT_TRANSPORT", "memory").lower()
+EVENT_BUS_QUEUE_SIZE = int(os.getenv("EVENT_BUS_QUEUE_SIZE", "10000"))
+EVENT_BUS_POLICY = os.getenv("EVENT_BUS_POLICY", "")  # when set, overrides every topic's overflow policy
+EVENT_BUS_BLOCK_TIMEOUT = float(os.getenv("EVENT_BUS_BLOCK_TIMEOUT", "5.0"))
+KAFKA_BOOTSTRAP_SERVERS = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "localhost:9092")
+KAFKA_RETRY_INITIAL_SECONDS = float(os.getenv("KAFKA_RETRY_INITIAL_SECONDS", "1.0"))
+KAFKA_RETRY_MAX_SECONDS = float(os.getenv("KAFKA_RETRY_MAX_SECONDS", "30.0"))
+
+POLICIES = ("block", "drop_newest", "drop_oldest")
+DEFAULT_PARTITIONS = 3
+
+Headers = List[Tuple[str, bytes]]
+
+class BusFull(Exception):
+    """A blocking publish found no queue space within the timeout"""
+
+class Message:
+    __slots__ = ("topic", "partition", "offset", "key", "value", "headers", "timestamp")
+
+    def __init__(self, topic: str, partition: int, offset: int, key: Optional[str], value: Any, headers: Headers, timestamp: float):
+        self.topic = topic
+        self.partition = partition
+        self.offset = offset
+        self.key = key
+        self.value = value
+        self.headers = headers
+        self.timestamp = timestamp
+
+Handler = Callable[[Message], Awaitable[None]]
+
+async def _handle(transport: str, group: str, handler: Handler, message: Message) -> bool:
+    """Run a handler under a consumer span continuing the producer's trace; False on error"""
+    try:
+        with span(
+            "bus.consume", kind="consumer", context=extract_context(message.headers),
+            **{"messaging.system": transport, "messaging.destination": message.topic,
+               "messaging.consumer_group": group, "messaging.partition": message.partition}
+        ):
+            await handler(message)
+        return True
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"[EventBus] {group} failed on {message.topic}[{message.partition}]@{message.offset}: {e}")
+        return False
+
+class _Queue:
+    __slots__ = ("items", "data", "space")
+
+    def __init__(self):
+        self.items: Deque[Message] = deque()
+        self.data = asyncio.Event()
+        self.space = asyncio.Event()
+        self.space.set()
+
+class _Group:
+    def __init__(self, name: str, partitions: int):
+        self.name = name
+        self.queues = [_Queue() for _ in range(partitions)]
+        self.handlers: List[Handler] = []
+        self.tasks: List[asyncio.Task] = []
+        self.stats = {"delivered": 0, "errors": 0, "dropped": 0}
+
+    def metrics(self) -> Dict:
+        depths = [len(q.items) for q in self.queues]
+        return {**self.stats, "members": len(self.handlers), "lag": sum(depths), "max_partition_lag": max(depths)}
+
+class _Topic:
+    def __init__(self, name: str, partitions: int, policy: str):
+        self.name = name
+        self.partitions = partitions
+        self.policy = policy
+        self.offsets = [0] * partitions
+        self.groups: Dict[str, _Group] = {}
+        self._round_robin = count()
+        self.stats = {"published": 0, "unrouted": 0, "dropped": 0, "blocked": 0, "full_errors": 0}
+
+    def partition_for(self, key: Optional[str]) -> int:
+        if key is None:
+            return next(self._round_robin) % self.partitions
+        return zlib.crc32(key.encode("utf-8")) % self.partitions
+
+class MemoryBus:
+    name = "memory"
+
+    def __init__(self, max_queue: int = 10000, block_timeout: float = 5.0, policy_override: str = ""):
+        if policy_override and policy_override not in POLICIES:
+            raise ValueError(f"Unknown overflow policy '{policy_override}' (choose from {', '.join(POLICIES)})")
+        self.max_queue = max_queue
+        self.block_timeout = block_timeout
+        self.policy_override = policy_override
+        self._topics: Dict[str, _Topic] = {}
+        self._refs = 0
+        self._stopping = False
+
+    @property
+    def running(self) -> bool:
+        return self._refs > 0
+
+    def topic(self, name: str) -> _Topic:
+        topic = self._topics.get(name)
+        if topic is None:
+            config = TOPICS.get(name, {})
+            policy = self.policy_override or config.get("overflow", "block")
+            topic = self._topics[name] = _Topic(name, config.get("partitions", DEFAULT_PARTITIONS), policy)
+        return topic
+
+    async def publish(self, topic: str, value: Any, key: Optional[str] = None, headers: Optional[Headers] = None) -> Message:
+        t = self.topic(topic)
+        with span("bus.publish", kind="producer", **{"messaging.system": self.name, "messaging.destination": topic}):
+            headers = kafka_headers() if headers is None else headers
+            partition = t.partition_for(key)
+            message = Message(topic, partition, t.offsets[partition], key, value, headers, time.time())
+            t.offsets[partition] += 1
+            t.stats["published"] += 1
+            if not t.groups:
+                t.stats["unrouted"] += 1
+            for group in list(t.groups.values()):
+                await self._enqueue(t, group, group.queues[partition], message)
+        return message
+
+    async def _enqueue(self, topic: _Topic, group: _Group, queue: _Queue, message: Message):
+        if len(queue.items) >= self.max_queue:
+            if topic.policy == "drop_newest":
+                topic.stats["dropped"] += 1
+                group.stats["dropped"] += 1
+                return
+            if topic.policy == "drop_oldest":
+                queue.items.popleft()
+                topic.stats["dropped"] += 1
+                group.stats["dropped"] += 1
+            else:
+                topic.stats["blocked"] += 1
+                deadline = time.monotonic() + self.block_timeout
+                while len(queue.items) >= self.max_queue:
+                    queue.space.clear()
+                    remaining = deadline - time.monotonic()
+                    try:
+                        if remaining <= 0:
+                            raise asyncio.TimeoutError
+                        await asyncio.wait_for(queue.space.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        topic.stats["full_errors"] += 1
+                        raise BusFull(f"{topic.name}[{message.partition}] full for group {group.name}")
+        queue.items.append(message)
+        queue.data.set()
+
+    def subscribe(self, topic: str, group: str, handler: Handler):
+        """Add a member to a consumer group; the group's partitions are split across its members"""
+        t = self.topic(topic)
+        g = t.groups.get(group)
+        if g is None:
+            g = t.groups[group] = _Group(group, t.partitions)
+            if self.running:
+                self._start_group(t, g)
+        g.handlers.append(handler)
+
+    def _start_group(self, topic: _Topic, group: _Group):
+        group.tasks = [
+            asyncio.create_task(self._drain(topic, group, partition)) for partition in range(topic.partitions)
+        ]
+
+    async def _drain(self, topic: _Topic, group: _Group, partition: int):
+        queue = group.queues[partition]
+        while True:
+            if not queue.items:
+                if self._stopping:
+                    return
+                queue.data.clear()
+                await queue.data.wait()
+                continue
+            message = queue.items.popleft()
+            queue.space.set()
+            handler = group.handlers[partition % len(group.handlers)]
+            if await _handle(self.name, group.name, handler, message):
+                group.stats["delivered"] += 1
+            else:
+                group.stats["errors"] += 1
+
+    async def start(self):
+        """Start the consumer workers; nested starts (several services in one process) are counted"""
+        self._refs += 1
+        if self._refs > 1:
+            return
+        self._stopping = False
+        for topic in self._topics.values():
+            for group in topic.groups.values():
+                self._start_group(topic, group)
+        print(f"[EventBus] In-process bus started ({len(self._topics)} topics)")
+
+    async def stop(self, timeout: float = 5.0):
+        """Drain queued messages (up to `timeout`) and stop the workers once the last user stops"""
+        if self._refs == 0:
+            return
+        self._refs -= 1
+        if self._refs > 0:
+            return
+        self._stopping = True
+        tasks = []
+        for topic in self._topics.values():
+            for group in topic.groups.values():
+                for queue in group.queues:
+                    queue.data.set()
+                tasks.extend(group.tasks)
+                group.tasks = []
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def metrics(self) -> Dict:
+        return {
+            "transport": self.name,
+            "running": self.running,
+            "max_queue": self.max_queue,
+            "topics": {
+                name: {
+                    **t.stats,
+                    "partitions": t.partitions,
+                    "policy": t.policy,
+                    "groups": {g.name: g.metrics() for g in t.groups.values()}
+                }
+                for name, t in self._topics.items()
+            }
+        }
+
+class KafkaTransport:
+    name = "kafka"
+
+    def __init__(
+        self,
+        bootstrap_servers: str,
+        retry_initial: float = KAFKA_RETRY_INITIAL_SECONDS,
+        retry_max: float = KAFKA_RETRY_MAX_SECONDS
+    ):
+        self.bootstrap_servers = bootstrap_servers
+        self.retry_initial = retry_initial
+        self.retry_max = retry_max
+        self._producer = None
+        self._subscriptions: List[Tuple[str, str, Handler]] = []
+        self._consumers: Dict[str, Any] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._refs = 0
+        self.stats = {"published": 0, "failed": 0, "delivered": 0, "errors": 0, "connect_failures": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._producer is not None
+
+    async def start(self):
+        self._refs += 1
+        if self._refs > 1:
+            return
+        # The first attempt is inline so a reachable broker is connected before the service serves
+        if not await self._connect_producer():
+            self._tasks.append(asyncio.create_task(self._retry(self._connect_producer, "producer")))
+        for subscription in self._subscriptions:
+            self._tasks.append(asyncio.create_task(self._run_consumer(*subscription)))
+
+    async def _retry(self, attempt: Callable[[], Awaitable[bool]], what: str):
+        """Call `attempt` until it succeeds, doubling the wait between tries up to retry_max"""
+        delay = self.retry_initial
+        while True:
+            print(f"[EventBus] Retrying Kafka {what} in {delay:.0f}s")
+            await asyncio.sleep(delay)
+            if await attempt():
+                return
+            delay = min(delay * 2, self.retry_max)
+
+    async def _connect_producer(self) -> bool:
+        from aiokafka import AIOKafkaProducer
+        producer = AIOKafkaProducer(
+            bootstrap_servers=self.bootstrap_servers,
+            value_serializer=lambda v: json.dumps(v, default=str).encode("utf-8"),
+            key_serializer=lambda k: k.encode("utf-8") if k else None,
+            linger_ms=5
+        )
+        try:
+            await producer.start()
+        except Exception as e:
+            self.stats["connect_failures"] += 1
+            print(f"[EventBus] Kafka unavailable at {self.bootstrap_servers}: {e}")
+            await _close_quietly(producer)
+            return False
+        self._producer = producer
+        print(f"[EventBus] Connected to Kafka at {self.bootstrap_servers}")
+        return True
+
+    async def publish(self, topic: str, value: Any, key: Optional[str] = None, headers: Optional[Headers] = None):
+        with span("kafka.publish", kind="producer", **{"messaging.system": self.name, "messaging.destination": topic}):
+            if self._producer is None:
+                self.stats["failed"] += 1
+                return None
+            headers = kafka_headers() if headers is None else headers
+            try:
+                # Returns once the record is in the producer's batch; a full buffer makes this wait
+                result = await self._producer.send(topic, value, key=key, headers=headers)
+            except Exception as e:
+                self.stats["failed"] += 1
+                print(f"[EventBus] Publish to {topic} failed: {e}")
+                return None
+        self.stats["published"] += 1
+        return result
+
+    def subscribe(self, topic: str, group: str, handler: Handler):
+        self._subscriptions.append((topic, group, handler))
+        if self._refs > 0:
+            self._tasks.append(asyncio.create_task(self._run_consumer(topic, group, handler)))
+
+    async def _run_consumer(self, topic: str, group: str, handler: Handler):
+        """
+        Start the subscription's consumer and consume until stopped. A consumer
+        that fails to start, or fails while consuming, is closed and started
+        again after a backoff, so the error never reaches the service.
+        """
+        name = f"{topic}:{group}"
+        delay = self.retry_initial
+        while True:
+            consumer = None
+            try:
+                consumer = await self._start_consumer(topic, group)
+                self._consumers[name] = consumer
+                print(f"[EventBus] Consuming {topic} as {group}")
+                delay = self.retry_initial
+                await self._consume(consumer, group, handler)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["connect_failures"] += 1
+                print(f"[EventBus] Kafka consumer {name} failed: {e}")
+            finally:
+                self._consumers.pop(name, None)
+                if consumer is not None:
+                    await _close_quietly(consumer)
+            print(f"[EventBus] Retrying Kafka consumer {name} in {delay:.0f}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.retry_max)
+
+    async def _start_consumer(self, topic: str, group: str):
+        from aiokafka import AIOKafkaConsumer
+        consumer = AIOKafkaConsumer(
+            topic,
+            bootstrap_servers=self.bootstrap_servers,
+            group_id=group,
+            value_deserializer=lambda v: json.loads(v.decode("utf-8")),
+            key_deserializer=lambda k: k.decode("utf-8") if k else None
+        )
+        try:
+            await consumer.start()
+        except BaseException:
+            await _close_quietly(consumer)
+            raise
+        return consumer
+
+    async def _consume(self, consumer, group: str, handler: Handler):
+        async for record in consumer:
+            message = Message(
+                record.topic, record.partition, record.offset, record.key, record.value,
+                list(record.headers or ()), record.timestamp / 1000
+            )
+            if await _handle(self.name, group, handler, message):
+                self.stats["delivered"] += 1
+            else:
+                self.stats["errors"] += 1
+
+    async def stop(self, timeout: float = 5.0):
+        if self._refs == 0:
+            return
+        self._refs -= 1
+        if self._refs > 0:
+            return
+        for task in self._tasks:
+            task.cancel()
+        # Cancelled consumer tasks close their own consumers
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._producer is not None:
+            await self._producer.stop()
+            self._producer = None
+
+    def metrics(self) -> Dict:
+        return {
+            "transport": self.name,
+            "running": self.running,
+            "bootstrap_servers": self.bootstrap_servers,
+            "subscriptions": [f"{topic}:{group}" for topic, group, _ in self._subscriptions],
+            "consuming": sorted(self._consumers),
+            **self.stats
+        }
+
+async def _close_quietly(client):
+    """Stop an aiokafka client after a failure, ignoring errors from the half-open connection"""
+    try:
+        await client.stop()
+    except Exception:
+        pass
+
+def create_transport(name: str = EVENT_TRANSPORT):
+    if name == "memory":
+        return MemoryBus(EVENT_BUS_QUEUE_SIZE, EVENT_BUS_BLOCK_TIMEOUT, EVENT_BUS_POLICY)
+    if name == "kafka":
+        return KafkaTransport(KAFKA_BOOTSTRAP_SERVERS)
+    raise ValueError(f"Unknown EVENT_TRANSPORT '{name}' (choose memory or kafka)")
+
+# One bus per process: services running together in one process share it
+event_bus = create_transport()
@@ -0,0 +1,173 @@
+"""
+Event Stream
+Server-sent events fan-out of computed insights and signals with a resumable replay log.
+
+publish() is called by the one producer (the code that computes an insight or
+signal). It gives the event an id and encodes its SSE frame once, whatever
+the number of subscribers. The event is appended to a bounded replay log and
+pushed onto the queue of every subscriber whose filter (event type, symbol,
+action) matches. Subscribers resume from Last-Event-ID: events after that id
+are replayed from the log. If the log no longer reaches back that far (or the
+id predates this process), a `reset` event tells the client to refetch state
+instead. A subscriber whose queue overflows is not allowed to hold up
+publishing. Its queue is dropped and it catches up from the replay log at its
+last delivered id. Idle streams get a comment-line heartbeat so proxies keep
+the connection open. Ids are seeded from the wall clock in milliseconds, so
+they keep growing across restarts.
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, Iterable, List, Optional, Set
+
+class Event:
+    __slots__ = ("id", "type", "data", "symbol", "action", "frame")
+
+    def __init__(self, event_id: int, event_type: str, data: Dict):
+        self.id = event_id
+        self.type = event_type
+        self.data = data
+        self.symbol = data.get("symbol")
+        self.action = data.get("action")
+        payload = json.dumps(data, separators=(",", ":"), default=str)
+        self.frame = f"id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n".encode()
+
+class EventFilter:
+    """None accepts any value"""
+
+    def __init__(
+        self,
+        types: Optional[Iterable[str]] = None,
+        symbols: Optional[Iterable[str]] = None,
+        actions: Optional[Iterable[str]] = None
+    ):
+        self.types: Optional[Set[str]] = set(types) if types else None
+        self.symbols: Optional[Set[str]] = set(symbols) if symbols else None
+        self.actions: Optional[Set[str]] = set(actions) if actions else None
+
+    def matches(self, event: Event) -> bool:
+        return (
+            (self.types is None or event.type in self.types)
+            and (self.symbols is None or event.symbol in self.symbols)
+            and (self.actions is None or event.action in self.actions)
+        )
+
+class _Subscriber:
+    __slots__ = ("filter", "pending", "wake", "last_id", "lagged")
+
+    def __init__(self, event_filter: EventFilter, last_id: int):
+        self.filter = event_filter
+        self.pending: Deque[Event] = deque()
+        self.wake = asyncio.Event()
+        self.last_id = last_id
+        self.lagged = False
+
+class EventBroadcaster:
+    def __init__(self, replay_size: int = 1000, subscriber_queue: int = 500, heartbeat_seconds: float = 15.0):
+        self.replay_size = replay_size
+        self.subscriber_queue = subscriber_queue
+        self.heartbeat_seconds = heartbeat_seconds
+        self._log: Deque[Event] = deque()
+        self._last_id = int(time.time() * 1000)
+        self._evicted_through = self._last_id  # ids at or below this are not in the log
+        self._subscribers: Set[_Subscriber] = set()
+        self._closed = False
+        self.stats = {"published": 0, "delivered": 0, "replayed": 0, "resets": 0, "lagged": 0, "connections": 0}
+
+    def publish(self, event_type: str, data: Dict) -> Event:
+        self._last_id = max(self._last_id + 1, int(time.time() * 1000))
+        event = Event(self._last_id, event_type, data)
+        self._log.append(event)
+        if len(self._log) > self.replay_size:
+            self._evicted_through = self._log.popleft().id
+        self.stats["published"] += 1
+        for sub in self._subscribers:
+            if sub.lagged or not sub.filter.matches(event):
+                continue
+            if len(sub.pending) >= self.subscriber_queue:
+                sub.pending.clear()
+                sub.lagged = True
+                self.stats["lagged"] += 1
+            else:
+                sub.pending.append(event)
+            sub.wake.set()
+        return event
+
+    def recent(self, event_type: str, limit: int, event_filter: Optional[EventFilter] = None) -> List[Dict]:
+        """Newest-first payloads of logged events of a type"""
+        found = []
+        for event in reversed(self._log):
+            if event.type == event_type and (event_filter is None or event_filter.matches(event)):
+                found.append(event.data)
+                if len(found) >= limit:
+                    break
+        return found
+
+    def _replay(self, sub: _Subscriber, after_id: int) -> List[bytes]:
+        if after_id < self._evicted_through or after_id > self._last_id:
+            self.stats["resets"] += 1
+            sub.last_id = self._last_id
+            reset = json.dumps({"reason": "replay_unavailable", "last_event_id": after_id})
+            return [f"id: {self._last_id}\nevent: reset\ndata: {reset}\n\n".encode()]
+        frames = []
+        for event in self._log:
+            if event.id > after_id and sub.filter.matches(event):
+                frames.append(event.frame)
+                sub.last_id = event.id
+        self.stats["replayed"] += len(frames)
+        return frames
+
+    async def stream(self, event_filter: EventFilter, last_event_id: Optional[int] = None) -> AsyncIterator[bytes]:
+        """SSE body for one subscriber; replays after last_event_id first"""
+        # Attach before replaying, so events published meanwhile are queued, not missed
+        sub = _Subscriber(event_filter, self._last_id)
+        self._subscribers.add(sub)
+        self.stats["connections"] += 1
+        try:
+            yield b"retry: 3000\n\n"
+            if last_event_id is not None:
+                for frame in self._replay(sub, last_event_id):
+                    yield frame
+            while not self._closed:
+                if sub.lagged:
+                    sub.lagged = False
+                    for frame in self._replay(sub, sub.last_id):
+                        yield frame
+                if not sub.pending:
+                    sub.wake.clear()
+                    try:
+                        await asyncio.wait_for(sub.wake.wait(), self.heartbeat_seconds)
+                    except asyncio.TimeoutError:
+                        yield b": heartbeat\n\n"
+                    continue
+                event = sub.pending.popleft()
+                if event.id <= sub.last_id:
+                    continue  # already sent by a replay
+                sub.last_id = event.id
+                self.stats["delivered"] += 1
+                yield event.frame
+        finally:
+            self._subscribers.discard(sub)
+
+    def close(self):
+        """End every open stream (clients reconnect with their Last-Event-ID)"""
+        self._closed = True
+        for sub in self._subscribers:
+            sub.wake.set()
+
+    def metrics(self) -> Dict:
+        return {
+            **self.stats,
+            "subscribers": len(self._subscribers),
+            "log_size": len(self._log),
+            "replay_size": self.replay_size,
+            "last_event_id": self._last_id
+        }
+
+def parse_list(value: Optional[str], upper: bool = True) -> Optional[List[str]]:
+    if not value:
+        return None
+    items = [v.strip() for v in value.split(",") if v.strip()]
+    return [v.upper() for v in items] if upper else [v.lower() for v in items]
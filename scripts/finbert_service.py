@@ -0,0 +1,187 @@
+"""
+FinBERT Inference Service
+Optional CPU transformer sentiment backend with dynamic micro-batching.
+
+Callers on the event loop submit single texts; a collector task groups concurrent
+requests into micro-batches (bounded by max batch size and max wait) and hands each
+batch to a dedicated inference thread, so model execution never blocks the loop.
+"""
+
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_MODEL_NAME = "ProsusAI/finbert"
+
+class FinBERTBatcher:
+    """
+    Micro-batching front end for a sequence classification model.
+
+    The tokenizer and model are imported lazily so the service runs without
+    torch/transformers installed when the lexicon backend is selected.
+    """
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_MODEL_NAME,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 10.0,
+        max_length: int = 128,
+        tokenizer_cache_size: int = 20000,
+        num_threads: Optional[int] = None,
+    ):
+        self.model_name = model_name
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_length = max_length
+        self.tokenizer_cache_size = tokenizer_cache_size
+        self.num_threads = num_threads
+
+        self.loaded = False
+        self._tokenizer = None
+        self._model = None
+        self._label_signs: Dict[int, float] = {}
+        self._labels: Dict[int, str] = {}
+        # Only touched from the inference thread, so no locking is needed
+        self._token_cache: "OrderedDict[str, List[int]]" = OrderedDict()
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._collector: Optional[asyncio.Task] = None
+        # Batch the collector has taken off the queue and not yet resolved
+        self._batch: List[Tuple[str, asyncio.Future]] = []
+
+        self.stats = {"requests": 0, "batches": 0, "token_cache_hits": 0, "token_cache_misses": 0}
+
+    async def start(self):
+        """Load the model on the inference thread and start the batch collector"""
+        loop = asyncio.get_running_loop()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="finbert")
+        await loop.run_in_executor(self._executor, self._load)
+        self._queue = asyncio.Queue()
+        self._collector = asyncio.create_task(self._collect())
+        self.loaded = True
+        print(f"[FinBERT] Loaded {self.model_name} (batch={self.max_batch_size}, wait={self.max_wait * 1000:.0f}ms)")
+
+    async def stop(self):
+        """Stop collecting and fail every request still waiting, so no caller hangs"""
+        self.loaded = False
+        if self._collector:
+            self._collector.cancel()
+            try:
+                await self._collector
+            except asyncio.CancelledError:
+                pass
+        pending = self._batch
+        self._batch = []
+        while self._queue is not None and not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for _, future in pending:
+            if not future.done():
+                future.set_exception(RuntimeError("FinBERT backend stopped"))
+        if self._executor:
+            self._executor.shutdown(wait=False)
+
+    async def score(self, text: str) -> Tuple[float, str, float]:
+        """Score one text; concurrent callers are batched together"""
+        if not self.loaded:
+            raise RuntimeError("FinBERT backend not started")
+        future = asyncio.get_running_loop().create_future()
+        self.stats["requests"] += 1
+        await self._queue.put((text, future))
+        return await future
+
+    async def score_many(self, texts: List[str]) -> List[Tuple[float, str, float]]:
+        return list(await asyncio.gather(*(self.score(text) for text in texts)))
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._batch = batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            # Drop requests whose callers have gone away (e.g. cancelled HTTP requests)
+            self._batch = batch = [(text, future) for text, future in batch if not future.done()]
+            if not batch:
+                continue
+
+            self.stats["batches"] += 1
+            try:
+                results = await loop.run_in_executor(self._executor, self._infer, [text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+            self._batch = []
+
+    # --- Inference thread ---
+
+    def _load(self):
+        import torch
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+        if self.num_threads:
+            torch.set_num_threads(self.num_threads)
+        self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        self._model = AutoModelForSequenceClassification.from_pretrained(self.model_name)
+        self._model.eval()
+
+        self._labels = {int(i): str(label).lower() for i, label in self._model.config.id2label.items()}
+        # Signed contribution of each class to the [-1, 1] score
+        self._label_signs = {
+            i: 1.0 if label == "positive" else -1.0 if label == "negative" else 0.0
+            for i, label in self._labels.items()
+        }
+
+    def _encode(self, texts: List[str]) -> List[List[int]]:
+        cache = self._token_cache
+        encoded: List[Optional[List[int]]] = []
+        missing: List[int] = []
+        for idx, text in enumerate(texts):
+            ids = cache.get(text)
+            if ids is None:
+                missing.append(idx)
+            else:
+                cache.move_to_end(text)
+            encoded.append(ids)
+
+        self.stats["token_cache_hits"] += len(texts) - len(missing)
+        self.stats["token_cache_misses"] += len(missing)
+        if missing:
+            fresh = self._tokenizer(
+                [texts[idx] for idx in missing], truncation=True, max_length=self.max_length
+            )["input_ids"]
+            for idx, ids in zip(missing, fresh):
+                encoded[idx] = ids
+                cache[texts[idx]] = ids
+            while len(cache) > self.tokenizer_cache_size:
+                cache.popitem(last=False)
+        return encoded
+
+    def _infer(self, texts: List[str]) -> List[Tuple[float, str, float]]:
+        import torch
+
+        encoded = self._encode(texts)
+        inputs = self._tokenizer.pad({"input_ids": encoded}, return_tensors="pt")
+        with torch.inference_mode():
+            probs = torch.softmax(self._model(**inputs).logits, dim=-1).tolist()
+
+        results = []
+        for row in probs:
+            score = sum(p * self._label_signs.get(i, 0.0) for i, p in enumerate(row))
+            best = max(range(len(row)), key=row.__getitem__)
+            results.append((round(score, 3), self._labels.get(best, "neutral"), round(row[best], 3)))
+        return results
@@ -0,0 +1,185 @@
+"""
+Historical Bars
+OHLCV queries over market_data / market_data_hourly with keyset paging and columnar encodings.
+
+Minute resolutions bucket the raw ticks in market_data. Hourly and coarser
+resolutions read the market_data_hourly continuous aggregate, re-bucketing it
+for 4h/1d/1w, so a multi-year daily query reads hourly rollups instead of raw
+ticks. Pages are keyset-paged: the cursor encodes the last bucket returned,
+and the next page starts right after it, so deep pages cost the same as the
+first. Bars can be encoded as row objects, as arrays per column
+(JSON), or as a compact binary layout. The binary layout is a
+little-endian uint32 header length, a JSON header, then raw
+little-endian column buffers (int64 epoch ms time and volume, float64
+prices). Clients can map it straight into typed arrays.
+"""
+
+import base64
+import json
+import struct
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# resolution -> (source, bucket width); hourly-source rows with width 1h are read as-is
+RESOLUTIONS: Dict[str, Tuple[str, timedelta]] = {
+    "1m": ("raw", timedelta(minutes=1)),
+    "5m": ("raw", timedelta(minutes=5)),
+    "15m": ("raw", timedelta(minutes=15)),
+    "30m": ("raw", timedelta(minutes=30)),
+    "1h": ("hourly", timedelta(hours=1)),
+    "4h": ("hourly", timedelta(hours=4)),
+    "1d": ("hourly", timedelta(days=1)),
+    "1w": ("hourly", timedelta(weeks=1)),
+}
+# time_bucket's default origin for intervals without months (a Monday, so weeks start on Mondays)
+TIME_BUCKET_ORIGIN = datetime(2000, 1, 3, tzinfo=timezone.utc)
+FORMATS = ("json", "columnar", "binary")
+BINARY_MEDIA_TYPE = "application/vnd.quant.bars"
+
+COLUMNS = ("time", "open", "high", "low", "close", "volume")
+_DTYPES = {"time": "<i8", "open": "<f8", "high": "<f8", "low": "<f8", "close": "<f8", "volume": "<i8"}
+
+_RAW_QUERY = """
+    SELECT time_bucket($2::interval, timestamp) AS bucket,
+           first(price, timestamp)::float8 AS open,
+           max(price)::float8 AS high,
+           min(price)::float8 AS low,
+           last(price, timestamp)::float8 AS close,
+           sum(volume)::int8 AS volume
+    FROM market_data
+    WHERE symbol = $1 AND timestamp >= $3 AND timestamp < $4
+    GROUP BY bucket
+    ORDER BY bucket
+    LIMIT $5
+"""
+
+_HOURLY_QUERY = """
+    SELECT bucket, open::float8, high::float8, low::float8, close::float8, volume::int8
+    FROM market_data_hourly
+    WHERE symbol = $1 AND bucket >= $2 AND bucket < $3
+    ORDER BY bucket
+    LIMIT $4
+"""
+
+_ROLLUP_QUERY = """
+    SELECT time_bucket($2::interval, bucket) AS rollup,
+           first(open, bucket)::float8 AS open,
+           max(high)::float8 AS high,
+           min(low)::float8 AS low,
+           last(close, bucket)::float8 AS close,
+           sum(volume)::int8 AS volume
+    FROM market_data_hourly
+    WHERE symbol = $1 AND bucket >= $3 AND bucket < $4
+    GROUP BY rollup
+    ORDER BY rollup
+    LIMIT $5
+"""
+
+def encode_cursor(resolution: str, bucket: datetime) -> str:
+    ms = int(bucket.timestamp() * 1000)
+    return base64.urlsafe_b64encode(f"{resolution}:{ms}".encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, resolution: str) -> datetime:
+    """Start of the page after the cursor's bucket"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        cursor_resolution, ms = raw.split(":")
+        if cursor_resolution != resolution:
+            raise ValueError("cursor belongs to another resolution")
+        last_bucket = datetime.fromtimestamp(int(ms) / 1000, tz=timezone.utc)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+    return last_bucket + RESOLUTIONS[resolution][1]
+
+def _aware(dt: datetime) -> datetime:
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt
+
+def bucket_start(ts: datetime, width: timedelta) -> datetime:
+    """Start of the time_bucket(width, ...) bucket containing `ts`"""
+    return TIME_BUCKET_ORIGIN + (ts - TIME_BUCKET_ORIGIN) // width * width
+
+def resolve_range(
+    resolution: str,
+    start: Optional[datetime],
+    end: Optional[datetime],
+    cursor: Optional[str],
+    limit: int
+) -> Tuple[datetime, datetime]:
+    """
+    [start, end) in UTC; without a start, the `limit` buckets before end. The start
+    is rounded down to its bucket, so the first bar is whole and the hourly rollup
+    row holding the start is read.
+    """
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Unknown resolution '{resolution}' (choose from {', '.join(RESOLUTIONS)})")
+    width = RESOLUTIONS[resolution][1]
+    end = _aware(end) if end else datetime.now(timezone.utc)
+    start = bucket_start(_aware(start) if start else end - width * limit, width)
+    if cursor:
+        start = max(start, decode_cursor(cursor, resolution))
+    if start >= end:
+        raise ValueError("start must be before end")
+    return start, end
+
+async def fetch_bars(pool, symbol: str, resolution: str, start: datetime, end: datetime, limit: int):
+    """Up to limit + 1 rows of (bucket, open, high, low, close, volume); the extra row flags another page"""
+    source, width = RESOLUTIONS[resolution]
+    if source == "raw":
+        return await pool.fetch(_RAW_QUERY, symbol, width, start, end, limit + 1)
+    if width == timedelta(hours=1):
+        return await pool.fetch(_HOURLY_QUERY, symbol, start, end, limit + 1)
+    return await pool.fetch(_ROLLUP_QUERY, symbol, width, start, end, limit + 1)
+
+def paginate(rows: list, resolution: str, limit: int) -> Tuple[list, Optional[str]]:
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(resolution, rows[-1][0])
+
+def to_columns(rows: list) -> Dict[str, list]:
+    """Arrays per column; time as epoch milliseconds"""
+    if not rows:
+        return {name: [] for name in COLUMNS}
+    buckets, opens, highs, lows, closes, volumes = zip(*rows)
+    return {
+        "time": [int(b.timestamp() * 1000) for b in buckets],
+        "open": list(opens),
+        "high": list(highs),
+        "low": list(lows),
+        "close": list(closes),
+        "volume": [int(v or 0) for v in volumes]
+    }
+
+def to_records(rows: list) -> List[Dict]:
+    return [
+        {"time": b.isoformat(), "open": o, "high": h, "low": l, "close": c, "volume": int(v or 0)}
+        for b, o, h, l, c, v in rows
+    ]
+
+def to_binary(columns: Dict[str, list], meta: Dict) -> bytes:
+    """uint32 header length + JSON header + contiguous little-endian column buffers"""
+    buffers = []
+    layout = []
+    offset = 0
+    for name in COLUMNS:
+        data = np.asarray(columns[name], dtype=_DTYPES[name]).tobytes()
+        layout.append({"name": name, "dtype": _DTYPES[name], "offset": offset, "length": len(data)})
+        buffers.append(data)
+        offset += len(data)
+    header = json.dumps({**meta, "count": len(columns["time"]), "columns": layout}, separators=(",", ":")).encode()
+    # Pad so the column buffers start 8-byte aligned after the length prefix
+    header += b" " * (-(4 + len(header)) % 8)
+    return struct.pack("<I", len(header)) + header + b"".join(buffers)
+
+def from_binary(payload: bytes) -> Tuple[Dict, Dict[str, np.ndarray]]:
+    """Decode a binary bars payload (reference reader for clients and tests)"""
+    (header_length,) = struct.unpack_from("<I", payload)
+    header = json.loads(payload[4:4 + header_length])
+    body = memoryview(payload)[4 + header_length:]
+    columns = {
+        c["name"]: np.frombuffer(body[c["offset"]:c["offset"] + c["length"]], dtype=c["dtype"])
+        for c in header["columns"]
+    }
+    return header, columns
@@ -5,17 +5,20 @@ Utility module for producing messages to Kafka topics
 
 import json
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
+
+from tracing import kafka_headers, span
 
 # Kafka configuration
 KAFKA_BOOTSTRAP_SERVERS = "localhost:9092"
 
-# Topic definitions
+# Topic definitions; "overflow" is the in-process bus policy when a consumer falls behind (see event_bus)
 TOPICS = {
     "raw_market_data": {
         "partitions": 6,
         "replication_factor": 3,
-        "retention_ms": 86400000  # 24 hours
+        "retention_ms": 86400000,  # 24 hours
+        "overflow": "drop_oldest"  # a newer tick supersedes a queued one
     },
     "raw_news_articles": {
         "partitions": 3,
@@ -36,6 +39,11 @@ TOPICS = {
         "partitions": 6,
         "replication_factor": 3,
         "retention_ms": 86400000
+    },
+    "trade_triggers": {
+        "partitions": 6,
+        "replication_factor": 3,
+        "retention_ms": 604800000
     }
 }
 
@@ -68,8 +76,14 @@ class KafkaProducerWrapper:
         self.connected = False
         print("[Kafka] Disconnected")
         
-    async def send(self, topic: str, value: Dict[str, Any], key: Optional[str] = None):
-        """Send message to Kafka topic"""
+    async def send(
+        self,
+        topic: str,
+        value: Dict[str, Any],
+        key: Optional[str] = None,
+        headers: Optional[List[Tuple[str, bytes]]] = None
+    ):
+        """Send message to Kafka topic; headers default to the current trace context"""
         if not self.connected:
             raise ConnectionError("Kafka producer not connected")
             
@@ -82,8 +96,10 @@ class KafkaProducerWrapper:
             }
         }
         
-        # In production: await producer.send_and_wait(topic, message, key=key)
-        print(f"[Kafka] Sent to {topic}: {json.dumps(message)[:100]}...")
+        with span("kafka.publish", kind="producer", **{"messaging.destination": topic}):
+            headers = kafka_headers() if headers is None else headers
+            # In production: await producer.send_and_wait(topic, message, key=key, headers=headers)
+            print(f"[Kafka] Sent to {topic}: {json.dumps(message)[:100]}...")
         return True
 
 # Message schemas
@@ -0,0 +1,249 @@
+"""
+Load Test Driver
+Stepped request-rate ramp against the services and Kafka topics, fed by synthetic data.
+
+Each step targets a request rate for a fixed duration. Requests are scheduled
+at evenly spaced times and served by a bounded pool of workers (closed loop).
+A worker waits for its request's slot, sends it, and waits for the response
+before taking the next one. Once the services saturate, workers fall behind
+schedule. Latency is measured from the scheduled send time, so queueing delay
+is included rather than hidden (no coordinated omission). Each step reports
+achieved throughput, latency percentiles and error rates. The ramp stops at
+the first step that breaches the error-rate or p99 limit.
+
+Run the services with UPSTREAM_MODE=replay to keep the test offline, e.g.
+
+    python load_driver.py --mix quote=4,aggregate=2,sentiment=1 --rates 10,50,100,200
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+from synthetic_data import SyntheticMarket, SyntheticNews
+
+DEFAULT_SYMBOLS = ["AAPL", "NVDA", "MSFT", "TSLA", "AMZN", "GOOGL", "META", "AMD"]
+
+class LoadContext:
+    """Shared client, synthetic generators and service URLs for the scenarios"""
+
+    def __init__(self, args: argparse.Namespace):
+        self.market_url = args.market_url.rstrip("/")
+        self.news_url = args.news_url.rstrip("/")
+        self.quant_url = args.quant_url.rstrip("/")
+        self.symbols = args.symbols
+        self.batch_size = args.batch_size
+        self.market = SyntheticMarket(self.symbols, seed=args.seed)
+        self.news = SyntheticNews(self.symbols, seed=args.seed, sentiment_bias=args.sentiment_bias, market=self.market)
+        self.rng = np.random.default_rng(args.seed)
+        self.client = httpx.AsyncClient(
+            timeout=args.timeout,
+            limits=httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        )
+        self.kafka_servers = args.kafka
+        self._producer = None
+        self.portfolio_value = 1_000_000.0
+
+    def symbol(self) -> str:
+        return self.symbols[self.rng.integers(len(self.symbols))]
+
+    async def producer(self):
+        if self._producer is None:
+            from aiokafka import AIOKafkaProducer
+            self._producer = AIOKafkaProducer(
+                bootstrap_servers=self.kafka_servers,
+                value_serializer=lambda v: json.dumps(v).encode("utf-8"),
+                key_serializer=lambda k: k.encode("utf-8") if k else None
+            )
+            await self._producer.start()
+        return self._producer
+
+    async def close(self):
+        await self.client.aclose()
+        if self._producer is not None:
+            await self._producer.stop()
+
+# Scenario: context -> awaitable returning an HTTP status (Kafka sends return 200)
+Scenario = Callable[[LoadContext], Awaitable[int]]
+
+async def _get(ctx: LoadContext, url: str, **params) -> int:
+    return (await ctx.client.get(url, params=params or None)).status_code
+
+async def _post(ctx: LoadContext, url: str, body) -> int:
+    return (await ctx.client.post(url, json=body)).status_code
+
+async def scenario_valuation(ctx: LoadContext) -> int:
+    # Walk the portfolio value with the synthetic market's equal-weight return
+    tick = ctx.market.paths(1)
+    ctx.portfolio_value *= float(np.exp(tick["returns"][0].mean()))
+    return await _post(ctx, f"{ctx.quant_url}/api/v1/performance/valuations", {
+        "total_value": round(ctx.portfolio_value, 2),
+        "timestamp": tick["timestamps"][0].isoformat()
+    })
+
+async def scenario_ticks(ctx: LoadContext) -> int:
+    # One request carries batch_size ticks spread over the universe
+    steps = max(1, ctx.batch_size // len(ctx.symbols))
+    return await _post(ctx, f"{ctx.market_url}/api/v1/ticks", ctx.market.ticks(steps))
+
+async def scenario_trigger_ticks(ctx: LoadContext) -> int:
+    # One tick per symbol against the quant engine's stop/target/alert index
+    return await _post(ctx, f"{ctx.quant_url}/api/v1/triggers/ticks", [
+        {"symbol": t["symbol"], "price": t["price"], "timestamp": t["timestamp"]} for t in ctx.market.ticks(1)
+    ])
+
+async def scenario_kafka_market(ctx: LoadContext) -> int:
+    producer = await ctx.producer()
+    for message in ctx.market.ticks(1):
+        await producer.send("raw_market_data", message, key=message["symbol"])
+    return 200
+
+async def scenario_kafka_news(ctx: LoadContext) -> int:
+    producer = await ctx.producer()
+    article = ctx.news.article()
+    await producer.send("raw_news_articles", article, key=article["symbols"][0])
+    return 200
+
+SCENARIOS: Dict[str, Scenario] = {
+    "quote": lambda ctx: _get(ctx, f"{ctx.market_url}/api/v1/quote/{ctx.symbol()}"),
+    "quotes": lambda ctx: _get(ctx, f"{ctx.market_url}/api/v1/quotes", symbols=",".join(ctx.symbols)),
+    "news": lambda ctx: _get(ctx, f"{ctx.news_url}/api/v1/news", tickers=ctx.symbol()),
+    "aggregate": lambda ctx: _get(ctx, f"{ctx.news_url}/api/v1/sentiment-aggregate/{ctx.symbol()}"),
+    "sentiment": lambda ctx: _post(
+        ctx, f"{ctx.news_url}/api/v1/analyze-sentiment/batch",
+        [a["headline"] for a in ctx.news.articles(ctx.batch_size)]
+    ),
+    "insights": lambda ctx: _get(ctx, f"{ctx.quant_url}/api/v1/insights", symbols=ctx.symbol()),
+    "signals": lambda ctx: _get(ctx, f"{ctx.quant_url}/api/v1/signals/{ctx.symbol()}"),
+    "screener": lambda ctx: _get(ctx, f"{ctx.quant_url}/api/v1/screener", limit=20),
+    "performance": lambda ctx: _get(ctx, f"{ctx.quant_url}/api/v1/performance"),
+    "valuation": scenario_valuation,
+    "ticks": scenario_ticks,
+    "trigger_ticks": scenario_trigger_ticks,
+    "kafka_market": scenario_kafka_market,
+    "kafka_news": scenario_kafka_news,
+}
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario '{name}' (choose from {', '.join(SCENARIOS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"p50_ms": None, "p90_ms": None, "p99_ms": None, "max_ms": None}
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {"p50_ms": round(p50, 2), "p90_ms": round(p90, 2), "p99_ms": round(p99, 2), "max_ms": round(max(values), 2)}
+
+async def run_step(ctx: LoadContext, mix: Dict[str, float], rate: float, duration: float, concurrency: int) -> Dict:
+    names = list(mix)
+    weights = np.array([mix[n] for n in names])
+    total = int(rate * duration)
+    choices = ctx.rng.choice(len(names), size=total, p=weights / weights.sum())
+    latencies: Dict[str, List[float]] = {n: [] for n in names}
+    service_ms: List[float] = []
+    errors: Counter = Counter()
+    next_index = 0
+    started = time.perf_counter()
+
+    async def worker():
+        nonlocal next_index
+        while next_index < total:
+            i = next_index
+            next_index += 1
+            scheduled = started + i / rate
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            name = names[choices[i]]
+            sent = time.perf_counter()
+            try:
+                status = await SCENARIOS[name](ctx)
+                if status >= 400:
+                    errors[f"{name}: HTTP {status}"] += 1
+            except Exception as e:
+                errors[f"{name}: {type(e).__name__}"] += 1
+            done = time.perf_counter()
+            latencies[name].append((done - scheduled) * 1000)
+            service_ms.append((done - sent) * 1000)
+
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, max(total, 1)))))
+    elapsed = time.perf_counter() - started
+    all_latencies = [v for values in latencies.values() for v in values]
+    error_count = sum(errors.values())
+    return {
+        "target_rps": rate,
+        "achieved_rps": round(total / elapsed, 2) if elapsed > 0 else 0.0,
+        "requests": total,
+        "errors": error_count,
+        "error_rate": round(error_count / total, 4) if total else 0.0,
+        **percentiles(all_latencies),
+        "service_p99_ms": percentiles(service_ms)["p99_ms"],
+        "by_scenario": {n: {"requests": len(v), **percentiles(v)} for n, v in latencies.items() if v},
+        "error_breakdown": dict(errors.most_common(10))
+    }
+
+async def ramp(args: argparse.Namespace) -> List[Dict]:
+    mix = parse_mix(args.mix)
+    ctx = LoadContext(args)
+    results = []
+    print(f"{'target':>8} {'achieved':>9} {'reqs':>7} {'err%':>6} {'p50ms':>8} {'p90ms':>8} {'p99ms':>8} {'maxms':>9}")
+    try:
+        for rate in args.rates:
+            step = await run_step(ctx, mix, rate, args.step_seconds, args.concurrency)
+            results.append(step)
+            print(f"{step['target_rps']:>8.1f} {step['achieved_rps']:>9.1f} {step['requests']:>7} "
+                  f"{step['error_rate'] * 100:>6.2f} {step['p50_ms'] or 0:>8.1f} {step['p90_ms'] or 0:>8.1f} "
+                  f"{step['p99_ms'] or 0:>8.1f} {step['max_ms'] or 0:>9.1f}")
+            for error, count in step["error_breakdown"].items():
+                print(f"{'':>8} {count:>6} x {error}")
+            if step["error_rate"] > args.max_error_rate or (step["p99_ms"] or 0) > args.max_p99_ms:
+                print(f"[LoadDriver] Limit reached at {rate} req/s "
+                      f"(error rate {step['error_rate']:.2%}, p99 {step['p99_ms']} ms); stopping ramp")
+                break
+            if args.pause_seconds:
+                await asyncio.sleep(args.pause_seconds)
+    finally:
+        await ctx.close()
+    return results
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mix", default="quote=4,aggregate=2,sentiment=1,insights=1",
+                        help=f"weighted scenarios, name=weight,... ({', '.join(SCENARIOS)})")
+    parser.add_argument("--rates", type=lambda s: [float(r) for r in s.split(",")], default=[5, 10, 25, 50, 100],
+                        help="comma-separated request rates (req/s), one step each")
+    parser.add_argument("--step-seconds", type=float, default=20.0)
+    parser.add_argument("--pause-seconds", type=float, default=2.0, help="idle time between steps")
+    parser.add_argument("--concurrency", type=int, default=64, help="worker pool size (max requests in flight)")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--max-error-rate", type=float, default=0.05)
+    parser.add_argument("--max-p99-ms", type=float, default=5000.0)
+    parser.add_argument("--symbols", type=lambda s: [x.strip().upper() for x in s.split(",")], default=DEFAULT_SYMBOLS)
+    parser.add_argument("--batch-size", type=int, default=32, help="headlines per sentiment request / ticks per ticks request")
+    parser.add_argument("--sentiment-bias", type=float, default=0.0, help="mean headline sentiment in [-1, 1]")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--market-url", default="http://localhost:8001")
+    parser.add_argument("--news-url", default="http://localhost:8002")
+    parser.add_argument("--quant-url", default="http://localhost:8003")
+    parser.add_argument("--kafka", default="localhost:9092", help="bootstrap servers for the kafka_* scenarios")
+    parser.add_argument("--json", dest="json_path", help="write the step results to this file")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = asyncio.run(ramp(args))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"args": {k: v for k, v in vars(args).items() if k != "json_path"}, "steps": results}, f, indent=2)
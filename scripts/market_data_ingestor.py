@@ -1,23 +1,69 @@
 """
 Market Data Ingestor Microservice
 FastAPI service that connects to Finnhub (primary) & Alpha Vantage (backup)
-and publishes to Kafka topic: raw_market_data
+and publishes to the raw_market_data topic (in-process bus or Kafka, see event_bus)
 """
 
 import asyncio
 import json
 import os
-import httpx
-from datetime import datetime
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
 from typing import Optional, Dict, List
-from fastapi import FastAPI, WebSocket, HTTPException, Query
-from pydantic import BaseModel
+from fastapi import FastAPI, WebSocket, HTTPException, Query, Body, Header
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, Field, model_validator
+
+from cache_snapshot import CacheSnapshotter, timestamped_model_section
+from db import DATABASE_URL, get_pool, close_pool
+from event_bus import BusFull, event_bus
+from history import (
+    BINARY_MEDIA_TYPE, FORMATS as HISTORY_FORMATS, RESOLUTIONS as HISTORY_RESOLUTIONS,
+    fetch_bars, paginate, resolve_range, to_binary, to_columns, to_records
+)
+from prewarm import PrewarmScheduler
+from profiling import router as profiling_router
+from tick_sink import CumulativeVolume, TickSink, tick_row
+from tracing import init_tracing, instrument_app, shutdown_tracing, span
+from upstream import (
+    alpha_vantage_get, alpha_vantage_quota, close_http_client, get_http_client,
+    transport_metrics, QuotaExceeded, quota_exceeded_handler, INTERACTIVE
+)
+from versioning import VersionTracker
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_tracing("market-ingestor")
+    await event_bus.start()
+    tasks = []
+    if CACHE_SNAPSHOT_ENABLED:
+        cache_snapshotter.restore()
+        tasks.append(asyncio.create_task(cache_snapshotter.run()))
+    if PREWARM_ENABLED:
+        tasks.append(asyncio.create_task(quote_prewarmer.run()))
+    if TICK_SINK_ENABLED and DATABASE_URL:
+        tick_sink.start()
+    yield
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    if CACHE_SNAPSHOT_ENABLED:
+        await cache_snapshotter.save()
+    await event_bus.stop()
+    await tick_sink.stop()
+    await close_pool()
+    await close_http_client()
+    shutdown_tracing()
 
 app = FastAPI(
     title="MarketData-Ingestor",
     description="Real-time market data ingestion (Finnhub + Alpha Vantage)",
-    version="2.1.0"
+    version="2.1.0",
+    lifespan=lifespan
 )
+app.add_exception_handler(QuotaExceeded, quota_exceeded_handler)
+app.include_router(profiling_router)
+instrument_app(app)
 
 # Configuration
 FINNHUB_API_KEY = os.getenv("FINNHUB_API_KEY")
@@ -42,12 +88,79 @@ class MarketDataPoint(BaseModel):
 price_cache: Dict[str, tuple] = {}
 CACHE_TTL_SECONDS = 30
 
-async def fetch_finnhub_quote(client: httpx.AsyncClient, symbol: str) -> Optional[MarketDataPoint]:
+# Prewarming: hot symbols are re-quoted shortly before their cache entry expires
+PREWARM_ENABLED = os.getenv("PREWARM_ENABLED", "true").lower() == "true"
+PREWARM_PER_MINUTE_BUDGET = int(os.getenv("PREWARM_PER_MINUTE_BUDGET", "30"))
+PREWARM_DAILY_BUDGET = int(os.getenv("PREWARM_DAILY_BUDGET", "20000"))
+PREWARM_LEAD_SECONDS = float(os.getenv("PREWARM_LEAD_SECONDS", "5"))
+
+# Warm-start snapshots of the quote cache, restored on startup
+CACHE_SNAPSHOT_ENABLED = os.getenv("CACHE_SNAPSHOT_ENABLED", "true").lower() == "true"
+CACHE_SNAPSHOT_PATH = os.getenv("CACHE_SNAPSHOT_PATH", "data/market_cache_snapshot.json.gz")
+CACHE_SNAPSHOT_INTERVAL_SECONDS = float(os.getenv("CACHE_SNAPSHOT_INTERVAL_SECONDS", "60"))
+
+cache_snapshotter = CacheSnapshotter(CACHE_SNAPSHOT_PATH, CACHE_SNAPSHOT_INTERVAL_SECONDS)
+
+# Tick persistence: quotes and streamed ticks are COPYed into market_data in batches
+TICK_SINK_ENABLED = os.getenv("TICK_SINK_ENABLED", "true").lower() == "true"
+TICK_SINK_QUEUE_SIZE = int(os.getenv("TICK_SINK_QUEUE_SIZE", "200000"))
+TICK_SINK_BATCH_SIZE = int(os.getenv("TICK_SINK_BATCH_SIZE", "5000"))
+TICK_SINK_FLUSH_SECONDS = float(os.getenv("TICK_SINK_FLUSH_SECONDS", "1.0"))
+TICK_SINK_WRITERS = int(os.getenv("TICK_SINK_WRITERS", "2"))
+TICK_SINK_MAX_RETRIES = int(os.getenv("TICK_SINK_MAX_RETRIES", "5"))
+TICK_SINK_PUT_TIMEOUT = float(os.getenv("TICK_SINK_PUT_TIMEOUT", "2.0"))
+
+tick_sink = TickSink(
+    get_pool,
+    max_queue=TICK_SINK_QUEUE_SIZE,
+    batch_size=TICK_SINK_BATCH_SIZE,
+    flush_seconds=TICK_SINK_FLUSH_SECONDS,
+    writers=TICK_SINK_WRITERS,
+    max_retries=TICK_SINK_MAX_RETRIES
+)
+# Quotes carry the day's cumulative volume; only streamed ticks carry per-trade volume
+quote_volume = CumulativeVolume()
+
+HISTORY_MAX_LIMIT = int(os.getenv("HISTORY_MAX_LIMIT", "100000"))
+
+# Change versions behind the ETag / delta modes of /api/v1/quotes
+quote_versions = VersionTracker()
+
+class QuotesResponse(BaseModel):
+    quotes: List[MarketDataPoint]
+    version: int
+    since: Optional[int] = None
+    full: Optional[bool] = None
+
+# Bounds of the market_data columns: DECIMAL(20, 8) prices, DECIMAL(10, 8) spread
+MAX_TICK_PRICE = 1e12
+MAX_TICK_SPREAD = 100.0
+
+class TickIn(BaseModel):
+    symbol: str = Field(min_length=1, max_length=20)
+    price: float = Field(gt=0, lt=MAX_TICK_PRICE, allow_inf_nan=False)
+    volume: int = Field(0, ge=0, le=2**63 - 1)
+    bid: Optional[float] = Field(None, gt=0, lt=MAX_TICK_PRICE, allow_inf_nan=False)
+    ask: Optional[float] = Field(None, gt=0, lt=MAX_TICK_PRICE, allow_inf_nan=False)
+    timestamp: Optional[datetime] = None
+    source: str = Field("stream", max_length=50)
+
+    @model_validator(mode="after")
+    def check_spread(self):
+        if self.bid is not None and self.ask is not None and abs(self.ask - self.bid) >= MAX_TICK_SPREAD:
+            raise ValueError(f"ask - bid must be within +/-{MAX_TICK_SPREAD:g}")
+        return self
+cache_snapshotter.register("price_cache", *timestamped_model_section(price_cache, MarketDataPoint, CACHE_TTL_SECONDS))
+
+async def fetch_finnhub_quote(symbol: str) -> Optional[MarketDataPoint]:
     try:
-        response = await client.get(
-            f"https://finnhub.io/api/v1/quote?symbol={symbol}&token={FINNHUB_API_KEY}",
-            timeout=5.0
-        )
+        with span("upstream.finnhub", kind="client", symbol=symbol) as current:
+            response = await get_http_client().get(
+                "https://finnhub.io/api/v1/quote",
+                params={"symbol": symbol, "token": FINNHUB_API_KEY},
+                timeout=5.0
+            )
+            current.set_attribute("http.status_code", response.status_code)
         if response.status_code != 200: return None
         
         data = response.json()
@@ -70,10 +183,9 @@ async def fetch_finnhub_quote(client: httpx.AsyncClient, symbol: str) -> Optiona
         print(f"[Finnhub] Error: {e}")
         return None
 
-async def fetch_alpha_vantage_quote(client: httpx.AsyncClient, symbol: str) -> Optional[MarketDataPoint]:
+async def fetch_alpha_vantage_quote(symbol: str) -> Optional[MarketDataPoint]:
     try:
-        response = await client.get(
-            "https://www.alphavantage.co/query",
+        response = await alpha_vantage_get(
             params={
                 "function": "GLOBAL_QUOTE",
                 "symbol": symbol,
@@ -104,54 +216,200 @@ async def fetch_alpha_vantage_quote(client: httpx.AsyncClient, symbol: str) -> O
         print(f"[AlphaVantage] Error: {e}")
         return None
 
-@app.get("/api/v1/quotes", response_model=Dict[str, List[MarketDataPoint]])
-async def get_bulk_quotes(symbols: str = Query(..., description="Comma-separated symbols")):
-    """Get latest quotes for multiple symbols"""
+def quote_expires_at(symbol: str) -> Optional[float]:
+    if symbol not in price_cache:
+        return None
+    return price_cache[symbol][1].replace(tzinfo=timezone.utc).timestamp() + CACHE_TTL_SECONDS
+
+async def refresh_quote(symbol: str) -> Optional[MarketDataPoint]:
+    """Fetch a quote (Finnhub, then Alpha Vantage) and cache it"""
+    # Try Finnhub first (Primary)
+    data = await fetch_finnhub_quote(symbol)
+
+    # Fallback to Alpha Vantage
+    if not data:
+        print(f"Falling back to Alpha Vantage for {symbol}")
+        data = await fetch_alpha_vantage_quote(symbol)
+
+    if data:
+        price_cache[symbol] = (data, datetime.utcnow())
+        tick_sink.offer(tick_row(
+            data.symbol, data.price, quote_volume.delta(data.symbol, data.volume),
+            datetime.fromisoformat(data.timestamp), source=data.source
+        ))
+        await event_bus.publish(KAFKA_TOPIC_RAW_MARKET, data.model_dump(), key=data.symbol)
+    return data
+
+quote_prewarmer = PrewarmScheduler(
+    "quotes",
+    refresh_quote,
+    quote_expires_at,
+    per_minute_budget=PREWARM_PER_MINUTE_BUDGET,
+    daily_budget=PREWARM_DAILY_BUDGET,
+    lead_seconds=PREWARM_LEAD_SECONDS,
+    tick_seconds=2.0,
+    concurrency=5
+)
+
+@app.get("/api/v1/quotes", response_model=QuotesResponse, response_model_exclude_none=True)
+async def get_bulk_quotes(
+    response: Response,
+    symbols: str = Query(..., description="Comma-separated symbols"),
+    since: Optional[int] = Query(None, description="Delta mode: only quotes changed after this version"),
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Get latest quotes for multiple symbols. Responses carry a version and an
+    ETag; If-None-Match answers 304 when no quote changed, and `since` returns
+    only the quotes that changed after that version.
+    """
     symbol_list = [s.strip().upper() for s in symbols.split(",")]
     quotes = []
     
-    async with httpx.AsyncClient() as client:
-        # Create tasks for parallel execution
-        tasks = [get_quote(symbol) for symbol in symbol_list]
-        # Return exceptions=True so one failure doesn't break the whole batch
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        for res in results:
-            if isinstance(res, MarketDataPoint):
-                quotes.append(res)
-            
-    return {"quotes": quotes}
+    # Create tasks for parallel execution
+    tasks = [get_quote(symbol) for symbol in symbol_list]
+    # Return exceptions=True so one failure doesn't break the whole batch
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    for res in results:
+        if isinstance(res, MarketDataPoint):
+            quotes.append(res)
+
+    not_modified, quotes, version = quote_versions.respond(
+        [(q.symbol, q) for q in quotes], response, if_none_match, since
+    )
+    if not_modified is not None:
+        return not_modified
+    return {"quotes": quotes, **version}
     
 @app.get("/api/v1/quote/{symbol}", response_model=MarketDataPoint)
 async def get_quote(symbol: str):
     symbol = symbol.upper()
+    quote_prewarmer.record_access(symbol)
     
     # Check cache
-    if symbol in price_cache:
-        cached_data, cached_time = price_cache[symbol]
-        if (datetime.utcnow() - cached_time).seconds < CACHE_TTL_SECONDS:
-            return cached_data
-
-    async with httpx.AsyncClient() as client:
-        # Try Finnhub first (Primary)
-        data = await fetch_finnhub_quote(client, symbol)
-        
-        # Fallback to Alpha Vantage
-        if not data:
-            print(f"Falling back to Alpha Vantage for {symbol}")
-            data = await fetch_alpha_vantage_quote(client, symbol)
+    with span("cache.quote", symbol=symbol) as lookup:
+        fresh = symbol in price_cache and (datetime.utcnow() - price_cache[symbol][1]).seconds < CACHE_TTL_SECONDS
+        lookup.set_attribute("cache.hit", fresh)
+    if fresh:
+        return price_cache[symbol][0]
 
-        if not data:
-            raise HTTPException(status_code=404, detail="Symbol not found or API limits reached")
+    data = await refresh_quote(symbol)
+    if not data:
+        raise HTTPException(status_code=404, detail="Symbol not found or API limits reached")
+    
+    return data
 
-        # Cache and return
-        price_cache[symbol] = (data, datetime.utcnow())
-        
-        return data
+@app.post("/api/v1/ticks", status_code=202)
+async def ingest_ticks(ticks: List[TickIn] = Body(..., description="Ticks to publish and persist")):
+    """
+    Streaming ingestion: publish ticks to raw_market_data and queue them for batched COPY
+    into market_data (when persistence is on). Waits briefly for queue space when the sink
+    is saturated; 503 when nothing could be queued or the bus pushed back.
+    """
+    messages = []
+    for t in ticks:
+        message = t.model_dump(mode="json")
+        message["symbol"] = message["symbol"].upper()
+        messages.append(message)
+    try:
+        for message in messages:
+            await event_bus.publish(KAFKA_TOPIC_RAW_MARKET, message, key=message["symbol"])
+    except BusFull as e:
+        return JSONResponse(status_code=503, content={"detail": str(e)}, headers={"Retry-After": "1"})
+    if not tick_sink.running:
+        return {"accepted": 0, "dropped": 0, "published": len(messages)}
+    rows = [tick_row(t.symbol.upper(), t.price, t.volume, t.timestamp, t.bid, t.ask, t.source) for t in ticks]
+    accepted = await tick_sink.put_many(rows, timeout=TICK_SINK_PUT_TIMEOUT)
+    if rows and not accepted:
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Tick queue is full", "accepted": 0, "dropped": len(rows), "published": len(messages)},
+            headers={"Retry-After": "1"}
+        )
+    return {"accepted": accepted, "dropped": len(rows) - accepted, "published": len(messages)}
+
+@app.get("/api/v1/history/{symbol}")
+async def get_history(
+    symbol: str,
+    resolution: str = Query("1d", description=f"Bar size: {', '.join(HISTORY_RESOLUTIONS)}"),
+    start: Optional[datetime] = Query(None, description="Inclusive start (UTC), rounded down to its bar; defaults to `limit` bars before end"),
+    end: Optional[datetime] = Query(None, description="Exclusive end (UTC); defaults to now"),
+    limit: int = Query(5000, ge=1, le=HISTORY_MAX_LIMIT),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    format: str = Query("json", description=f"Encoding: {', '.join(HISTORY_FORMATS)}")
+):
+    """
+    OHLCV bars. Minute resolutions come from raw market_data, hourly and coarser from the
+    market_data_hourly continuous aggregate. Pages are keyset-paged via next_cursor.
+    """
+    symbol = symbol.upper()
+    if format not in HISTORY_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(HISTORY_FORMATS)}")
+    try:
+        range_start, range_end = resolve_range(resolution, start, end, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    pool = await get_pool()
+    if pool is None:
+        raise HTTPException(status_code=503, detail="Historical data store unavailable")
+    
+    with span("history.query", symbol=symbol, resolution=resolution, limit=limit):
+        rows = await fetch_bars(pool, symbol, resolution, range_start, range_end, limit)
+    rows, next_cursor = paginate(rows, resolution, limit)
+    meta = {
+        "symbol": symbol,
+        "resolution": resolution,
+        "start": range_start.isoformat(),
+        "end": range_end.isoformat(),
+        "next_cursor": next_cursor
+    }
     
-async def publish_to_kafka(topic: str, message: dict):
-    # Stub for Kafka publishing
-    print(f"[Kafka] Publishing to {topic}: {message['symbol']} ${message['price']}")
+    if format == "json":
+        return {**meta, "count": len(rows), "bars": to_records(rows)}
+    columns = to_columns(rows)
+    if format == "columnar":
+        return {**meta, "count": len(rows), "columns": columns}
+    return Response(
+        content=to_binary(columns, meta),
+        media_type=BINARY_MEDIA_TYPE,
+        headers={"X-Next-Cursor": next_cursor} if next_cursor else None
+    )
+
+@app.post("/api/v1/upstream/alpha-vantage/permit")
+async def alpha_vantage_permit(
+    timeout: float = Query(5.0, ge=0, le=30, description="Seconds to wait for a permit")
+):
+    """
+    Take an interactive permit from the shared Alpha Vantage quota for a caller outside
+    these services (the Next.js API routes use the same key). 429 with Retry-After when
+    none frees up within the timeout. Internal only; the gateway does not route it.
+    """
+    await alpha_vantage_quota.acquire(INTERACTIVE, timeout=timeout)
+    return {"granted": True}
+
+@app.post("/api/v1/upstream/alpha-vantage/result")
+async def alpha_vantage_result(throttled: bool = Query(False, description="Whether Alpha Vantage throttled the call")):
+    """Report how an externally made call went, so throttling lowers the shared rate"""
+    if throttled:
+        await alpha_vantage_quota.record_throttle()
+    else:
+        await alpha_vantage_quota.record_success()
+    return {"throttled": throttled}
+
+@app.get("/api/v1/metrics")
+async def get_metrics():
+    """Cache and prewarm statistics"""
+    return {
+        "price_cache": {"symbols": len(price_cache), "ttl_seconds": CACHE_TTL_SECONDS},
+        "prewarm": quote_prewarmer.metrics(),
+        "snapshot": cache_snapshotter.metrics(),
+        "tick_sink": tick_sink.metrics(),
+        "upstream_quota": await alpha_vantage_quota.metrics(),
+        "upstream_transport": transport_metrics(),
+        "quote_versions": quote_versions.metrics(),
+        "event_bus": event_bus.metrics()
+    }
 
 if __name__ == "__main__":
     import uvicorn
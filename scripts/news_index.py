@@ -0,0 +1,162 @@
+"""
+News Inverted Index
+In-memory search over ingested articles by ticker, topic, source, headline term,
+sentiment class and time, without any upstream call.
+
+Articles are grouped into time segments (by published_at). Each segment keeps
+postings as integer bitmaps (bit i = i-th article in the segment), so boolean
+queries are a handful of big-int AND/OR operations. Memory is bounded by
+dropping whole segments once they fall out of the retention window.
+"""
+
+import time
+from typing import Dict, Iterable, List, Optional
+
+from sentiment_aggregates import BULLISH_THRESHOLD, BEARISH_THRESHOLD
+from sentiment_lexicon import tokenize
+
+def sentiment_class(score: float) -> str:
+    if score >= BULLISH_THRESHOLD:
+        return "bullish"
+    if score <= BEARISH_THRESHOLD:
+        return "bearish"
+    return "neutral"
+
+class Segment:
+    """Articles published within [start, start + span)"""
+
+    __slots__ = ("start", "docs", "timestamps", "postings")
+
+    def __init__(self, start: float):
+        self.start = start
+        self.docs: List[Dict] = []
+        self.timestamps: List[float] = []
+        self.postings: Dict[str, int] = {}
+
+    def add(self, doc: Dict, published_ts: float, keys: Iterable[str]):
+        bit = 1 << len(self.docs)
+        self.docs.append(doc)
+        self.timestamps.append(published_ts)
+        postings = self.postings
+        for key in keys:
+            postings[key] = postings.get(key, 0) | bit
+
+    def match(self, clauses: List[List[str]]) -> int:
+        """AND across clauses, OR within a clause"""
+        mask = (1 << len(self.docs)) - 1
+        for clause in clauses:
+            any_of = 0
+            for key in clause:
+                any_of |= self.postings.get(key, 0)
+            mask &= any_of
+            if not mask:
+                break
+        return mask
+
+class NewsSearchIndex:
+    """Time-segmented inverted index with bitmap postings"""
+
+    def __init__(self, segment_seconds: int = 3600, retention_seconds: int = 72 * 3600):
+        self.segment_seconds = segment_seconds
+        self.retention_seconds = retention_seconds
+        self._segments: Dict[float, Segment] = {}
+        self._ids: Dict[str, float] = {}  # article id -> segment start, for dedup and eviction
+        self.stats = {"indexed": 0, "evicted": 0, "queries": 0}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @staticmethod
+    def keys_for(doc: Dict) -> List[str]:
+        keys = [f"sym:{s.upper()}" for s in doc.get("symbols", []) if s]
+        keys += [f"topic:{t}" for t in doc.get("topics", []) if t]
+        keys.append(f"src:{doc.get('source', '').lower()}")
+        keys.append(f"sent:{sentiment_class(doc.get('sentiment_score', 0.0))}")
+        keys += [f"term:{token}" for token in set(tokenize(doc.get("headline", "")))]
+        return keys
+
+    def add(self, doc: Dict, published_ts: float, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        doc_id = doc.get("id")
+        if doc_id in self._ids or published_ts < now - self.retention_seconds:
+            return False
+        start = published_ts - published_ts % self.segment_seconds
+        segment = self._segments.get(start)
+        if segment is None:
+            segment = self._segments[start] = Segment(start)
+            self.evict(now)
+        segment.add(doc, published_ts, self.keys_for(doc))
+        self._ids[doc_id] = start
+        self.stats["indexed"] += 1
+        return True
+
+    def evict(self, now: Optional[float] = None):
+        """Drop whole segments that ended before the retention cutoff"""
+        now = time.time() if now is None else now
+        cutoff = now - self.retention_seconds
+        for start in [s for s in self._segments if s + self.segment_seconds <= cutoff]:
+            segment = self._segments.pop(start)
+            for doc in segment.docs:
+                self._ids.pop(doc.get("id"), None)
+            self.stats["evicted"] += len(segment.docs)
+
+    def search(
+        self,
+        symbols: Iterable[str] = (),
+        topics: Iterable[str] = (),
+        sources: Iterable[str] = (),
+        terms: Iterable[str] = (),
+        sentiment: Iterable[str] = (),
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: int = 20
+    ) -> List[Dict]:
+        """
+        Newest-first articles matching every given field; values within a field are OR-ed,
+        headline terms are AND-ed. Segments are scanned newest first and the scan stops as
+        soon as `limit` results are found, since older segments cannot contain newer articles.
+        """
+        self.stats["queries"] += 1
+        self.evict()
+        clauses: List[List[str]] = []
+        if symbols:
+            clauses.append([f"sym:{s.upper()}" for s in symbols])
+        if topics:
+            clauses.append([f"topic:{t.lower()}" for t in topics])
+        if sources:
+            clauses.append([f"src:{s.lower()}" for s in sources])
+        if sentiment:
+            clauses.append([f"sent:{s.lower()}" for s in sentiment])
+        for term in terms:
+            for token in tokenize(term):
+                clauses.append([f"term:{token}"])
+
+        results: List[Dict] = []
+        for start in sorted(self._segments, reverse=True):
+            if since is not None and start + self.segment_seconds <= since:
+                break
+            if until is not None and start > until:
+                continue
+            segment = self._segments[start]
+            mask = segment.match(clauses)
+            hits = []
+            while mask:
+                low = mask & -mask
+                idx = low.bit_length() - 1
+                mask ^= low
+                ts = segment.timestamps[idx]
+                if (since is None or ts >= since) and (until is None or ts <= until):
+                    hits.append((ts, idx))
+            hits.sort(reverse=True)
+            results.extend(segment.docs[idx] for _, idx in hits)
+            if len(results) >= limit:
+                break
+        return results[:limit]
+
+    def metrics(self) -> Dict:
+        return {
+            **self.stats,
+            "articles": len(self._ids),
+            "segments": len(self._segments),
+            "postings": sum(len(s.postings) for s in self._segments.values())
+        }
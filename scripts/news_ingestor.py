@@ -5,28 +5,122 @@ and applies FinBERT sentiment analysis before publishing to Kafka
 """
 
 import asyncio
+import hashlib
 import json
 import os
-from datetime import datetime, timedelta
-from typing import Optional, List, Dict
-from fastapi import FastAPI, HTTPException, Query
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Optional, List, Dict, Tuple
+from urllib.parse import urlsplit, urlunsplit
+from fastapi import FastAPI, HTTPException, Query, Body, Request
 from pydantic import BaseModel
 import httpx
 
+from sentiment_lexicon import default_engine as lexicon_engine, LEXICON_VERSION, score_texts
+from sentiment_memo import SentimentMemo, content_key
+from finbert_service import FinBERTBatcher, DEFAULT_MODEL_NAME
+from sentiment_aggregates import SentimentAggregateIndex, parse_windows
+from news_index import NewsSearchIndex
+from bulk_scoring import stream_bulk_scores, DuplexStreamingResponse
+from news_shards import ShardedNewsCache, ShardKey, normalize_query, shard_keys
+from cache_snapshot import CacheSnapshotter
+from event_bus import event_bus
+from prewarm import PrewarmScheduler
+from profiling import router as profiling_router
+from tracing import init_tracing, instrument_app, shutdown_tracing, span
+from upstream import (
+    alpha_vantage_get, alpha_vantage_quota, close_http_client, priority_scope,
+    QuotaExceeded, quota_exceeded_handler, transport_metrics, BACKFILL
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_tracing("news-ingestor")
+    await event_bus.start()
+    await start_sentiment_backend()
+    await sentiment_memo.open()
+    incremental_ingestor.load_state()
+    tasks = [asyncio.create_task(sentiment_memo.run())]
+    if CACHE_SNAPSHOT_ENABLED:
+        cache_snapshotter.restore()
+        tasks.append(asyncio.create_task(cache_snapshotter.run()))
+    if NEWS_INGEST_ENABLED and ALPHA_VANTAGE_API_KEY:
+        tasks.append(asyncio.create_task(incremental_ingestor.run()))
+    if PREWARM_ENABLED and ALPHA_VANTAGE_API_KEY:
+        tasks.append(asyncio.create_task(shard_prewarmer.run()))
+    yield
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    if CACHE_SNAPSHOT_ENABLED:
+        await cache_snapshotter.save()
+    await event_bus.stop()
+    await close_http_client()
+    incremental_ingestor.save_state()
+    if bulk_pool:
+        bulk_pool.shutdown(wait=False, cancel_futures=True)
+    await stop_sentiment_backend()
+    await sentiment_memo.close()
+    shutdown_tracing()
+
 app = FastAPI(
     title="News-Ingestor",
     description="News ingestion with Alpha Vantage News Sentiment + FinBERT analysis",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
+app.add_exception_handler(QuotaExceeded, quota_exceeded_handler)
+app.include_router(profiling_router)
+instrument_app(app)
 
 ALPHA_VANTAGE_API_KEY = os.getenv("ALPHA_VANTAGE_API_KEY")
-ALPHA_VANTAGE_BASE_URL = "https://www.alphavantage.co/query"
 
 # Kafka configuration
 KAFKA_BOOTSTRAP_SERVERS = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "localhost:9092")
 KAFKA_TOPIC_RAW_NEWS = "raw_news_articles"
 KAFKA_TOPIC_SENTIMENT = "sentiment_scores"
 
+# Sentiment backend: "lexicon" (keyword engine) or "finbert" (CPU transformer, micro-batched)
+SENTIMENT_BACKEND = os.getenv("SENTIMENT_BACKEND", "lexicon").lower()
+FINBERT_MODEL = os.getenv("FINBERT_MODEL", DEFAULT_MODEL_NAME)
+FINBERT_MAX_BATCH_SIZE = int(os.getenv("FINBERT_MAX_BATCH_SIZE", "32"))
+FINBERT_MAX_WAIT_MS = float(os.getenv("FINBERT_MAX_WAIT_MS", "10"))
+FINBERT_NUM_THREADS = int(os.getenv("FINBERT_NUM_THREADS", "0")) or None
+
+# Sentiment memo: scores keyed by normalized content hash + scorer version, persisted across restarts
+SENTIMENT_MEMO_PATH = os.getenv("SENTIMENT_MEMO_PATH", "data/sentiment_memo.sqlite3")
+SENTIMENT_MEMO_SIZE = int(os.getenv("SENTIMENT_MEMO_SIZE", "50000"))
+SENTIMENT_MEMO_FLUSH_SECONDS = float(os.getenv("SENTIMENT_MEMO_FLUSH_SECONDS", "2"))
+
+# Background incremental ingestion: polls each ticker/topic feed from its last-seen watermark
+# Off by default: at the default interval every feed costs 96 calls a day, beyond a free key's quota
+NEWS_INGEST_ENABLED = os.getenv("NEWS_INGEST_ENABLED", "false").lower() == "true"
+NEWS_INGEST_TICKERS = [t.strip().upper() for t in os.getenv("NEWS_INGEST_TICKERS", "AAPL,NVDA,TSLA").split(",") if t.strip()]
+NEWS_INGEST_TOPICS = [t.strip().lower() for t in os.getenv("NEWS_INGEST_TOPICS", "technology,earnings").split(",") if t.strip()]
+NEWS_INGEST_INTERVAL_SECONDS = int(os.getenv("NEWS_INGEST_INTERVAL_SECONDS", "900"))
+NEWS_INGEST_LOOKBACK_HOURS = int(os.getenv("NEWS_INGEST_LOOKBACK_HOURS", "24"))
+NEWS_INGEST_MAX_PAGES = int(os.getenv("NEWS_INGEST_MAX_PAGES", "5"))
+NEWS_INGEST_STATE_PATH = os.getenv("NEWS_INGEST_STATE_PATH", "data/news_ingest_state.json")
+
+# Decayed per-ticker sentiment: window half-lives, e.g. "1h,24h,7d"
+SENTIMENT_AGGREGATE_WINDOWS = parse_windows(os.getenv("SENTIMENT_AGGREGATE_WINDOWS", "1h,24h,7d"))
+SENTIMENT_AGGREGATE_DEFAULT_WINDOW = os.getenv("SENTIMENT_AGGREGATE_DEFAULT_WINDOW", "24h")
+# A ticker's aggregate is refetched once its feed was last read longer ago than this,
+# unless the background ingest polls that ticker
+SENTIMENT_AGGREGATE_TTL_SECONDS = int(os.getenv("SENTIMENT_AGGREGATE_TTL_SECONDS", "900"))
+
+# In-memory search index over ingested articles, bounded by time-based segment eviction
+NEWS_INDEX_SEGMENT_MINUTES = int(os.getenv("NEWS_INDEX_SEGMENT_MINUTES", "60"))
+NEWS_INDEX_RETENTION_HOURS = int(os.getenv("NEWS_INDEX_RETENTION_HOURS", "72"))
+
+# Bulk scoring: lexicon chunks are fanned out across a process pool
+BULK_SCORING_WORKERS = int(os.getenv("BULK_SCORING_WORKERS", "0")) or os.cpu_count() or 1
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+# Bulk jobs are mostly one-off texts; memoizing them would write a memo row per item
+BULK_SENTIMENT_MEMO = os.getenv("BULK_SENTIMENT_MEMO", "false").lower() == "true"
+
 class NewsArticle(BaseModel):
     id: str
     headline: str
@@ -39,6 +133,8 @@ class NewsArticle(BaseModel):
     sentiment_label: str
     relevance_score: float
     banner_image: Optional[str] = None
+    ticker_scores: Dict[str, float] = {}
+    topics: List[str] = []
 
 class SentimentResult(BaseModel):
     text: str
@@ -55,9 +151,34 @@ class ServiceHealth(BaseModel):
     api_provider: str
     last_update: str
 
-# Cache for news to avoid rate limits
-news_cache: Dict[str, tuple] = {}
+# Cache for news to avoid rate limits: articles sharded per ticker / topic
 CACHE_TTL_SECONDS = 300
+NEWS_SHARD_FETCH_LIMIT = 50
+news_cache = ShardedNewsCache(CACHE_TTL_SECONDS)
+# Latest sentiment_score_definition returned by Alpha Vantage
+news_feed_label = ""
+
+# Prewarming budget for Alpha Vantage NEWS_SENTIMENT calls made ahead of demand
+PREWARM_ENABLED = os.getenv("PREWARM_ENABLED", "true").lower() == "true"
+PREWARM_PER_MINUTE_BUDGET = int(os.getenv("PREWARM_PER_MINUTE_BUDGET", "2"))
+PREWARM_DAILY_BUDGET = int(os.getenv("PREWARM_DAILY_BUDGET", "200"))
+PREWARM_LEAD_SECONDS = float(os.getenv("PREWARM_LEAD_SECONDS", "20"))
+
+# Warm-start snapshots of the news shards, restored on startup
+CACHE_SNAPSHOT_ENABLED = os.getenv("CACHE_SNAPSHOT_ENABLED", "true").lower() == "true"
+CACHE_SNAPSHOT_PATH = os.getenv("CACHE_SNAPSHOT_PATH", "data/news_cache_snapshot.json.gz")
+CACHE_SNAPSHOT_INTERVAL_SECONDS = float(os.getenv("CACHE_SNAPSHOT_INTERVAL_SECONDS", "60"))
+
+cache_snapshotter = CacheSnapshotter(CACHE_SNAPSHOT_PATH, CACHE_SNAPSHOT_INTERVAL_SECONDS)
+cache_snapshotter.register(
+    "news_cache",
+    lambda: news_cache.snapshot(lambda article: article.model_dump(mode="json")),
+    lambda entries: news_cache.restore(entries, NewsArticle.model_validate)
+)
+
+sentiment_memo = SentimentMemo(SENTIMENT_MEMO_PATH or None, SENTIMENT_MEMO_SIZE, SENTIMENT_MEMO_FLUSH_SECONDS)
+sentiment_index = SentimentAggregateIndex(SENTIMENT_AGGREGATE_WINDOWS, SENTIMENT_AGGREGATE_DEFAULT_WINDOW)
+search_index = NewsSearchIndex(NEWS_INDEX_SEGMENT_MINUTES * 60, NEWS_INDEX_RETENTION_HOURS * 3600)
 
 def get_sentiment_label(score: float) -> str:
     """Convert Alpha Vantage sentiment score to label"""
@@ -82,45 +203,381 @@ def format_alpha_vantage_date(date_str: str) -> str:
     except:
         return datetime.utcnow().isoformat()
 
+# Feed topic names whose NEWS_SENTIMENT query parameter is not a plain slug
+TOPIC_PARAM_NAMES = {
+    "mergers & acquisitions": "mergers_and_acquisitions",
+    "retail & wholesale": "retail_wholesale",
+    "energy & transportation": "energy_transportation",
+    "real estate & construction": "real_estate",
+}
+
+def normalize_topic(topic: str) -> str:
+    """Map a feed topic name ("Economy - Monetary") to its query slug ("economy_monetary")"""
+    topic = topic.strip().lower()
+    if topic in TOPIC_PARAM_NAMES:
+        return TOPIC_PARAM_NAMES[topic]
+    return "_".join(part for part in topic.replace("-", " ").replace("&", " ").split())
+
+def published_timestamp(article: NewsArticle) -> float:
+    """Epoch seconds of an article's published_at (naive ISO, UTC)"""
+    try:
+        return datetime.fromisoformat(article.published_at).replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        return datetime.now(timezone.utc).timestamp()
+
+def article_external_id(url: str, fallback: str = "") -> str:
+    """
+    Stable article id derived from its URL (scheme/host lowercased, fragment dropped),
+    used both as the API id and as news_articles.external_id
+    """
+    url = (url or "").strip()
+    if url and url != "#":
+        parts = urlsplit(url)
+        canonical = urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, parts.query, ""))
+    else:
+        canonical = fallback
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+def feed_item_id(item: dict) -> str:
+    """Stable id of a NEWS_SENTIMENT feed item (title + timestamp when the URL is missing)"""
+    return article_external_id(item.get("url", ""), item.get("title", "") + item.get("time_published", ""))
+
 # Enhanced FinBERT-style sentiment analysis
 def analyze_sentiment_finbert(text: str) -> SentimentResult:
     """
-    Enhanced FinBERT-style sentiment analysis.
+    Enhanced FinBERT-style sentiment analysis backed by the compiled lexicon engine.
     In production, use: from transformers import AutoModelForSequenceClassification
     model = AutoModelForSequenceClassification.from_pretrained("ProsusAI/finbert")
     """
-    positive_keywords = [
-        "surge", "growth", "profit", "bullish", "upgrade", "record", "beat", 
-        "strong", "soar", "rally", "gain", "boom", "breakthrough", "optimistic",
-        "outperform", "exceed", "momentum", "upside", "buy", "accumulate"
+    score, label, confidence = lexicon_engine.score(text)
+    return SentimentResult(text=text[:100], score=score, label=label, confidence=confidence)
+
+def analyze_sentiment_batch(texts: List[str]) -> List[SentimentResult]:
+    """Score a list of headlines in one call using the compiled lexicon engine"""
+    return [
+        SentimentResult(text=text[:100], score=score, label=label, confidence=confidence)
+        for text, (score, label, confidence) in zip(texts, lexicon_engine.score_batch(texts))
     ]
-    negative_keywords = [
-        "crash", "loss", "bearish", "downgrade", "miss", "weak", "decline", 
-        "concern", "fall", "drop", "plunge", "risk", "warning", "sell",
-        "underperform", "cut", "layoff", "recession", "default", "bankruptcy"
+
+# FinBERT batcher, started in lifespan when SENTIMENT_BACKEND=finbert
+finbert_batcher: Optional[FinBERTBatcher] = None
+
+async def start_sentiment_backend():
+    global finbert_batcher
+    if SENTIMENT_BACKEND != "finbert":
+        return
+    batcher = FinBERTBatcher(
+        model_name=FINBERT_MODEL,
+        max_batch_size=FINBERT_MAX_BATCH_SIZE,
+        max_wait_ms=FINBERT_MAX_WAIT_MS,
+        num_threads=FINBERT_NUM_THREADS
+    )
+    try:
+        await batcher.start()
+        finbert_batcher = batcher
+    except Exception as e:
+        # Missing torch/transformers or model files: keep serving with the lexicon engine
+        print(f"[FinBERT] Failed to load {FINBERT_MODEL}, falling back to lexicon: {e}")
+        await batcher.stop()
+
+async def stop_sentiment_backend():
+    global finbert_batcher
+    if finbert_batcher:
+        await finbert_batcher.stop()
+        finbert_batcher = None
+
+def finbert_active() -> bool:
+    return finbert_batcher is not None and finbert_batcher.loaded
+
+def scorer_version() -> str:
+    """Identifies the active scorer so memoized scores never mix backends"""
+    if finbert_active():
+        return f"finbert:{finbert_batcher.model_name}"
+    return LEXICON_VERSION
+
+async def score_sentiment(
+    texts: List[str],
+    executor: Optional[ProcessPoolExecutor] = None,
+    memoize: bool = True
+) -> List[SentimentResult]:
+    """
+    Score texts with FinBERT when loaded, otherwise with the lexicon engine
+    (inline, or in `executor` for large batches).
+    Results are memoized by content hash, so each unique text is scored once;
+    with memoize=False duplicates are only collapsed within the call.
+    """
+    version = scorer_version()
+    keys = [content_key(text, version) for text in texts]
+    scores: Dict[str, Tuple[float, str, float]] = {}
+    if memoize:
+        with span("cache.sentiment_memo", texts=len(keys)) as lookup:
+            scores = await sentiment_memo.get_many(keys)
+            lookup.set_attribute("cache.hits", len(scores))
+
+    pending: Dict[str, str] = {}
+    for key, text in zip(keys, texts):
+        if key not in scores:
+            pending.setdefault(key, text)
+
+    if pending:
+        pending_texts = list(pending.values())
+        with span("sentiment.score", backend=version, texts=len(pending_texts)):
+            if finbert_active():
+                fresh = await finbert_batcher.score_many(pending_texts)
+            elif executor is not None:
+                fresh = await asyncio.get_running_loop().run_in_executor(executor, score_texts, pending_texts)
+            else:
+                fresh = lexicon_engine.score_batch(pending_texts)
+        fresh_scores = dict(zip(pending.keys(), fresh))
+        if memoize:
+            sentiment_memo.put_many(fresh_scores)
+        scores.update(fresh_scores)
+
+    return [
+        SentimentResult(text=text[:100], score=scores[key][0], label=scores[key][1], confidence=scores[key][2])
+        for text, key in zip(texts, keys)
     ]
+
+async def fetch_news_sentiment(**params) -> dict:
+    """Call NEWS_SENTIMENT under the shared quota, raising HTTPException on upstream errors and rate limits"""
+    response = await alpha_vantage_get(
+        params={"function": "NEWS_SENTIMENT", **params, "apikey": ALPHA_VANTAGE_API_KEY},
+        timeout=30.0
+    )
     
-    text_lower = text.lower()
-    pos_count = sum(1 for word in positive_keywords if word in text_lower)
-    neg_count = sum(1 for word in negative_keywords if word in text_lower)
+    if response.status_code != 200:
+        raise HTTPException(status_code=response.status_code, detail="Failed to fetch news")
     
-    total = pos_count + neg_count
-    if total == 0:
-        return SentimentResult(text=text[:100], score=0.0, label="neutral", confidence=0.5)
+    data = response.json()
     
-    score = (pos_count - neg_count) / max(total, 1) * 0.8
-    score = max(-1.0, min(1.0, score))
+    # Check for rate limit
+    if "Note" in data or "Information" in data:
+        raise HTTPException(status_code=429, detail="API rate limit reached")
     
-    if score > 0.15:
-        label = "positive"
-    elif score < -0.15:
-        label = "negative"
-    else:
-        label = "neutral"
+    return data
+
+def build_article(item: dict, finbert_result: SentimentResult) -> NewsArticle:
+    """Turn a NEWS_SENTIMENT feed item into a NewsArticle with a stable id"""
+    # Get ticker-specific sentiment
+    ticker_sentiment = item.get("ticker_sentiment", [])
+    symbols = [ts.get("ticker", "") for ts in ticker_sentiment]
     
-    confidence = min(0.95, 0.5 + abs(score) * 0.5)
+    # Use overall sentiment from Alpha Vantage
+    overall_score = item.get("overall_sentiment_score", 0)
     
-    return SentimentResult(text=text[:100], score=round(score, 3), label=label, confidence=round(confidence, 3))
+    # Combine scores (weighted average)
+    combined_score = (overall_score * 0.6) + (finbert_result.score * 0.4)
+    
+    return NewsArticle(
+        id=feed_item_id(item),
+        headline=item.get("title", ""),
+        summary=item.get("summary", "")[:500],
+        source=item.get("source", "Unknown"),
+        url=item.get("url", "#"),
+        published_at=format_alpha_vantage_date(item.get("time_published", "")),
+        symbols=symbols,
+        sentiment_score=round(combined_score, 3),
+        sentiment_label=get_sentiment_label(combined_score),
+        relevance_score=float(ticker_sentiment[0].get("relevance_score", 0.5)) if ticker_sentiment else 0.5,
+        banner_image=item.get("banner_image"),
+        ticker_scores={
+            ts.get("ticker", "").upper(): float(ts.get("ticker_sentiment_score", 0))
+            for ts in ticker_sentiment if ts.get("ticker")
+        },
+        topics=[normalize_topic(t.get("topic", "")) for t in item.get("topics", []) if t.get("topic")]
+    )
+
+def index_article(article: NewsArticle):
+    """Fold a newly seen article into the in-memory indexes"""
+    published_ts = published_timestamp(article)
+    for ticker, score in article.ticker_scores.items():
+        sentiment_index.update(ticker, score, published_ts)
+    search_index.add(article.model_dump(), published_ts)
+
+async def publish_new_articles(articles: List[NewsArticle]) -> List[NewsArticle]:
+    """
+    Index and publish only articles that have not been seen before (deduplicated by
+    stable id), so each article updates the aggregates and is published exactly once
+    """
+    new_articles = incremental_ingestor.filter_new(articles)
+    for article in new_articles:
+        index_article(article)
+        await event_bus.publish(
+            KAFKA_TOPIC_RAW_NEWS, article.model_dump(), key=article.symbols[0] if article.symbols else None
+        )
+    return new_articles
+
+class IncrementalNewsIngestor:
+    """
+    Polls NEWS_SENTIMENT per ticker and per topic with a time_from watermark, so
+    each cycle only pulls articles newer than the last one seen for that feed.
+    Pages are requested oldest first. The watermark therefore only moves past
+    articles that were actually returned, and a full page is followed by the
+    next one (up to max_pages per cycle) instead of skipping the rest of the
+    window. Articles are deduplicated by their stable URL hash before scoring
+    and publishing.
+    """
+
+    def __init__(
+        self,
+        tickers: List[str],
+        topics: List[str],
+        interval_seconds: int,
+        lookback_hours: int,
+        state_path: Optional[str] = None,
+        max_seen: int = 100000,
+        batch_limit: int = 200,
+        max_pages: int = 5
+    ):
+        self.feeds: List[Tuple[str, str]] = [("tickers", t) for t in tickers] + [("topics", t) for t in topics]
+        self.interval_seconds = interval_seconds
+        self.lookback_hours = lookback_hours
+        self.state_path = state_path
+        self.max_seen = max_seen
+        self.batch_limit = batch_limit
+        self.max_pages = max_pages
+        # Feed key ("tickers:AAPL") -> newest time_published seen, in Alpha Vantage format
+        self.watermarks: Dict[str, str] = {}
+        self.seen: "OrderedDict[str, None]" = OrderedDict()
+        self.stats = {"polls": 0, "pages": 0, "fetched": 0, "new": 0, "duplicates": 0, "errors": 0}
+
+    def filter_new(self, articles: List[NewsArticle]) -> List[NewsArticle]:
+        """Return unseen articles and mark them as seen"""
+        new_articles = []
+        for article in articles:
+            if article.id in self.seen:
+                self.seen.move_to_end(article.id)
+                self.stats["duplicates"] += 1
+                continue
+            self.seen[article.id] = None
+            new_articles.append(article)
+        while len(self.seen) > self.max_seen:
+            self.seen.popitem(last=False)
+        self.stats["new"] += len(new_articles)
+        return new_articles
+
+    def load_state(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+            self.watermarks.update(state.get("watermarks", {}))
+            for article_id in state.get("seen", []):
+                self.seen[article_id] = None
+        except Exception as e:
+            print(f"[NewsIngest] Could not load state from {self.state_path}: {e}")
+
+    def save_state(self):
+        if not self.state_path:
+            return
+        try:
+            directory = os.path.dirname(self.state_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Only the most recent ids matter: older ones fall behind the watermarks
+            recent = list(self.seen)[-5000:]
+            tmp_path = self.state_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"watermarks": self.watermarks, "seen": recent}, f)
+            os.replace(tmp_path, self.state_path)
+        except Exception as e:
+            print(f"[NewsIngest] Could not save state to {self.state_path}: {e}")
+
+    async def poll_feed(self, kind: str, value: str) -> List[NewsArticle]:
+        """Pull a feed forward from its watermark, one page after another while pages come back full"""
+        self.stats["polls"] += 1
+        new_articles: List[NewsArticle] = []
+        for _ in range(self.max_pages):
+            page_articles, full = await self.poll_page(kind, value)
+            new_articles += page_articles
+            if not full:
+                break
+        if kind == "tickers":
+            sentiment_index.mark_fed(value)
+        return new_articles
+
+    async def poll_page(self, kind: str, value: str) -> Tuple[List[NewsArticle], bool]:
+        """Fetch the oldest page after the watermark; returns its new articles and whether to keep paging"""
+        feed_key = f"{kind}:{value}"
+        watermark = self.watermarks.get(feed_key)
+        if watermark:
+            time_from = watermark[:13]  # time_from takes YYYYMMDDTHHMM
+        else:
+            time_from = (datetime.utcnow() - timedelta(hours=self.lookback_hours)).strftime("%Y%m%dT%H%M")
+
+        data = await fetch_news_sentiment(
+            **{kind: value}, time_from=time_from, sort="EARLIEST", limit=self.batch_limit
+        )
+        self.stats["pages"] += 1
+        feed = data.get("feed", [])
+        self.stats["fetched"] += len(feed)
+        if not feed:
+            return [], False
+
+        newest = max(item.get("time_published", "") for item in feed)
+        if newest > (watermark or ""):
+            self.watermarks[feed_key] = newest
+        # A full page that ends in the minute it started from cannot move time_from forward
+        full = len(feed) >= self.batch_limit and newest[:13] > time_from
+
+        # Drop already-seen articles before paying for scoring
+        fresh_items = [item for item in feed if feed_item_id(item) not in self.seen]
+        if not fresh_items:
+            self.stats["duplicates"] += len(feed)
+            return [], full
+        self.stats["duplicates"] += len(feed) - len(fresh_items)
+
+        finbert_results = await score_sentiment([item.get("title", "") for item in fresh_items])
+        articles = [build_article(item, result) for item, result in zip(fresh_items, finbert_results)]
+        new_articles = await publish_new_articles(articles)
+        # Polled feeds line up with news cache shards, so keep a cached shard current
+        news_cache.merge((kind, value), new_articles)
+        return new_articles, full
+
+    async def run_once(self):
+        for kind, value in self.feeds:
+            try:
+                new_articles = await self.poll_feed(kind, value)
+                if new_articles:
+                    print(f"[NewsIngest] {kind}={value}: {len(new_articles)} new articles")
+            except QuotaExceeded:
+                print("[NewsIngest] No upstream quota left, skipping the rest of this cycle")
+                break
+            except HTTPException as e:
+                self.stats["errors"] += 1
+                if e.status_code == 429:
+                    print("[NewsIngest] Rate limited, skipping the rest of this cycle")
+                    break
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"[NewsIngest] {kind}={value} failed: {e}")
+        self.save_state()
+
+    async def run(self):
+        # Background polling yields the upstream quota to interactive and prewarm calls
+        with priority_scope(BACKFILL):
+            while True:
+                await self.run_once()
+                await asyncio.sleep(self.interval_seconds)
+
+incremental_ingestor = IncrementalNewsIngestor(
+    tickers=NEWS_INGEST_TICKERS,
+    topics=NEWS_INGEST_TOPICS,
+    interval_seconds=NEWS_INGEST_INTERVAL_SECONDS,
+    lookback_hours=NEWS_INGEST_LOOKBACK_HOURS,
+    state_path=NEWS_INGEST_STATE_PATH or None,
+    max_pages=NEWS_INGEST_MAX_PAGES
+)
+
+# Process pool for bulk scoring, created on first use
+bulk_pool: Optional[ProcessPoolExecutor] = None
+
+def get_bulk_pool() -> ProcessPoolExecutor:
+    global bulk_pool
+    if bulk_pool is None:
+        bulk_pool = ProcessPoolExecutor(max_workers=BULK_SCORING_WORKERS)
+    return bulk_pool
 
 # @app.get("/")
 # async def root():
@@ -150,94 +607,91 @@ async def get_news(
     limit: int = Query(10, description="Number of articles to return"),
     sort: str = Query("LATEST", description="Sort order: LATEST, EARLIEST, RELEVANCE")
 ):
-    """Fetch news from Alpha Vantage News Sentiment API"""
-    cache_key = f"{tickers}-{topics}-{limit}"
+    """
+    Fetch news from Alpha Vantage News Sentiment API.
+    Articles are cached per ticker (or per topic) shard; any combination is assembled
+    from cached shards and only missing shards are fetched. EARLIEST is fetched
+    as asked, uncached: the shards only hold the latest articles.
+    """
+    ticker_list, topic_list = normalize_query(tickers, topics, normalize_topic)
+    if sort.upper() == "EARLIEST":
+        articles = await fetch_news_uncached(ticker_list, topic_list, min(limit, NEWS_SHARD_FETCH_LIMIT))
+        return {
+            "articles": [a.model_dump() for a in articles],
+            "count": len(articles),
+            "source": "alpha_vantage",
+            "sentiment_feed_label": news_feed_label
+        }
+    keys = shard_keys(ticker_list, topic_list)
+    for key in keys:
+        shard_prewarmer.record_access(key)
+    with span("cache.news_shards", shards=len(keys)) as lookup:
+        missing = news_cache.missing(keys)
+        lookup.set_attribute("cache.misses", len(missing))
     
-    # Check cache
-    if cache_key in news_cache:
-        cached_data, cached_time = news_cache[cache_key]
-        if (datetime.utcnow() - cached_time).seconds < CACHE_TTL_SECONDS:
-            return cached_data
+    if missing:
+        results = await asyncio.gather(*(fetch_news_shard(key) for key in missing), return_exceptions=True)
+        for key, result in zip(missing, results):
+            if not isinstance(result, Exception):
+                continue
+            # A stale shard is still better than failing the whole request
+            if news_cache.has(key):
+                print(f"[News] Refresh of {key} failed, serving stale shard: {result}")
+                continue
+            if isinstance(result, (HTTPException, QuotaExceeded)):
+                raise result
+            if isinstance(result, httpx.TimeoutException):
+                raise HTTPException(status_code=504, detail="Request timeout")
+            raise HTTPException(status_code=500, detail=str(result))
     
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                ALPHA_VANTAGE_BASE_URL,
-                params={
-                    "function": "NEWS_SENTIMENT",
-                    "tickers": tickers,
-                    "topics": topics,
-                    "limit": min(limit, 50),
-                    "sort": sort,
-                    "apikey": ALPHA_VANTAGE_API_KEY
-                },
-                timeout=30.0
-            )
-            
-            if response.status_code != 200:
-                raise HTTPException(status_code=response.status_code, detail="Failed to fetch news")
-            
-            data = response.json()
-            
-            # Check for rate limit
-            if "Note" in data or "Information" in data:
-                raise HTTPException(status_code=429, detail="API rate limit reached")
-            
-            feed = data.get("feed", [])
-            if not feed:
-                return {"articles": [], "count": 0, "source": "alpha_vantage"}
-            
-            articles = []
-            for idx, item in enumerate(feed):
-                # Get ticker-specific sentiment
-                ticker_sentiment = item.get("ticker_sentiment", [])
-                symbols = [ts.get("ticker", "") for ts in ticker_sentiment]
-                
-                # Use overall sentiment from Alpha Vantage
-                overall_score = item.get("overall_sentiment_score", 0)
-                
-                # Also run our FinBERT analysis for comparison
-                finbert_result = analyze_sentiment_finbert(item.get("title", ""))
-                
-                # Combine scores (weighted average)
-                combined_score = (overall_score * 0.6) + (finbert_result.score * 0.4)
-                
-                article = NewsArticle(
-                    id=str(idx),
-                    headline=item.get("title", ""),
-                    summary=item.get("summary", "")[:500],
-                    source=item.get("source", "Unknown"),
-                    url=item.get("url", "#"),
-                    published_at=format_alpha_vantage_date(item.get("time_published", "")),
-                    symbols=symbols,
-                    sentiment_score=round(combined_score, 3),
-                    sentiment_label=get_sentiment_label(combined_score),
-                    relevance_score=float(ticker_sentiment[0].get("relevance_score", 0.5)) if ticker_sentiment else 0.5,
-                    banner_image=item.get("banner_image")
-                )
-                articles.append(article)
-                
-                # Publish to Kafka
-                await publish_to_kafka(KAFKA_TOPIC_RAW_NEWS, article.model_dump())
-            
-            result = {
-                "articles": [a.model_dump() for a in articles],
-                "count": len(articles),
-                "source": "alpha_vantage",
-                "sentiment_feed_label": data.get("sentiment_score_definition", "")
-            }
-            
-            # Cache the result
-            news_cache[cache_key] = (result, datetime.utcnow())
-            
-            return result
-            
-        except httpx.TimeoutException:
-            raise HTTPException(status_code=504, detail="Request timeout")
-        except HTTPException:
-            raise
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+    articles = news_cache.assemble(keys, topic_list, min(limit, NEWS_SHARD_FETCH_LIMIT), sort)
+    return {
+        "articles": [a.model_dump() for a in articles],
+        "count": len(articles),
+        "source": "alpha_vantage",
+        "sentiment_feed_label": news_feed_label
+    }
+
+async def fetch_news_uncached(ticker_list: List[str], topic_list: List[str], limit: int) -> List[NewsArticle]:
+    """Oldest-first articles for a query, fetched and scored without touching the shards"""
+    params = {}
+    if ticker_list:
+        params["tickers"] = ",".join(ticker_list)
+    if topic_list:
+        params["topics"] = ",".join(topic_list)
+    data = await fetch_news_sentiment(**params, limit=limit, sort="EARLIEST")
+    feed = data.get("feed", [])[:limit]
+    finbert_results = await score_sentiment([item.get("title", "") for item in feed])
+    articles = [build_article(item, result) for item, result in zip(feed, finbert_results)]
+    await publish_new_articles(articles)
+    return articles
+
+async def fetch_news_shard(key: ShardKey):
+    """Fetch, score, publish and cache the latest articles for one ticker/topic shard"""
+    global news_feed_label
+    kind, value = key
+    params = {kind: value} if kind in ("tickers", "topics") else {}
+    data = await fetch_news_sentiment(**params, limit=NEWS_SHARD_FETCH_LIMIT, sort="LATEST")
+    news_feed_label = data.get("sentiment_score_definition", news_feed_label)
+    
+    feed = data.get("feed", [])
+    # Also run our FinBERT analysis for comparison, scoring all headlines in one batch
+    finbert_results = await score_sentiment([item.get("title", "") for item in feed])
+    articles = [build_article(item, result) for item, result in zip(feed, finbert_results)]
+    
+    # Publish to Kafka, skipping articles the ingestor (or an earlier request) already published
+    await publish_new_articles(articles)
+    news_cache.put(key, articles)
+
+# Hot shards are refetched shortly before their TTL runs out
+shard_prewarmer = PrewarmScheduler(
+    "news",
+    fetch_news_shard,
+    news_cache.expires_at,
+    per_minute_budget=PREWARM_PER_MINUTE_BUDGET,
+    daily_budget=PREWARM_DAILY_BUDGET,
+    lead_seconds=PREWARM_LEAD_SECONDS
+)
 
 @app.get("/api/v1/news/topics")
 async def get_news_by_topic(
@@ -245,128 +699,162 @@ async def get_news_by_topic(
     limit: int = 10
 ):
     """Get news filtered by specific topic"""
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                ALPHA_VANTAGE_BASE_URL,
-                params={
-                    "function": "NEWS_SENTIMENT",
-                    "topics": topic,
-                    "limit": min(limit, 50),
-                    "apikey": ALPHA_VANTAGE_API_KEY
-                },
-                timeout=30.0
-            )
-            
-            if response.status_code != 200:
-                raise HTTPException(status_code=response.status_code, detail="Failed to fetch news")
-            
-            data = response.json()
-            
-            if "Note" in data or "Information" in data:
-                raise HTTPException(status_code=429, detail="API rate limit reached")
-            
-            feed = data.get("feed", [])
-            
-            articles = []
-            for idx, item in enumerate(feed):
-                sentiment_score = item.get("overall_sentiment_score", 0)
-                articles.append({
-                    "id": str(idx),
-                    "headline": item.get("title", ""),
-                    "summary": item.get("summary", "")[:300],
-                    "source": item.get("source", "Unknown"),
-                    "url": item.get("url", "#"),
-                    "published_at": format_alpha_vantage_date(item.get("time_published", "")),
-                    "sentiment_score": sentiment_score,
-                    "sentiment_label": get_sentiment_label(sentiment_score),
-                    "topics": [t.get("topic", "") for t in item.get("topics", [])]
-                })
-            
-            return {"topic": topic, "articles": articles, "count": len(articles)}
-            
-        except httpx.TimeoutException:
-            raise HTTPException(status_code=504, detail="Request timeout")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+    try:
+        data = await fetch_news_sentiment(topics=topic, limit=min(limit, 50))
+        
+        feed = data.get("feed", [])
+        finbert_results = await score_sentiment([item.get("title", "") for item in feed])
+        
+        articles = []
+        for item, finbert_result in zip(feed, finbert_results):
+            sentiment_score = item.get("overall_sentiment_score", 0)
+            articles.append({
+                "id": feed_item_id(item),
+                "headline": item.get("title", ""),
+                "summary": item.get("summary", "")[:300],
+                "source": item.get("source", "Unknown"),
+                "url": item.get("url", "#"),
+                "published_at": format_alpha_vantage_date(item.get("time_published", "")),
+                "sentiment_score": sentiment_score,
+                "sentiment_label": get_sentiment_label(sentiment_score),
+                "finbert_score": finbert_result.score,
+                "topics": [t.get("topic", "") for t in item.get("topics", [])]
+            })
+        
+        return {"topic": topic, "articles": articles, "count": len(articles)}
+        
+    except QuotaExceeded:
+        raise
+    except httpx.TimeoutException:
+        raise HTTPException(status_code=504, detail="Request timeout")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/v1/news/search")
+async def search_news(
+    symbols: str = Query("", description="Comma-separated tickers (any of)"),
+    topics: str = Query("", description="Comma-separated topics (any of), e.g. earnings,technology"),
+    sources: str = Query("", description="Comma-separated sources (any of)"),
+    q: str = Query("", description="Headline terms (all of)"),
+    sentiment: str = Query("", description="bullish, neutral and/or bearish"),
+    since_hours: Optional[float] = Query(None, description="Only articles from the last N hours"),
+    limit: int = Query(20, ge=1, le=500)
+):
+    """Search ingested articles from the in-memory index, newest first, without calling Alpha Vantage"""
+    split = lambda value: [v.strip() for v in value.split(",") if v.strip()]
+    since = datetime.now(timezone.utc).timestamp() - since_hours * 3600 if since_hours else None
+    articles = search_index.search(
+        symbols=split(symbols),
+        topics=[normalize_topic(t) for t in split(topics)],
+        sources=split(sources),
+        terms=[q] if q else [],
+        sentiment=split(sentiment),
+        since=since,
+        limit=limit
+    )
+    return {"articles": articles, "count": len(articles), "source": "index"}
 
 @app.post("/api/v1/analyze-sentiment")
 async def analyze_text_sentiment(text: str):
-    """Analyze sentiment of custom text using FinBERT-style analysis"""
-    result = analyze_sentiment_finbert(text)
+    """Analyze sentiment of custom text using FinBERT (when enabled) or the lexicon engine"""
+    result = (await score_sentiment([text]))[0]
     return result.model_dump()
 
+@app.post("/api/v1/analyze-sentiment/batch")
+async def analyze_text_sentiment_batch(texts: List[str] = Body(..., description="Headlines to score")):
+    """Analyze sentiment of a list of headlines in one call"""
+    results = await score_sentiment(texts)
+    return {"results": [r.model_dump() for r in results], "count": len(results)}
+
+@app.post("/api/v1/analyze-sentiment/bulk")
+async def analyze_text_sentiment_bulk(request: Request):
+    """
+    Score thousands of texts sent as NDJSON or a JSON array (strings or {"id", "text"}
+    objects). Results stream back as NDJSON in input order, tagged by id.
+    """
+    pool = get_bulk_pool()
+    
+    async def score_chunk(texts: List[str]):
+        results = await score_sentiment(texts, executor=pool, memoize=BULK_SENTIMENT_MEMO)
+        return [(r.score, r.label, r.confidence) for r in results]
+    
+    return DuplexStreamingResponse(
+        stream_bulk_scores(
+            request.stream(),
+            score_chunk,
+            chunk_size=BULK_CHUNK_SIZE,
+            max_in_flight=BULK_SCORING_WORKERS * 2
+        ),
+        media_type="application/x-ndjson"
+    )
+
+def ingest_covers(ticker: str) -> bool:
+    """Whether the background ingest polls this ticker's feed"""
+    return bool(NEWS_INGEST_ENABLED and ALPHA_VANTAGE_API_KEY) and ("tickers", ticker) in incremental_ingestor.feeds
+
 @app.get("/api/v1/sentiment-aggregate/{ticker}")
 async def get_sentiment_aggregate(ticker: str):
-    """Get aggregated sentiment for a specific ticker from recent news"""
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                ALPHA_VANTAGE_BASE_URL,
-                params={
-                    "function": "NEWS_SENTIMENT",
-                    "tickers": ticker.upper(),
-                    "limit": 50,
-                    "apikey": ALPHA_VANTAGE_API_KEY
-                },
-                timeout=30.0
-            )
-            
-            if response.status_code != 200:
-                raise HTTPException(status_code=response.status_code, detail="Failed to fetch news")
-            
-            data = response.json()
-            
-            if "Note" in data or "Information" in data:
-                raise HTTPException(status_code=429, detail="API rate limit reached")
-            
-            feed = data.get("feed", [])
-            
-            if not feed:
-                return {
-                    "ticker": ticker,
-                    "avg_sentiment": 0,
-                    "article_count": 0,
-                    "sentiment_distribution": {"bullish": 0, "neutral": 0, "bearish": 0}
-                }
-            
-            scores = []
-            distribution = {"bullish": 0, "neutral": 0, "bearish": 0}
-            
-            for item in feed:
-                # Find ticker-specific sentiment
-                for ts in item.get("ticker_sentiment", []):
-                    if ts.get("ticker", "").upper() == ticker.upper():
-                        score = float(ts.get("ticker_sentiment_score", 0))
-                        scores.append(score)
-                        
-                        if score >= 0.15:
-                            distribution["bullish"] += 1
-                        elif score <= -0.15:
-                            distribution["bearish"] += 1
-                        else:
-                            distribution["neutral"] += 1
-                        break
-            
-            avg_sentiment = sum(scores) / len(scores) if scores else 0
-            
-            return {
-                "ticker": ticker.upper(),
-                "avg_sentiment": round(avg_sentiment, 3),
-                "article_count": len(scores),
-                "sentiment_distribution": distribution,
-                "overall_label": get_sentiment_label(avg_sentiment)
-            }
+    """
+    Get aggregated sentiment for a specific ticker from recent news.
+    Served from the decayed aggregate index. The ticker's news is fetched when it
+    was never seen, or when its feed was last read more than
+    SENTIMENT_AGGREGATE_TTL_SECONDS ago and the background ingest does not poll it.
+    A failed refetch serves the stale aggregate.
+    """
+    ticker = ticker.upper()
+    snapshot = sentiment_index.snapshot(ticker)
+    if snapshot is not None and (
+        ingest_covers(ticker) or datetime.now(timezone.utc).timestamp() - snapshot["fed_at"] < SENTIMENT_AGGREGATE_TTL_SECONDS
+    ):
+        return {**snapshot, "overall_label": get_sentiment_label(snapshot["avg_sentiment"])}
+    
+    try:
+        data = await fetch_news_sentiment(tickers=ticker, limit=50)
+        
+        feed = data.get("feed", [])
+        
+        if feed:
+            finbert_results = await score_sentiment([item.get("title", "") for item in feed])
+            articles = [build_article(item, result) for item, result in zip(feed, finbert_results)]
+            new_ids = {article.id for article in await publish_new_articles(articles)}
             
-        except httpx.TimeoutException:
+            # Articles seen earlier (e.g. before a restart) were never counted for a ticker new to the index
+            if snapshot is None:
+                for article in articles:
+                    if article.id not in new_ids and ticker in article.ticker_scores:
+                        sentiment_index.update(ticker, article.ticker_scores[ticker], published_timestamp(article))
+        sentiment_index.mark_fed(ticker)
+        
+        snapshot = sentiment_index.snapshot(ticker)
+        return {**snapshot, "overall_label": get_sentiment_label(snapshot["avg_sentiment"])}
+        
+    except Exception as e:
+        if snapshot is not None:
+            print(f"[Sentiment] Refetch for {ticker} failed, serving the stale aggregate: {e}")
+            return {**snapshot, "overall_label": get_sentiment_label(snapshot["avg_sentiment"])}
+        if isinstance(e, QuotaExceeded):
+            raise
+        if isinstance(e, httpx.TimeoutException):
             raise HTTPException(status_code=504, detail="Request timeout")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
 
-async def publish_to_kafka(topic: str, message: dict):
-    """Kafka producer - in production use aiokafka"""
-    print(f"[Kafka] Publishing to {topic}: {json.dumps(message)[:100]}...")
-    return True
+@app.get("/api/v1/metrics")
+async def get_metrics():
+    """Internal counters for the sentiment pipeline"""
+    return {
+        "scorer_version": scorer_version(),
+        "sentiment_memo": sentiment_memo.metrics(),
+        "finbert": finbert_batcher.stats if finbert_active() else None,
+        "ingestion": {**incremental_ingestor.stats, "watermarks": incremental_ingestor.watermarks},
+        "sentiment_index": {"tickers": len(sentiment_index), "windows": SENTIMENT_AGGREGATE_WINDOWS},
+        "search_index": search_index.metrics(),
+        "news_cache": news_cache.metrics(),
+        "prewarm": shard_prewarmer.metrics(),
+        "snapshot": cache_snapshotter.metrics(),
+        "upstream_quota": await alpha_vantage_quota.metrics(),
+        "upstream_transport": transport_metrics(),
+        "event_bus": event_bus.metrics()
+    }
 
 if __name__ == "__main__":
     import uvicorn
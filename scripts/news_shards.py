@@ -0,0 +1,164 @@
+"""
+Sharded News Cache
+Per-ticker and per-topic article shards that can answer any ticker/topic combination.
+
+A query like tickers=NVDA,AAPL&topics=earnings is normalized and split into shards
+("tickers", "AAPL"), ("tickers", "NVDA"). Only missing or expired shards are fetched;
+the response is assembled by merging the cached shards by time, so overlapping
+dashboard widgets share cache entries regardless of ticker order or grouping.
+Alpha Vantage answers several tickers with the articles that mention all of
+them, so a multi-ticker query keeps only articles tagged with every ticker.
+Shards hold the latest articles, so EARLIEST queries are not served from them.
+"""
+
+import heapq
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+ShardKey = Tuple[str, str]
+
+# Shard used when a query names neither tickers nor topics (the general feed)
+GENERAL_SHARD: ShardKey = ("general", "*")
+
+def normalize_query(
+    tickers: str,
+    topics: str,
+    normalize_topic: Callable[[str], str] = str.lower
+) -> Tuple[List[str], List[str]]:
+    """Sorted, de-duplicated tickers (upper) and topics (through `normalize_topic`)"""
+    ticker_list = sorted({t.strip().upper() for t in tickers.split(",") if t.strip()})
+    topic_list = sorted({normalize_topic(t.strip()) for t in topics.split(",") if t.strip()})
+    return ticker_list, topic_list
+
+def shard_keys(tickers: List[str], topics: List[str]) -> List[ShardKey]:
+    """
+    Ticker shards are the candidate set when tickers are given (topics then act as a
+    filter); otherwise the topic shards are. Neither -> the general feed shard.
+    """
+    if tickers:
+        return [("tickers", t) for t in tickers]
+    if topics:
+        return [("topics", t) for t in topics]
+    return [GENERAL_SHARD]
+
+class Shard:
+    __slots__ = ("articles", "fetched_at")
+
+    def __init__(self, articles: List[Any], fetched_at: float):
+        self.articles = articles  # newest first
+        self.fetched_at = fetched_at
+
+class ShardedNewsCache:
+    """Articles (objects with id, published_at, relevance_score, topics) cached per shard"""
+
+    def __init__(self, ttl_seconds: int = 300, max_articles_per_shard: int = 100):
+        self.ttl_seconds = ttl_seconds
+        self.max_articles_per_shard = max_articles_per_shard
+        self._shards: Dict[ShardKey, Shard] = {}
+        self.stats = {"shard_hits": 0, "shard_misses": 0, "queries": 0}
+
+    def __len__(self) -> int:
+        return len(self._shards)
+
+    def is_fresh(self, key: ShardKey, now: Optional[float] = None) -> bool:
+        shard = self._shards.get(key)
+        now = time.time() if now is None else now
+        return shard is not None and now - shard.fetched_at < self.ttl_seconds
+
+    def expires_at(self, key: ShardKey) -> Optional[float]:
+        shard = self._shards.get(key)
+        return shard.fetched_at + self.ttl_seconds if shard is not None else None
+
+    def missing(self, keys: Iterable[ShardKey], now: Optional[float] = None) -> List[ShardKey]:
+        """Shards that must be fetched (absent or past their TTL)"""
+        self.stats["queries"] += 1
+        keys = list(keys)
+        missing = [key for key in keys if not self.is_fresh(key, now)]
+        self.stats["shard_misses"] += len(missing)
+        self.stats["shard_hits"] += len(keys) - len(missing)
+        return missing
+
+    def put(self, key: ShardKey, articles: List[Any], fetched_at: Optional[float] = None):
+        ordered = sorted(articles, key=lambda a: a.published_at, reverse=True)
+        self._shards[key] = Shard(ordered[:self.max_articles_per_shard], time.time() if fetched_at is None else fetched_at)
+
+    def merge(self, key: ShardKey, articles: List[Any]):
+        """Fold newly ingested articles into an existing shard and mark it fresh"""
+        shard = self._shards.get(key)
+        if shard is None:
+            return
+        known = {a.id for a in shard.articles}
+        combined = shard.articles + [a for a in articles if a.id not in known]
+        self.put(key, combined)
+
+    def has(self, key: ShardKey) -> bool:
+        return key in self._shards
+
+    def snapshot(self, serialize: Callable[[Any], Dict]) -> List[Dict]:
+        """Shards as cache_snapshot entries, articles converted with `serialize`"""
+        return [
+            {
+                "key": list(key),
+                "value": [serialize(a) for a in shard.articles],
+                "fetched_at": shard.fetched_at,
+                "expires_at": shard.fetched_at + self.ttl_seconds
+            }
+            for key, shard in list(self._shards.items())
+        ]
+
+    def restore(self, entries: List[Dict], deserialize: Callable[[Dict], Any]) -> int:
+        """Put snapshot entries back with their original fetch time, never over a newer shard"""
+        restored = 0
+        for entry in entries:
+            key = tuple(entry["key"])
+            current = self._shards.get(key)
+            if current is not None and current.fetched_at >= entry["fetched_at"]:
+                continue
+            self.put(key, [deserialize(a) for a in entry["value"]], fetched_at=entry["fetched_at"])
+            restored += 1
+        return restored
+
+    def assemble(
+        self,
+        keys: List[ShardKey],
+        topics: List[str],
+        limit: int,
+        sort: str = "LATEST"
+    ) -> List[Any]:
+        """
+        Merge shards newest-first (deduplicated), optionally filtered to any of
+        `topics`. Several ticker shards keep only articles mentioning all tickers.
+        Sorts LATEST (the default) or RELEVANCE; EARLIEST needs articles the shards
+        do not hold.
+        """
+        sort = sort.upper()
+        if sort == "EARLIEST":
+            raise ValueError("Shards hold the latest articles and cannot answer EARLIEST")
+        lists = [self._shards[key].articles for key in keys if key in self._shards]
+        ticker_keys = bool(keys) and keys[0][0] == "tickers"
+        topic_filter = set(topics) if ticker_keys and topics else None
+        required = {value for _, value in keys} if ticker_keys and len(keys) > 1 else None
+
+        merged = []
+        seen = set()
+        for article in heapq.merge(*lists, key=lambda a: a.published_at, reverse=True):
+            if article.id in seen:
+                continue
+            if topic_filter is not None and topic_filter.isdisjoint(article.topics):
+                continue
+            if required is not None and not required.issubset(s.upper() for s in article.symbols):
+                continue
+            seen.add(article.id)
+            merged.append(article)
+
+        if sort == "RELEVANCE":
+            merged.sort(key=lambda a: a.relevance_score, reverse=True)
+        return merged[:limit]
+
+    def metrics(self) -> Dict:
+        lookups = self.stats["shard_hits"] + self.stats["shard_misses"]
+        return {
+            **self.stats,
+            "shards": len(self._shards),
+            "shard_hit_rate": round(self.stats["shard_hits"] / lookups, 4) if lookups else 0.0
+        }
@@ -0,0 +1,192 @@
+"""
+Performance Tracker
+Online portfolio performance analytics updated in O(1) per valuation tick or trade.
+
+Valuation ticks feed a Welford mean/variance of period returns, a fixed-size
+rolling window (running sums of returns, squares and downside squares) for
+Sharpe and Sortino, and peak/drawdown state. Closed trades feed the win rate.
+Returns are annualized from the observed average spacing between ticks, so the
+tracker works for daily marks as well as intraday valuations.
+"""
+
+import math
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, Optional
+
+SECONDS_PER_YEAR = 365.25 * 86400
+
+class RunningStats:
+    """Welford's running mean and variance"""
+
+    __slots__ = ("count", "mean", "m2")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, x: float):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+class RollingWindow:
+    """Last `size` returns with running sum, sum of squares and downside sum of squares"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.values: Deque[float] = deque()
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.downside_sq = 0.0
+        self._since_resum = 0
+
+    def add(self, x: float):
+        self.values.append(x)
+        self.total += x
+        self.total_sq += x * x
+        self.downside_sq += min(x, 0.0) ** 2
+        if len(self.values) > self.size:
+            old = self.values.popleft()
+            self.total -= old
+            self.total_sq -= old * old
+            self.downside_sq -= min(old, 0.0) ** 2
+        # Re-sum once per window length so add/subtract rounding cannot accumulate
+        self._since_resum += 1
+        if self._since_resum >= self.size:
+            self._since_resum = 0
+            self.total = math.fsum(self.values)
+            self.total_sq = math.fsum(v * v for v in self.values)
+            self.downside_sq = math.fsum(min(v, 0.0) ** 2 for v in self.values)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @property
+    def mean(self) -> float:
+        return self.total / len(self.values) if self.values else 0.0
+
+    @property
+    def std(self) -> float:
+        n = len(self.values)
+        if n < 2:
+            return 0.0
+        return math.sqrt(max(self.total_sq - self.total * self.total / n, 0.0) / (n - 1))
+
+    @property
+    def downside_deviation(self) -> float:
+        n = len(self.values)
+        return math.sqrt(self.downside_sq / n) if n else 0.0
+
+class PerformanceTracker:
+    """Running performance state for one portfolio"""
+
+    def __init__(self, window: int = 252, periods_per_year: Optional[float] = None):
+        self.window = RollingWindow(window)
+        self.periods_per_year = periods_per_year
+        self.returns = RunningStats()
+        self.spacing = RunningStats()  # seconds between valuation ticks
+
+        self.last_value: Optional[float] = None
+        self.last_ts: Optional[float] = None
+        self.day: Optional[str] = None
+        self.day_open_value: Optional[float] = None
+
+        self.peak = 0.0
+        self.peak_ts: Optional[float] = None
+        self.drawdown = 0.0
+        self.max_drawdown = 0.0
+
+        self.trades = 0
+        self.wins = 0
+        self.gross_profit = 0.0
+        self.gross_loss = 0.0
+        self.updates = 0
+
+    def on_valuation(self, value: float, ts: float) -> bool:
+        """Fold in a mark; returns False if it was ignored"""
+        if value <= 0 or (self.last_ts is not None and ts < self.last_ts):
+            return False  # ignore bad marks and out-of-order ticks
+        self.updates += 1
+        day = datetime.utcfromtimestamp(ts).strftime("%Y-%m-%d")
+        if day != self.day:
+            self.day = day
+            self.day_open_value = self.last_value if self.last_value is not None else value
+
+        if self.last_value is not None:
+            r = value / self.last_value - 1.0
+            self.returns.add(r)
+            self.window.add(r)
+            if ts > self.last_ts:
+                self.spacing.add(ts - self.last_ts)
+        self.last_value = value
+        self.last_ts = ts
+
+        if value >= self.peak:
+            self.peak = value
+            self.peak_ts = ts
+        self.drawdown = 1.0 - value / self.peak
+        self.max_drawdown = max(self.max_drawdown, self.drawdown)
+        return True
+
+    def on_trade(self, pnl: Optional[float]):
+        """Closed trade P&L; opening fills carry no P&L and are skipped"""
+        if pnl is None:
+            return
+        self.updates += 1
+        self.trades += 1
+        if pnl > 0:
+            self.wins += 1
+            self.gross_profit += pnl
+        else:
+            self.gross_loss -= pnl
+
+    def annualization(self) -> float:
+        if self.periods_per_year:
+            return self.periods_per_year
+        if self.spacing.count and self.spacing.mean > 0:
+            return SECONDS_PER_YEAR / self.spacing.mean
+        return 252.0
+
+    def sharpe(self) -> float:
+        std = self.window.std
+        return self.window.mean / std * math.sqrt(self.annualization()) if std > 0 else 0.0
+
+    def sortino(self) -> float:
+        downside = self.window.downside_deviation
+        if len(self.window) < 2 or downside == 0:
+            return 0.0
+        return self.window.mean / downside * math.sqrt(self.annualization())
+
+    def snapshot(self) -> Dict:
+        """Current metrics; the first six keys match the portfolio_history columns"""
+        daily_pnl = (self.last_value - self.day_open_value) if self.last_value is not None else 0.0
+        ann = self.annualization()
+        return {
+            "total_value": round(self.last_value or 0.0, 2),
+            "daily_pnl": round(daily_pnl, 2),
+            "daily_pnl_pct": round(daily_pnl / self.day_open_value * 100, 4) if self.day_open_value else 0.0,
+            "sharpe_ratio": round(self.sharpe(), 4),
+            "win_rate": round(self.wins / self.trades * 100, 2) if self.trades else 0.0,
+            "max_drawdown": round(self.max_drawdown * 100, 4),
+            "sortino_ratio": round(self.sortino(), 4),
+            "current_drawdown": round(self.drawdown * 100, 4),
+            "peak_value": round(self.peak, 2),
+            "annualized_return": round(self.returns.mean * ann * 100, 4) if self.returns.count > 1 else 0.0,
+            "annualized_volatility": round(self.returns.std * math.sqrt(ann) * 100, 4),
+            "profit_factor": round(self.gross_profit / self.gross_loss, 4) if self.gross_loss > 0 else None,
+            "trades": self.trades,
+            "observations": self.returns.count,
+            "window": len(self.window),
+            "last_update": datetime.utcfromtimestamp(self.last_ts).isoformat() if self.last_ts else None
+        }
@@ -0,0 +1,293 @@
+"""
+Portfolio Optimizer
+Mean-variance, risk-parity and max-diversification weights from a covariance
+matrix and fused-score return views, under position and turnover limits.
+
+Every method solves with the position limits inside the iteration, projecting
+onto {lo <= w <= hi, sum(w) = 1}. Mean-variance uses accelerated projected
+gradient. Max-diversification minimizes the pseudo-convex ratio
+sqrt(w' cov w) / (sigma'w) by projected gradient with backtracking, so its
+stationary point on the capped simplex is the capped optimum. Risk parity is
+the constrained risk-budgeting portfolio: projected Newton on
+0.5 w' cov w - lambda * sum(log w / n) inside the box, with lambda searched
+until the weights sum to 1. That is exact equal risk contribution whenever
+the caps allow it. Solutions, the risk-parity multiplier and the covariance's
+leading eigenvector are kept per universe and seed the next solve of the same
+universe.
+
+The turnover limit is a heuristic applied after the solve: a feasible blend
+between the current weights and the optimum that spends exactly the budget.
+It is not the turnover-constrained optimum.
+"""
+
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+METHODS = ("mean_variance", "risk_parity", "max_diversification")
+
+def views_from_scores(fused_scores: np.ndarray, volatility: np.ndarray, view_scale: float = 0.1) -> np.ndarray:
+    """
+    Expected returns from fused scores (0-100, 50 = neutral): score strength times
+    the asset's own volatility, so a strong view on a volatile name carries more return
+    """
+    strength = (np.asarray(fused_scores, dtype=float) - 50.0) / 50.0
+    return view_scale * volatility * np.clip(strength, -1.0, 1.0)
+
+def project_capped_simplex(v: np.ndarray, lo: float, hi: float, total: float = 1.0) -> np.ndarray:
+    """Euclidean projection onto {lo <= w <= hi, sum(w) = total} by bisection on the shift"""
+    left, right = float(v.min() - hi), float(v.max() - lo)
+    for _ in range(60):
+        tau = 0.5 * (left + right)
+        if np.clip(v - tau, lo, hi).sum() > total:
+            left = tau
+        else:
+            right = tau
+    return np.clip(v - 0.5 * (left + right), lo, hi)
+
+def limit_turnover(weights: np.ndarray, previous: Optional[np.ndarray], max_turnover: Optional[float]) -> np.ndarray:
+    """
+    Move from `previous` towards `weights` only as far as the turnover budget allows.
+    Both endpoints are feasible, so the blend is too. This is a heuristic: the
+    best portfolio within the turnover budget is generally not on this line.
+    """
+    if previous is None or max_turnover is None:
+        return weights
+    turnover = float(np.abs(weights - previous).sum())
+    if turnover <= max_turnover or turnover == 0:
+        return weights
+    return previous + (weights - previous) * (max_turnover / turnover)
+
+def portfolio_stats(weights: np.ndarray, cov: np.ndarray, mu: np.ndarray) -> Dict:
+    sigma_w = cov @ weights
+    variance = float(weights @ sigma_w)
+    volatility = float(np.sqrt(max(variance, 0.0)))
+    asset_vol = np.sqrt(np.diag(cov))
+    return {
+        "expected_return": float(mu @ weights),
+        "volatility": volatility,
+        "diversification_ratio": float(asset_vol @ weights / volatility) if volatility > 0 else 0.0,
+        "risk_contributions": weights * sigma_w / variance if variance > 0 else np.zeros(len(weights))
+    }
+
+class PortfolioOptimizer:
+    """
+    Solvers plus per-universe warm-start state. optimize() runs on executor
+    threads, so the shared state is only touched under `_lock`; the solves
+    themselves run unlocked.
+    """
+
+    def __init__(self, tolerance: float = 1e-7, max_iterations: int = 5000):
+        self.tolerance = tolerance
+        self.max_iterations = max_iterations
+        self._solutions: Dict[Tuple[str, Tuple[str, ...]], np.ndarray] = {}
+        self._eigvecs: Dict[Tuple[str, ...], np.ndarray] = {}
+        self._multipliers: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+        self.stats = {"solves": 0, "warm_starts": 0, "iterations": 0}
+
+    def _lipschitz(self, universe: Tuple[str, ...], cov: np.ndarray) -> float:
+        """Largest eigenvalue by power iteration, restarted from the universe's last eigenvector"""
+        with self._lock:
+            vec = self._eigvecs.get(universe)
+        if vec is None or len(vec) != len(cov):
+            vec = np.ones(len(cov)) / np.sqrt(len(cov))
+        value = 0.0
+        for _ in range(100):
+            nxt = cov @ vec
+            norm = float(np.linalg.norm(nxt))
+            if norm == 0:
+                return 1.0
+            nxt /= norm
+            done = abs(norm - value) <= 1e-6 * norm
+            vec, value = nxt, norm
+            if done:
+                break
+        with self._lock:
+            self._eigvecs[universe] = vec
+        return value * 1.01
+
+    def _start(self, key, n: int, lo: float, hi: float, fallback: Optional[np.ndarray]) -> Tuple[np.ndarray, bool]:
+        with self._lock:
+            warm = self._solutions.get(key)
+        if warm is not None and len(warm) == n:
+            return project_capped_simplex(warm, lo, hi), True
+        start = fallback if fallback is not None else np.full(n, 1.0 / n)
+        return project_capped_simplex(start, lo, hi), False
+
+    def _projected_gradient(self, grad, step: float, x0: np.ndarray, project) -> Tuple[np.ndarray, int]:
+        """FISTA with adaptive restart (momentum is dropped whenever it points uphill)"""
+        x, y, t = x0, x0, 1.0
+        for iteration in range(1, self.max_iterations + 1):
+            x_next = project(y - step * grad(y))
+            if np.abs(x_next - x).max() < self.tolerance * max(float(np.abs(x_next).max()), 1.0):
+                return x_next, iteration
+            if float((y - x_next) @ (x_next - x)) > 0:
+                t = 1.0
+            t_next = 0.5 * (1 + np.sqrt(1 + 4 * t * t))
+            y = x_next + ((t - 1) / t_next) * (x_next - x)
+            x, t = x_next, t_next
+        return x, self.max_iterations
+
+    def mean_variance(self, universe, cov, mu, risk_aversion, lo, hi, x0) -> Tuple[np.ndarray, int]:
+        """max mu'w - (risk_aversion / 2) w' cov w"""
+        step = 1.0 / (risk_aversion * self._lipschitz(universe, cov))
+        return self._projected_gradient(
+            lambda w: risk_aversion * (cov @ w) - mu, step, x0, lambda v: project_capped_simplex(v, lo, hi)
+        )
+
+    def max_diversification(self, universe, cov, lo, hi, x0) -> Tuple[np.ndarray, int]:
+        """
+        max (sigma'w) / sqrt(w' cov w) over the capped simplex, as projected gradient
+        on f(w) = sqrt(w' cov w) / (sigma'w). f is convex over positive-linear, hence
+        pseudo-convex, so the stationary point the iteration stops at is the optimum.
+        The step adapts by backtracking on the projected-gradient sufficient decrease.
+        """
+        asset_vol = np.sqrt(np.diag(cov))
+        project = lambda v: project_capped_simplex(v, lo, hi)
+
+        def value_and_grad(w: np.ndarray) -> Tuple[float, np.ndarray]:
+            sigma_w = cov @ w
+            risk = float(np.sqrt(max(float(w @ sigma_w), 1e-300)))
+            exposure = float(asset_vol @ w)
+            value = risk / exposure
+            return value, value * (sigma_w / (risk * risk) - asset_vol / exposure)
+
+        w = x0
+        value, grad = value_and_grad(w)
+        # Curvature of f is about cov / (risk * exposure); backtracking corrects the guess
+        exposure = float(asset_vol @ w)
+        step = value * exposure * exposure / self._lipschitz(universe, cov)
+        for iteration in range(1, self.max_iterations + 1):
+            while True:
+                w_next = project(w - step * grad)
+                move = w_next - w
+                value_next, grad_next = value_and_grad(w_next)
+                if value_next <= value + float(grad @ move) + float(move @ move) / (2 * step) or step < 1e-18:
+                    break
+                step *= 0.5
+            w, value, grad = w_next, value_next, grad_next
+            if np.abs(move).max() < self.tolerance * max(float(np.abs(w).max()), 1.0):
+                break
+            step *= 2.0
+        return w, iteration
+
+    def risk_parity(self, universe, cov, lo, hi, x0) -> Tuple[np.ndarray, int]:
+        """
+        Risk budgeting with the limits inside the solve: for a multiplier lambda,
+        min 0.5 w' cov w - lambda * sum(b_i log w_i) over lo <= w <= hi (b_i = 1/n)
+        by projected Newton. Each step solves the Newton system on the variables
+        not held at a bound, then backtracks along the projected path. The sum of
+        the solution grows with lambda, which is searched until it is 1, starting
+        from the universe's last multiplier. Without binding caps every asset
+        contributes 1/n of the risk; with them, the uncapped assets share the rest
+        equally. Returns the weights and the number of Newton steps.
+        """
+        n = len(cov)
+        budget = np.full(n, 1.0 / n)
+        floor = max(lo, 1e-12)
+        steps = 0
+
+        def solve(lam: float, w: np.ndarray) -> np.ndarray:
+            nonlocal steps
+            w = np.clip(w, floor, hi)
+            barrier = lam * budget
+            sigma_w = cov @ w
+            value = 0.5 * float(w @ sigma_w) - float(barrier @ np.log(w))
+            for _ in range(100):
+                grad = sigma_w - barrier / w
+                if np.abs(w - np.clip(w - grad, floor, hi)).max() < self.tolerance * 1e-2:
+                    break
+                steps += 1
+                free = ~(((w <= floor) & (grad > 0)) | ((w >= hi) & (grad < 0)))
+                direction = np.zeros(n)
+                hessian = cov[np.ix_(free, free)] + np.diag(barrier[free] / w[free] ** 2)
+                direction[free] = -np.linalg.solve(hessian, grad[free])
+                t = 1.0
+                while True:
+                    w_next = np.clip(w + t * direction, floor, hi)
+                    sigma_next = cov @ w_next
+                    value_next = 0.5 * float(w_next @ sigma_next) - float(barrier @ np.log(w_next))
+                    if value_next <= value + 1e-4 * float(grad @ (w_next - w)) or t < 1e-10:
+                        break
+                    t *= 0.5
+                w, sigma_w, value = w_next, sigma_next, value_next
+            return w
+
+        # Without caps the multiplier equals w' cov w at the solution and w scales with its square root
+        with self._lock:
+            lam = self._multipliers.get(universe)
+        if lam is None:
+            lam = max(float(x0 @ cov @ x0), 1e-18)
+        w = solve(lam, x0)
+        low, high = 0.0, np.inf
+        gap = np.inf
+        for _ in range(200):
+            total = float(w.sum())
+            if abs(total - 1.0) < self.tolerance * 1e-2:
+                break
+            if total > 1.0:
+                high = lam
+            else:
+                low = lam
+            # Weights off their bounds scale with sqrt(lambda); rescale them to fill what the
+            # bounded ones leave, falling back to bisection when that stops converging fast
+            free = (w > floor) & (w < hi)
+            free_total = float(w[free].sum())
+            fixed_total = total - free_total
+            guess = lam * ((1.0 - fixed_total) / free_total) ** 2 if free_total > 0 and fixed_total < 1.0 else lam / (total * total)
+            if not low < guess < high or abs(total - 1.0) > 0.5 * gap:
+                guess = np.sqrt(low * high) if low > 0 and high < np.inf else (high / 4.0 if low == 0 else low * 4.0)
+            gap = abs(total - 1.0)
+            lam = guess
+            w = solve(lam, w / total)
+        with self._lock:
+            self._multipliers[universe] = lam
+        # Remove the search residual without leaving the feasible set
+        return project_capped_simplex(w, lo, hi), steps
+
+    def optimize(
+        self,
+        symbols: List[str],
+        cov: np.ndarray,
+        mu: np.ndarray,
+        methods: List[str] = list(METHODS),
+        min_weight: float = 0.0,
+        max_weight: float = 1.0,
+        risk_aversion: float = 5.0,
+        previous: Optional[np.ndarray] = None,
+        max_turnover: Optional[float] = None
+    ) -> Dict[str, Dict]:
+        n = len(symbols)
+        if min_weight * n > 1 + 1e-9 or max_weight * n < 1 - 1e-9:
+            raise ValueError(f"Position limits [{min_weight}, {max_weight}] are infeasible for {n} assets")
+        universe = tuple(symbols)
+        results = {}
+        for method in methods:
+            key = (method, universe)
+            x0, warm = self._start(key, n, min_weight, max_weight, previous)
+            if method == "mean_variance":
+                optimum, iterations = self.mean_variance(universe, cov, mu, risk_aversion, min_weight, max_weight, x0)
+            elif method == "risk_parity":
+                optimum, iterations = self.risk_parity(universe, cov, min_weight, max_weight, x0)
+            elif method == "max_diversification":
+                optimum, iterations = self.max_diversification(universe, cov, min_weight, max_weight, x0)
+            else:
+                raise ValueError(f"Unknown method: {method}")
+            weights = limit_turnover(optimum, previous, max_turnover)
+            with self._lock:
+                # Cache the optimum before the turnover limit so the next solve starts from it
+                self._solutions[key] = optimum
+                self.stats["solves"] += 1
+                self.stats["warm_starts"] += int(warm)
+                self.stats["iterations"] += iterations
+            stats = portfolio_stats(weights, cov, mu)
+            results[method] = {
+                "weights": weights,
+                "iterations": iterations,
+                "warm_start": warm,
+                "turnover": float(np.abs(weights - previous).sum()) if previous is not None else None,
+                **stats
+            }
+        return results
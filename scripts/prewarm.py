@@ -0,0 +1,201 @@
+"""
+Cache Prewarming
+Access-driven background refresh of hot cache keys just before they expire.
+
+Endpoints call record_access(key) on every request. Each key keeps an
+exponentially decayed access count, so the score reflects both frequency and
+recency. Every tick the scheduler finds keys whose cache entry expires within
+`lead_seconds`, ranks them by score and refreshes as many as the per-minute and
+daily call budgets allow, hottest first. Popular keys are then served from cache
+instead of waiting on a cold upstream fetch. Refreshes run at prewarm priority
+under the shared upstream quota. A key whose refresh fails (raises, or leaves
+nothing cached) is skipped for a backoff that doubles with each consecutive
+failure, so a hot but broken key cannot use up the budget every tick.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List, Optional, Set, Tuple
+
+from upstream import priority_scope, PREWARM
+
+class CallBudget:
+    """Sliding one-minute window plus a UTC-day counter"""
+
+    def __init__(self, per_minute: int, per_day: int):
+        self.per_minute = per_minute
+        self.per_day = per_day
+        self._minute: Deque[float] = deque()
+        self._day = ""
+        self._day_count = 0
+
+    def _roll(self, now: float):
+        while self._minute and now - self._minute[0] >= 60:
+            self._minute.popleft()
+        day = datetime.utcfromtimestamp(now).strftime("%Y-%m-%d")
+        if day != self._day:
+            self._day = day
+            self._day_count = 0
+
+    def try_consume(self, cost: int = 1, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        self._roll(now)
+        if len(self._minute) + cost > self.per_minute or self._day_count + cost > self.per_day:
+            return False
+        self._minute.extend([now] * cost)
+        self._day_count += cost
+        return True
+
+    def remaining(self, now: Optional[float] = None) -> Dict[str, int]:
+        now = time.time() if now is None else now
+        self._roll(now)
+        return {"minute": self.per_minute - len(self._minute), "day": self.per_day - self._day_count}
+
+class PrewarmScheduler:
+    """
+    `refresh(key)` re-fetches and re-caches a key; `expires_at(key)` reads the cache and
+    returns the entry's expiry (epoch seconds) or None when it is not cached. Failed keys
+    wait `failure_backoff_seconds`, doubling per consecutive failure up to `max_backoff_seconds`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        refresh: Callable[[Any], Awaitable[Any]],
+        expires_at: Callable[[Any], Optional[float]],
+        cost: int = 1,
+        per_minute_budget: int = 5,
+        daily_budget: int = 500,
+        lead_seconds: float = 15.0,
+        half_life_seconds: float = 1800.0,
+        min_score: float = 2.0,
+        tick_seconds: float = 5.0,
+        concurrency: int = 2,
+        max_keys: int = 10000,
+        failure_backoff_seconds: float = 30.0,
+        max_backoff_seconds: float = 900.0
+    ):
+        self.name = name
+        self.refresh = refresh
+        self.expires_at = expires_at
+        self.cost = cost
+        self.budget = CallBudget(per_minute_budget, daily_budget)
+        self.lead_seconds = lead_seconds
+        self.decay_rate = math.log(2) / half_life_seconds
+        self.min_score = min_score
+        self.tick_seconds = tick_seconds
+        self.concurrency = concurrency
+        self.max_keys = max_keys
+        self.failure_backoff_seconds = failure_backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self._scores: Dict[Hashable, float] = {}
+        self._touched: Dict[Hashable, float] = {}
+        self._in_flight: Set[Hashable] = set()
+        self._failures: Dict[Hashable, Tuple[int, float]] = {}  # key -> (consecutive failures, retry at)
+        self.stats = {"accesses": 0, "refreshes": 0, "failures": 0, "budget_deferred": 0, "backoff_skipped": 0}
+
+    def score(self, key: Hashable, now: Optional[float] = None) -> float:
+        now = time.time() if now is None else now
+        score = self._scores.get(key)
+        if score is None:
+            return 0.0
+        return score * math.exp(-self.decay_rate * (now - self._touched[key]))
+
+    def record_access(self, key: Hashable, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        self._scores[key] = self.score(key, now) + 1.0
+        self._touched[key] = now
+        self.stats["accesses"] += 1
+        if len(self._scores) > self.max_keys:
+            self._prune(now)
+
+    def _prune(self, now: float):
+        """Drop cold keys, then the coldest half if still over capacity"""
+        scores = {key: self.score(key, now) for key in self._scores}
+        keep = sorted((k for k, s in scores.items() if s >= 0.01), key=scores.get, reverse=True)
+        if len(keep) > self.max_keys:
+            keep = keep[:self.max_keys // 2]
+        keep_set = set(keep)
+        for key in [k for k in self._scores if k not in keep_set]:
+            del self._scores[key]
+            del self._touched[key]
+            self._failures.pop(key, None)
+
+    def due(self, now: Optional[float] = None) -> List[Hashable]:
+        """Hot keys expiring within the lead time, hottest first"""
+        now = time.time() if now is None else now
+        candidates = []
+        for key in self._scores:
+            if key in self._in_flight:
+                continue
+            score = self.score(key, now)
+            if score < self.min_score:
+                continue
+            failure = self._failures.get(key)
+            if failure is not None and now < failure[1]:
+                self.stats["backoff_skipped"] += 1
+                continue
+            expiry = self.expires_at(key)
+            if expiry is None or expiry - now <= self.lead_seconds:
+                candidates.append((score, key))
+        candidates.sort(key=lambda c: c[0], reverse=True)
+        return [key for _, key in candidates]
+
+    def _record_failure(self, key: Hashable, reason: str):
+        streak = self._failures.get(key, (0, 0.0))[0] + 1
+        backoff = min(self.failure_backoff_seconds * 2 ** (streak - 1), self.max_backoff_seconds)
+        self._failures[key] = (streak, time.time() + backoff)
+        self.stats["failures"] += 1
+        print(f"[Prewarm:{self.name}] Refresh of {key} failed ({reason}); retrying in {backoff:.0f}s")
+
+    async def _refresh(self, key: Hashable):
+        self._in_flight.add(key)
+        try:
+            with priority_scope(PREWARM):
+                await self.refresh(key)
+            if self.expires_at(key) is None:
+                self._record_failure(key, "nothing cached")
+            else:
+                self._failures.pop(key, None)
+                self.stats["refreshes"] += 1
+        except Exception as e:
+            self._record_failure(key, str(e))
+        finally:
+            self._in_flight.discard(key)
+
+    async def run_once(self, now: Optional[float] = None) -> int:
+        """Refresh due keys within budget; returns how many were refreshed"""
+        selected = []
+        due = self.due(now)
+        for key in due:
+            if not self.budget.try_consume(self.cost, now):
+                self.stats["budget_deferred"] += len(due) - len(selected)
+                break
+            selected.append(key)
+        for start in range(0, len(selected), self.concurrency):
+            await asyncio.gather(*(self._refresh(key) for key in selected[start:start + self.concurrency]))
+        return len(selected)
+
+    async def run(self):
+        print(f"[Prewarm:{self.name}] Scheduler started (lead {self.lead_seconds}s, "
+              f"{self.budget.per_minute}/min, {self.budget.per_day}/day)")
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"[Prewarm:{self.name}] Tick failed: {e}")
+            await asyncio.sleep(self.tick_seconds)
+
+    def metrics(self, top: int = 10) -> Dict:
+        now = time.time()
+        hottest = sorted(self._scores, key=lambda k: self.score(k, now), reverse=True)[:top]
+        return {
+            **self.stats,
+            "tracked_keys": len(self._scores),
+            "backing_off": sum(1 for _, retry_at in self._failures.values() if retry_at > now),
+            "budget_remaining": self.budget.remaining(now),
+            "hottest": [{"key": str(k), "score": round(self.score(k, now), 3)} for k in hottest]
+        }
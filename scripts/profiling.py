@@ -0,0 +1,154 @@
+"""
+Sampling Profiler
+On-demand, low-overhead wall-clock profiling that returns flame-graph-ready stacks.
+
+A daemon thread reads sys._current_frames() every `interval` seconds for the
+requested duration and counts each thread's stack. Output is in collapsed
+("folded") format: one `frame;frame;... count` line per distinct stack, which
+flamegraph.pl, speedscope and most flame-graph viewers accept. Threads parked
+in the event loop's selector, or in a lock or queue wait, are reported as idle
+and left out by default, so the graph shows only the code that was running.
+The profiled process is never paused. Its only cost is the sampler thread
+taking the GIL briefly once per interval.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+PROFILING_MAX_SECONDS = float(os.getenv("PROFILING_MAX_SECONDS", "60"))
+
+# Innermost frames that mean "waiting, not working"
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("concurrent/futures/thread.py", "_worker"),
+}
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}:{code.co_firstlineno}"
+
+def _is_idle(frame) -> bool:
+    code = frame.f_code
+    return any(code.co_filename.endswith(f) and code.co_name == name for f, name in IDLE_FRAMES)
+
+class SamplingProfiler:
+    """Samples every thread's stack on a background thread"""
+
+    def __init__(self, interval: float = 0.005, include_idle: bool = False, max_depth: int = 128):
+        self.interval = interval
+        self.include_idle = include_idle
+        self.max_depth = max_depth
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.idle_samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.started_at: Optional[float] = None
+        self.elapsed = 0.0
+
+    def _sample(self, own_ident: int):
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            idle = _is_idle(frame)
+            self.samples += 1
+            if idle:
+                self.idle_samples += 1
+                if not self.include_idle:
+                    continue
+            labels: List[str] = []
+            while frame is not None and len(labels) < self.max_depth:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            labels.append(names.get(ident, f"thread-{ident}"))
+            self.stacks[";".join(reversed(labels))] += 1
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        next_tick = time.perf_counter()
+        while not self._stop.is_set():
+            self._sample(own_ident)
+            next_tick += self.interval
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                self._stop.wait(delay)
+            else:
+                next_tick = time.perf_counter()  # fell behind; don't burst to catch up
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.elapsed = time.perf_counter() - (self.started_at or time.perf_counter())
+
+    def folded(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+    def summary(self, top: int = 25) -> Dict:
+        """Most frequent innermost frames (self time) and frames anywhere on the stack (total time)"""
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")[1:]
+            if frames:
+                self_counts[frames[-1]] += count
+            for frame in set(frames):
+                total_counts[frame] += count
+        busy = sum(self.stacks.values()) or 1
+        return {
+            "duration_seconds": round(self.elapsed, 3),
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "idle_samples": self.idle_samples,
+            "distinct_stacks": len(self.stacks),
+            "self": [{"frame": f, "samples": c, "pct": round(c / busy * 100, 2)} for f, c in self_counts.most_common(top)],
+            "total": [{"frame": f, "samples": c, "pct": round(c / busy * 100, 2)} for f, c in total_counts.most_common(top)]
+        }
+
+_profile_lock = asyncio.Lock()
+
+async def profile_for(seconds: float, interval: float = 0.005, include_idle: bool = False) -> SamplingProfiler:
+    """Profile the whole process for `seconds` without blocking the event loop"""
+    profiler = SamplingProfiler(interval=interval, include_idle=include_idle)
+    profiler.start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.stop()
+    return profiler
+
+router = APIRouter()
+
+@router.get("/api/v1/admin/profile")
+async def run_profile(
+    seconds: float = Query(10.0, gt=0, description="How long to sample"),
+    interval_ms: float = Query(5.0, ge=0.5, le=1000),
+    format: str = Query("folded", pattern="^(folded|json)$"),
+    include_idle: bool = False
+):
+    """Sample all threads for N seconds; folded stacks for flame graphs, or a JSON top list"""
+    if seconds > PROFILING_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be <= {PROFILING_MAX_SECONDS}")
+    if _profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    async with _profile_lock:
+        profiler = await profile_for(seconds, interval_ms / 1000.0, include_idle)
+    if format == "json":
+        return profiler.summary()
+    return PlainTextResponse(profiler.folded())
@@ -5,27 +5,87 @@ to generate trading signals and insights
 """
 
 import asyncio
-import json
 import os
-from datetime import datetime
-from typing import List, Optional, Dict
-from fastapi import FastAPI, HTTPException, Query
-from pydantic import BaseModel
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from functools import partial
+from typing import List, Optional, Dict, Hashable, Tuple
+from fastapi import FastAPI, HTTPException, Query, Body, Header
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, Field
 import httpx
+import numpy as np
+
+from db import get_pool, close_pool
+from risk_engine import portfolio_risk, align_price_history, simple_returns, covariance_matrix, DEFAULT_CONFIDENCE_LEVELS
+from portfolio_optimizer import PortfolioOptimizer, views_from_scores, METHODS as OPTIMIZER_METHODS
+from performance_tracker import PerformanceTracker
+from screener import Screener, DEFAULT_METRICS as SCREENER_METRICS
+from cache_snapshot import CacheSnapshotter, timestamped_model_section
+from event_bus import event_bus
+from event_stream import EventBroadcaster, EventFilter, parse_list
+from trigger_engine import TriggerEngine, ABOVE, BELOW
+from prewarm import PrewarmScheduler
+from profiling import router as profiling_router
+from tracing import http_headers, init_tracing, instrument_app, shutdown_tracing, span
+from upstream import (
+    alpha_vantage_get, alpha_vantage_quota, close_http_client, priority_scope,
+    QuotaExceeded, quota_exceeded_handler, transport_metrics, BACKFILL
+)
+from versioning import VersionTracker
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_tracing("quant-engine")
+    await event_bus.start()
+    # Replayed before serving, so no live valuation can overtake the history
+    await load_performance()
+    tasks = []
+    if CACHE_SNAPSHOT_ENABLED:
+        cache_snapshotter.restore()
+        tasks.append(asyncio.create_task(cache_snapshotter.run()))
+    if SCREENER_UNIVERSE and ALPHA_VANTAGE_API_KEY:
+        tasks.append(asyncio.create_task(run_screener()))
+    if PREWARM_ENABLED and ALPHA_VANTAGE_API_KEY:
+        tasks.append(asyncio.create_task(indicator_prewarmer.run()))
+    await restore_signal_triggers()
+    yield
+    event_stream.close()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    if CACHE_SNAPSHOT_ENABLED:
+        await cache_snapshotter.save()
+    await event_bus.stop()
+    await close_http_client()
+    if risk_pool:
+        risk_pool.shutdown(wait=False, cancel_futures=True)
+    await close_pool()
+    shutdown_tracing()
 
 app = FastAPI(
     title="Quant-Engine",
     description="Technical analysis + Sentiment fusion engine using Alpha Vantage",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
+app.add_exception_handler(QuotaExceeded, quota_exceeded_handler)
+app.include_router(profiling_router)
+instrument_app(app)
 
 ALPHA_VANTAGE_API_KEY = os.getenv("ALPHA_VANTAGE_API_KEY")
-ALPHA_VANTAGE_BASE_URL = "https://www.alphavantage.co/query"
+
+# News-Ingestor keeps per-ticker decayed sentiment aggregates in memory
+NEWS_INGESTOR_URL = os.getenv("NEWS_INGESTOR_URL", "http://localhost:8002")
 
 # Kafka topics
 KAFKA_BOOTSTRAP_SERVERS = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "localhost:9092")
+KAFKA_TOPIC_RAW_MARKET = "raw_market_data"
 KAFKA_TOPIC_QUANT_INSIGHTS = "quant_insights"
 KAFKA_TOPIC_TRADING_SIGNALS = "trading_signals"
+KAFKA_TOPIC_TRADE_TRIGGERS = "trade_triggers"
 
 class TechnicalIndicators(BaseModel):
     symbol: str
@@ -58,6 +118,7 @@ class QuantInsight(BaseModel):
     technical_factors: List[str]
     sentiment_factors: List[str]
     risk_level: str
+    momentum: Optional[float] = None
     entry_zone: Optional[Dict] = None
     timestamp: str
 
@@ -71,6 +132,19 @@ class TradingSignal(BaseModel):
     confidence: float
     risk_reward_ratio: float
     timestamp: str
+    id: Optional[int] = None
+    status: Optional[str] = None
+
+class TriggerTick(BaseModel):
+    symbol: str
+    price: float
+    timestamp: Optional[datetime] = None
+
+class PriceAlert(BaseModel):
+    symbol: str
+    price: float
+    direction: str  # above or below
+    note: Optional[str] = None
 
 class ServiceHealth(BaseModel):
     service: str
@@ -81,10 +155,112 @@ class ServiceHealth(BaseModel):
     api_provider: str
     last_update: str
 
+class RiskRequest(BaseModel):
+    positions: Optional[Dict[str, float]] = None  # symbol -> signed market value; defaults to portfolio_positions
+    confidence_levels: List[float] = list(DEFAULT_CONFIDENCE_LEVELS)
+    horizon_days: float = 1.0
+    lookback_days: int = 252
+    simulations: int = 100000
+    student_t_df: Optional[float] = Field(None, gt=2)  # finite variance needs more than 2 degrees of freedom
+    ewma_halflife: Optional[float] = None
+    seed: Optional[int] = None
+
+class OptimizeRequest(BaseModel):
+    symbols: Optional[List[str]] = None  # defaults to the symbols in portfolio_positions
+    views: Optional[Dict[str, float]] = None  # symbol -> fused score (0-100); defaults to latest insights
+    methods: List[str] = list(OPTIMIZER_METHODS)
+    min_weight: float = 0.0
+    max_weight: float = 0.25
+    max_turnover: Optional[float] = None
+    current_weights: Optional[Dict[str, float]] = None  # defaults to portfolio_positions allocation
+    risk_aversion: float = 5.0
+    view_scale: float = 0.1
+    lookback_days: int = 252
+
+class ValuationTick(BaseModel):
+    total_value: float
+    timestamp: Optional[datetime] = None
+
+class TradeRecord(BaseModel):
+    symbol: str
+    side: str
+    quantity: float
+    price: float
+    fees: float = 0.0
+    pnl: Optional[float] = None  # realized P&L; set on closing fills
+    strategy: Optional[str] = None
+    signal_id: Optional[int] = None
+    executed_at: Optional[datetime] = None
+
 # Cache for API responses
 indicator_cache: Dict[str, tuple] = {}
 CACHE_TTL_SECONDS = 300
 
+# Prewarming budget for Alpha Vantage calls made ahead of demand; an indicator
+# refresh costs four calls (RSI, MACD, ADX, BBANDS)
+PREWARM_ENABLED = os.getenv("PREWARM_ENABLED", "true").lower() == "true"
+PREWARM_PER_MINUTE_BUDGET = int(os.getenv("PREWARM_PER_MINUTE_BUDGET", "8"))
+PREWARM_DAILY_BUDGET = int(os.getenv("PREWARM_DAILY_BUDGET", "400"))
+PREWARM_LEAD_SECONDS = float(os.getenv("PREWARM_LEAD_SECONDS", "20"))
+
+# Warm-start snapshots of the indicator cache, restored on startup
+CACHE_SNAPSHOT_ENABLED = os.getenv("CACHE_SNAPSHOT_ENABLED", "true").lower() == "true"
+CACHE_SNAPSHOT_PATH = os.getenv("CACHE_SNAPSHOT_PATH", "data/quant_cache_snapshot.json.gz")
+CACHE_SNAPSHOT_INTERVAL_SECONDS = float(os.getenv("CACHE_SNAPSHOT_INTERVAL_SECONDS", "60"))
+
+cache_snapshotter = CacheSnapshotter(CACHE_SNAPSHOT_PATH, CACHE_SNAPSHOT_INTERVAL_SECONDS)
+cache_snapshotter.register(
+    "indicator_cache", *timestamped_model_section(indicator_cache, TechnicalIndicators, CACHE_TTL_SECONDS)
+)
+
+# Server-sent events: newly computed insights and signals, resumable from a replay log
+EVENT_STREAM_REPLAY_SIZE = int(os.getenv("EVENT_STREAM_REPLAY_SIZE", "1000"))
+EVENT_STREAM_SUBSCRIBER_QUEUE = int(os.getenv("EVENT_STREAM_SUBSCRIBER_QUEUE", "500"))
+EVENT_STREAM_HEARTBEAT_SECONDS = float(os.getenv("EVENT_STREAM_HEARTBEAT_SECONDS", "15"))
+
+event_stream = EventBroadcaster(
+    replay_size=EVENT_STREAM_REPLAY_SIZE,
+    subscriber_queue=EVENT_STREAM_SUBSCRIBER_QUEUE,
+    heartbeat_seconds=EVENT_STREAM_HEARTBEAT_SECONDS
+)
+
+# Stops, targets and price alerts watched against incoming ticks.
+# Signal references are (trading_signals id, timestamp, action, entry price); id is None without a database.
+trigger_engine = TriggerEngine()
+SIGNAL_STATUS_ON_FIRE = {"stop_loss": "stopped_out", "take_profit": "target_hit"}
+# Trigger group of each symbol's active signal; a newer signal for the symbol supersedes it
+active_signal_groups: Dict[str, Hashable] = {}
+
+# Latest fused score per symbol, used as optimizer views
+latest_fused_scores: Dict[str, float] = {}
+
+# Annualized covariance per (universe, lookback), so re-optimizing skips the history query
+covariance_cache: Dict[Tuple[Tuple[str, ...], int], Tuple[float, np.ndarray]] = {}
+optimizer = PortfolioOptimizer()
+
+# Online performance analytics, rebuilt from the database on startup; every
+# accepted valuation is written to portfolio_history with the metrics at that mark
+PERFORMANCE_WINDOW = int(os.getenv("PERFORMANCE_WINDOW", "252"))
+performance_tracker = PerformanceTracker(PERFORMANCE_WINDOW)
+
+# Screener: the universe is rescored round-robin in the background, and every
+# insight computed on demand updates the rankings too
+SCREENER_UNIVERSE = [s.strip().upper() for s in os.getenv("SCREENER_UNIVERSE", "").split(",") if s.strip()]
+SCREENER_INTERVAL_SECONDS = int(os.getenv("SCREENER_INTERVAL_SECONDS", "900"))
+SCREENER_TOP_K = int(os.getenv("SCREENER_TOP_K", "100"))
+screener = Screener(SCREENER_TOP_K)
+
+# Monte Carlo VaR chunks run in worker processes
+RISK_MC_WORKERS = int(os.getenv("RISK_MC_WORKERS", str(os.cpu_count() or 1)))
+RISK_MAX_SIMULATIONS = int(os.getenv("RISK_MAX_SIMULATIONS", "1000000"))
+risk_pool: Optional[ProcessPoolExecutor] = None
+
+def get_risk_pool() -> Optional[ProcessPoolExecutor]:
+    global risk_pool
+    if risk_pool is None and RISK_MC_WORKERS > 1:
+        risk_pool = ProcessPoolExecutor(max_workers=RISK_MC_WORKERS)
+    return risk_pool
+
 def calculate_technical_score(indicators: dict) -> tuple:
     """Calculate technical score based on multiple indicators"""
     score = 50.0  # Start neutral
@@ -163,6 +339,13 @@ def calculate_sentiment_score(sentiment_data: dict) -> tuple:
     
     return max(0, min(100, score)), factors
 
+def calculate_momentum(indicators: dict) -> Optional[float]:
+    """MACD histogram as a percentage of the 20-day SMA, comparable across price levels"""
+    sma = indicators.get("bollinger_middle", 0)
+    if not sma:
+        return None
+    return round(indicators.get("macd_histogram", 0) / sma * 100, 4)
+
 def fuse_scores(technical: float, sentiment: float, tech_weight: float = 0.6) -> float:
     """Fuse technical and sentiment scores with weighted average"""
     return round((technical * tech_weight) + (sentiment * (1 - tech_weight)), 2)
@@ -189,6 +372,54 @@ def calculate_risk_level(fused_score: float, adx: float) -> str:
         return "LOW"  # Strong conviction
     return "MEDIUM"
 
+async def fetch_sentiment_aggregate(client: httpx.AsyncClient, symbol: str) -> Optional[dict]:
+    """
+    Per-ticker sentiment from the News-Ingestor aggregate index, falling back to a
+    direct NEWS_SENTIMENT call only when the ingestor is unreachable. An error
+    status (429, 5xx) means the ingestor is up but overloaded or rate-limited, so
+    it yields no sentiment rather than a second upstream call.
+    """
+    try:
+        with span("news_ingestor.sentiment_aggregate", kind="client", symbol=symbol) as current:
+            response = await client.get(
+                f"{NEWS_INGESTOR_URL}/api/v1/sentiment-aggregate/{symbol}",
+                headers=http_headers(),
+                timeout=5.0
+            )
+            current.set_attribute("http.status_code", response.status_code)
+        if response.status_code != 200:
+            print(f"[Sentiment] News-Ingestor returned {response.status_code} for {symbol}, skipping sentiment")
+            return None
+        data = response.json()
+        if data.get("article_count", 0) > 0:
+            return {"avg_sentiment": data["avg_sentiment"], "article_count": data["article_count"]}
+        return None
+    except httpx.HTTPError as e:
+        print(f"[Sentiment] News-Ingestor unavailable, querying Alpha Vantage directly: {e}")
+    
+    sentiment_response = await alpha_vantage_get(
+        params={
+            "function": "NEWS_SENTIMENT",
+            "tickers": symbol,
+            "limit": 20,
+            "apikey": ALPHA_VANTAGE_API_KEY
+        },
+        timeout=30.0
+    )
+    if sentiment_response.status_code != 200:
+        return None
+    
+    sentiment_data = sentiment_response.json()
+    scores = []
+    for article in sentiment_data.get("feed", []):
+        for ts in article.get("ticker_sentiment", []):
+            if ts.get("ticker", "").upper() == symbol:
+                scores.append(float(ts.get("ticker_sentiment_score", 0)))
+    
+    if not scores:
+        return None
+    return {"avg_sentiment": sum(scores) / len(scores), "article_count": len(scores)}
+
 @app.get("/")
 async def root():
     return {
@@ -214,213 +445,234 @@ async def health_check():
 async def get_technical_indicators(symbol: str):
     """Get comprehensive technical indicators from Alpha Vantage"""
     symbol = symbol.upper()
-    
+    indicator_prewarmer.record_access(symbol)
+    return await cached_technical_indicators(symbol)
+
+async def cached_technical_indicators(symbol: str) -> TechnicalIndicators:
     # Check cache
     cache_key = f"indicators-{symbol}"
-    if cache_key in indicator_cache:
-        cached_data, cached_time = indicator_cache[cache_key]
-        if (datetime.utcnow() - cached_time).seconds < CACHE_TTL_SECONDS:
-            return cached_data
+    with span("cache.indicators", symbol=symbol) as lookup:
+        cached = indicator_cache.get(cache_key)
+        fresh = cached is not None and (datetime.utcnow() - cached[1]).seconds < CACHE_TTL_SECONDS
+        lookup.set_attribute("cache.hit", fresh)
+    if fresh:
+        return cached[0]
+    with span("indicators.fetch", symbol=symbol):
+        return await fetch_technical_indicators(symbol)
+
+def indicators_expire_at(symbol: str) -> Optional[float]:
+    cached = indicator_cache.get(f"indicators-{symbol}")
+    if cached is None:
+        return None
+    return cached[1].replace(tzinfo=timezone.utc).timestamp() + CACHE_TTL_SECONDS
+
+async def fetch_technical_indicators(symbol: str) -> TechnicalIndicators:
+    """Fetch RSI, MACD, ADX and Bollinger Bands from Alpha Vantage and cache the result"""
+    cache_key = f"indicators-{symbol}"
+    try:
+        # Fetch multiple indicators
+        indicators = {}
+        
+        # RSI
+        rsi_response = await alpha_vantage_get(
+            params={
+                "function": "RSI",
+                "symbol": symbol,
+                "interval": "daily",
+                "time_period": 14,
+                "series_type": "close",
+                "apikey": ALPHA_VANTAGE_API_KEY
+            },
+            timeout=30.0
+        )
+        if rsi_response.status_code == 200:
+            rsi_data = rsi_response.json()
+            if "Technical Analysis: RSI" in rsi_data:
+                latest = list(rsi_data["Technical Analysis: RSI"].values())[0]
+                indicators["rsi"] = float(latest.get("RSI", 50))
+
+        # MACD
+        macd_response = await alpha_vantage_get(
+            params={
+                "function": "MACD",
+                "symbol": symbol,
+                "interval": "daily",
+                "series_type": "close",
+                "apikey": ALPHA_VANTAGE_API_KEY
+            },
+            timeout=30.0
+        )
+        if macd_response.status_code == 200:
+            macd_data = macd_response.json()
+            if "Technical Analysis: MACD" in macd_data:
+                latest = list(macd_data["Technical Analysis: MACD"].values())[0]
+                indicators["macd"] = float(latest.get("MACD", 0))
+                indicators["macd_signal"] = float(latest.get("MACD_Signal", 0))
+                indicators["macd_histogram"] = float(latest.get("MACD_Hist", 0))
+
+        # ADX
+        adx_response = await alpha_vantage_get(
+            params={
+                "function": "ADX",
+                "symbol": symbol,
+                "interval": "daily",
+                "time_period": 14,
+                "apikey": ALPHA_VANTAGE_API_KEY
+            },
+            timeout=30.0
+        )
+        if adx_response.status_code == 200:
+            adx_data = adx_response.json()
+            if "Technical Analysis: ADX" in adx_data:
+                latest = list(adx_data["Technical Analysis: ADX"].values())[0]
+                indicators["adx"] = float(latest.get("ADX", 25))
+
+        # Bollinger Bands
+        bbands_response = await alpha_vantage_get(
+            params={
+                "function": "BBANDS",
+                "symbol": symbol,
+                "interval": "daily",
+                "time_period": 20,
+                "series_type": "close",
+                "apikey": ALPHA_VANTAGE_API_KEY
+            },
+            timeout=30.0
+        )
+        if bbands_response.status_code == 200:
+            bbands_data = bbands_response.json()
+            if "Technical Analysis: BBANDS" in bbands_data:
+                latest = list(bbands_data["Technical Analysis: BBANDS"].values())[0]
+                indicators["bollinger_upper"] = float(latest.get("Real Upper Band", 0))
+                indicators["bollinger_middle"] = float(latest.get("Real Middle Band", 0))
+                indicators["bollinger_lower"] = float(latest.get("Real Lower Band", 0))
+        
+        result = TechnicalIndicators(
+            symbol=symbol,
+            rsi=indicators.get("rsi", 50),
+            macd=indicators.get("macd", 0),
+            macd_signal=indicators.get("macd_signal", 0),
+            macd_histogram=indicators.get("macd_histogram", 0),
+            sma_20=indicators.get("bollinger_middle", 0),
+            sma_50=0,
+            ema_12=0,
+            ema_26=0,
+            bollinger_upper=indicators.get("bollinger_upper", 0),
+            bollinger_middle=indicators.get("bollinger_middle", 0),
+            bollinger_lower=indicators.get("bollinger_lower", 0),
+            atr=0,
+            adx=indicators.get("adx", 25),
+            stoch_k=0,
+            stoch_d=0,
+            obv=0,
+            timestamp=datetime.utcnow().isoformat()
+        )
+        
+        # Cache result
+        indicator_cache[cache_key] = (result, datetime.utcnow())
+        
+        return result
+        
+    except QuotaExceeded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def compute_insight(client: httpx.AsyncClient, symbol: str, track_access: bool = True) -> QuantInsight:
+    """
+    Technical + sentiment fusion for one symbol; shared by the insights endpoint and the
+    screener (which passes track_access=False so background scans don't look like demand)
+    """
+    if track_access:
+        indicator_prewarmer.record_access(symbol)
+    # Get technical indicators
+    indicators = await cached_technical_indicators(symbol)
+    indicators_dict = indicators.model_dump()
     
-    async with httpx.AsyncClient() as client:
-        try:
-            # Fetch multiple indicators
-            indicators = {}
-            
-            # RSI
-            rsi_response = await client.get(
-                ALPHA_VANTAGE_BASE_URL,
-                params={
-                    "function": "RSI",
-                    "symbol": symbol,
-                    "interval": "daily",
-                    "time_period": 14,
-                    "series_type": "close",
-                    "apikey": ALPHA_VANTAGE_API_KEY
-                },
-                timeout=30.0
-            )
-            if rsi_response.status_code == 200:
-                rsi_data = rsi_response.json()
-                if "Technical Analysis: RSI" in rsi_data:
-                    latest = list(rsi_data["Technical Analysis: RSI"].values())[0]
-                    indicators["rsi"] = float(latest.get("RSI", 50))
-            
-            await asyncio.sleep(0.5)  # Rate limit protection
-            
-            # MACD
-            macd_response = await client.get(
-                ALPHA_VANTAGE_BASE_URL,
-                params={
-                    "function": "MACD",
-                    "symbol": symbol,
-                    "interval": "daily",
-                    "series_type": "close",
-                    "apikey": ALPHA_VANTAGE_API_KEY
-                },
-                timeout=30.0
-            )
-            if macd_response.status_code == 200:
-                macd_data = macd_response.json()
-                if "Technical Analysis: MACD" in macd_data:
-                    latest = list(macd_data["Technical Analysis: MACD"].values())[0]
-                    indicators["macd"] = float(latest.get("MACD", 0))
-                    indicators["macd_signal"] = float(latest.get("MACD_Signal", 0))
-                    indicators["macd_histogram"] = float(latest.get("MACD_Hist", 0))
-            
-            await asyncio.sleep(0.5)
-            
-            # ADX
-            adx_response = await client.get(
-                ALPHA_VANTAGE_BASE_URL,
-                params={
-                    "function": "ADX",
-                    "symbol": symbol,
-                    "interval": "daily",
-                    "time_period": 14,
-                    "apikey": ALPHA_VANTAGE_API_KEY
-                },
-                timeout=30.0
-            )
-            if adx_response.status_code == 200:
-                adx_data = adx_response.json()
-                if "Technical Analysis: ADX" in adx_data:
-                    latest = list(adx_data["Technical Analysis: ADX"].values())[0]
-                    indicators["adx"] = float(latest.get("ADX", 25))
-            
-            await asyncio.sleep(0.5)
-            
-            # Bollinger Bands
-            bbands_response = await client.get(
-                ALPHA_VANTAGE_BASE_URL,
-                params={
-                    "function": "BBANDS",
-                    "symbol": symbol,
-                    "interval": "daily",
-                    "time_period": 20,
-                    "series_type": "close",
-                    "apikey": ALPHA_VANTAGE_API_KEY
-                },
-                timeout=30.0
-            )
-            if bbands_response.status_code == 200:
-                bbands_data = bbands_response.json()
-                if "Technical Analysis: BBANDS" in bbands_data:
-                    latest = list(bbands_data["Technical Analysis: BBANDS"].values())[0]
-                    indicators["bollinger_upper"] = float(latest.get("Real Upper Band", 0))
-                    indicators["bollinger_middle"] = float(latest.get("Real Middle Band", 0))
-                    indicators["bollinger_lower"] = float(latest.get("Real Lower Band", 0))
-            
-            result = TechnicalIndicators(
-                symbol=symbol,
-                rsi=indicators.get("rsi", 50),
-                macd=indicators.get("macd", 0),
-                macd_signal=indicators.get("macd_signal", 0),
-                macd_histogram=indicators.get("macd_histogram", 0),
-                sma_20=indicators.get("bollinger_middle", 0),
-                sma_50=0,
-                ema_12=0,
-                ema_26=0,
-                bollinger_upper=indicators.get("bollinger_upper", 0),
-                bollinger_middle=indicators.get("bollinger_middle", 0),
-                bollinger_lower=indicators.get("bollinger_lower", 0),
-                atr=0,
-                adx=indicators.get("adx", 25),
-                stoch_k=0,
-                stoch_d=0,
-                obv=0,
-                timestamp=datetime.utcnow().isoformat()
-            )
-            
-            # Cache result
-            indicator_cache[cache_key] = (result, datetime.utcnow())
-            
-            return result
-            
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+    # Get sentiment data
+    sentiment_data = await fetch_sentiment_aggregate(client, symbol)
+    
+    with span("insight.score", symbol=symbol) as scoring:
+        # Calculate technical score
+        tech_score, tech_factors = calculate_technical_score(indicators_dict)
+        
+        sentiment_score = 50
+        sentiment_factors = ["No sentiment data available"]
+        if sentiment_data:
+            sentiment_score, sentiment_factors = calculate_sentiment_score(sentiment_data)
+        
+        # Fuse scores
+        fused = fuse_scores(tech_score, sentiment_score)
+        action = determine_action(fused)
+        risk = calculate_risk_level(fused, indicators_dict.get("adx", 25))
+        scoring.set_attributes({"fused_score": fused, "action": action})
+    
+    # Generate reasoning
+    if action in ["STRONG_BUY", "BUY"]:
+        reasoning = f"Bullish signals: Technical score {tech_score:.0f}/100, Sentiment {sentiment_score:.0f}/100"
+    elif action in ["STRONG_SELL", "SELL"]:
+        reasoning = f"Bearish signals: Technical score {tech_score:.0f}/100, Sentiment {sentiment_score:.0f}/100"
+    else:
+        reasoning = f"Mixed signals: Technical {tech_score:.0f}/100, Sentiment {sentiment_score:.0f}/100 - Wait for confirmation"
+    
+    insight = QuantInsight(
+        symbol=symbol,
+        technical_score=tech_score,
+        sentiment_score=sentiment_score,
+        fused_score=fused,
+        action=action,
+        confidence=min(95, abs(fused - 50) + 50),
+        reasoning=reasoning,
+        technical_factors=tech_factors,
+        sentiment_factors=sentiment_factors,
+        risk_level=risk,
+        momentum=calculate_momentum(indicators_dict),
+        timestamp=datetime.utcnow().isoformat()
+    )
+    
+    latest_fused_scores[symbol] = fused
+    message = insight.model_dump()
+    screener.update(message)
+    await publish_insight_change(insight, message)
+    return insight
 
-@app.get("/api/v1/insights")
-async def get_quant_insights(symbols: str = Query("AAPL,NVDA,MSFT", description="Comma-separated symbols")):
-    """Get fused quant insights combining technical and sentiment analysis"""
-    symbol_list = [s.strip().upper() for s in symbols.split(",")]
+async def publish_insight_change(insight: QuantInsight, message: Dict):
+    """
+    Publish an insight to the bus and the SSE stream only when its content changed,
+    so polling and screener passes over a steady symbol emit nothing
+    """
+    previous = insight_versions.version
+    if insight_versions.observe(insight.symbol, insight) <= previous:
+        return
+    await event_bus.publish(KAFKA_TOPIC_QUANT_INSIGHTS, message, key=insight.symbol)
+    event_stream.publish("insight", message)
+
+# Hot symbols' indicators are refetched shortly before their TTL runs out
+indicator_prewarmer = PrewarmScheduler(
+    "indicators",
+    fetch_technical_indicators,
+    indicators_expire_at,
+    cost=4,
+    per_minute_budget=PREWARM_PER_MINUTE_BUDGET,
+    daily_budget=PREWARM_DAILY_BUDGET,
+    lead_seconds=PREWARM_LEAD_SECONDS
+)
+
+# Change versions behind the ETag / delta modes of /api/v1/insights
+insight_versions = VersionTracker()
+
+async def build_insights(symbol_list: List[str]) -> List[QuantInsight]:
+    """Fused insights for up to five symbols; changed ones are published as they are computed"""
     insights = []
     
     async with httpx.AsyncClient() as client:
         for symbol in symbol_list[:5]:  # Limit to avoid rate limits
             try:
-                # Get technical indicators
-                indicators = await get_technical_indicators(symbol)
-                indicators_dict = indicators.model_dump()
-                
-                # Calculate technical score
-                tech_score, tech_factors = calculate_technical_score(indicators_dict)
-                
-                # Get sentiment data
-                sentiment_response = await client.get(
-                    ALPHA_VANTAGE_BASE_URL,
-                    params={
-                        "function": "NEWS_SENTIMENT",
-                        "tickers": symbol,
-                        "limit": 20,
-                        "apikey": ALPHA_VANTAGE_API_KEY
-                    },
-                    timeout=30.0
-                )
-                
-                sentiment_score = 50
-                sentiment_factors = ["No sentiment data available"]
-                
-                if sentiment_response.status_code == 200:
-                    sentiment_data = sentiment_response.json()
-                    if "feed" in sentiment_data:
-                        scores = []
-                        for article in sentiment_data["feed"]:
-                            for ts in article.get("ticker_sentiment", []):
-                                if ts.get("ticker", "").upper() == symbol:
-                                    scores.append(float(ts.get("ticker_sentiment_score", 0)))
-                        
-                        if scores:
-                            avg_sentiment = sum(scores) / len(scores)
-                            sentiment_score, sentiment_factors = calculate_sentiment_score({
-                                "avg_sentiment": avg_sentiment,
-                                "article_count": len(scores)
-                            })
-                
-                # Fuse scores
-                fused = fuse_scores(tech_score, sentiment_score)
-                action = determine_action(fused)
-                risk = calculate_risk_level(fused, indicators_dict.get("adx", 25))
-                
-                # Generate reasoning
-                if action in ["STRONG_BUY", "BUY"]:
-                    reasoning = f"Bullish signals: Technical score {tech_score:.0f}/100, Sentiment {sentiment_score:.0f}/100"
-                elif action in ["STRONG_SELL", "SELL"]:
-                    reasoning = f"Bearish signals: Technical score {tech_score:.0f}/100, Sentiment {sentiment_score:.0f}/100"
-                else:
-                    reasoning = f"Mixed signals: Technical {tech_score:.0f}/100, Sentiment {sentiment_score:.0f}/100 - Wait for confirmation"
-                
-                insight = QuantInsight(
-                    symbol=symbol,
-                    technical_score=tech_score,
-                    sentiment_score=sentiment_score,
-                    fused_score=fused,
-                    action=action,
-                    confidence=min(95, abs(fused - 50) + 50),
-                    reasoning=reasoning,
-                    technical_factors=tech_factors,
-                    sentiment_factors=sentiment_factors,
-                    risk_level=risk,
-                    timestamp=datetime.utcnow().isoformat()
-                )
-                
+                with span("insight.compute", symbol=symbol):
+                    insight = await compute_insight(client, symbol)
                 insights.append(insight)
-                
-                # Publish to Kafka
-                await publish_to_kafka(KAFKA_TOPIC_QUANT_INSIGHTS, insight.model_dump())
-                
-                await asyncio.sleep(1)  # Rate limit protection
-                
+            except QuotaExceeded:
+                raise
             except Exception as e:
                 insights.append(QuantInsight(
                     symbol=symbol,
@@ -436,7 +688,316 @@ async def get_quant_insights(symbols: str = Query("AAPL,NVDA,MSFT", description=
                     timestamp=datetime.utcnow().isoformat()
                 ))
     
-    return {"insights": [i.model_dump() for i in insights], "count": len(insights)}
+    return insights
+
+@app.get("/api/v1/insights")
+async def get_quant_insights(
+    response: Response,
+    symbols: str = Query("AAPL,NVDA,MSFT", description="Comma-separated symbols"),
+    since: Optional[int] = Query(None, description="Delta mode: only insights changed after this version"),
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Get fused quant insights combining technical and sentiment analysis.
+    Responses carry a version and an ETag; If-None-Match answers 304 when no
+    insight changed, and `since` returns only the insights that changed after
+    that version.
+    """
+    symbol_list = [s.strip().upper() for s in symbols.split(",")]
+    insights = await build_insights(symbol_list)
+    not_modified, insights, version = insight_versions.respond(
+        [(i.symbol, i) for i in insights], response, if_none_match, since
+    )
+    if not_modified is not None:
+        return not_modified
+    return {"insights": [i.model_dump() for i in insights], "count": len(insights), **version}
+
+async def run_screener():
+    """
+    Rescore the universe one symbol at a time, then wait for the next pass.
+    Runs at backfill priority, so pacing comes from the shared upstream quota.
+    """
+    print(f"[Screener] Universe of {len(SCREENER_UNIVERSE)} symbols, every {SCREENER_INTERVAL_SECONDS}s")
+    while True:
+        started = time.time()
+        with priority_scope(BACKFILL):
+            async with httpx.AsyncClient() as client:
+                for symbol in SCREENER_UNIVERSE:
+                    try:
+                        await compute_insight(client, symbol, track_access=False)
+                    except Exception as e:
+                        print(f"[Screener] Failed to score {symbol}: {e}")
+        await asyncio.sleep(max(0.0, SCREENER_INTERVAL_SECONDS - (time.time() - started)))
+
+@app.get("/api/v1/screener")
+async def get_screener(
+    metric: str = Query("fused_score", description=f"One of {', '.join(SCREENER_METRICS)}"),
+    limit: int = Query(20, ge=1),
+    risk_level: Optional[str] = Query(None, description="LOW, MEDIUM or HIGH"),
+    action: Optional[str] = Query(None, description="STRONG_BUY, BUY, HOLD, SELL or STRONG_SELL"),
+    order: str = Query("desc", description="desc for strongest first, asc for weakest first")
+):
+    """Top-ranked symbols from the precomputed screener"""
+    if metric not in SCREENER_METRICS:
+        raise HTTPException(status_code=400, detail=f"metric must be one of {list(SCREENER_METRICS)}")
+    if order not in ("desc", "asc"):
+        raise HTTPException(status_code=400, detail="order must be desc or asc")
+    if limit > screener.k:
+        raise HTTPException(status_code=400, detail=f"limit must be at most {screener.k}")
+    results = screener.top(
+        metric, limit,
+        risk_level.upper() if risk_level else None,
+        action.upper() if action else None,
+        order
+    )
+    return {
+        "metric": metric,
+        "order": order,
+        "results": results,
+        "count": len(results),
+        "universe_size": len(screener),
+        "last_update": datetime.utcfromtimestamp(screener.last_update).isoformat() if screener.last_update else None
+    }
+
+async def load_positions(pool) -> Dict[str, float]:
+    """Current book as symbol -> market value"""
+    rows = await pool.fetch(
+        "SELECT symbol, COALESCE(market_value, quantity * current_price, quantity * avg_cost) AS value "
+        "FROM portfolio_positions WHERE quantity <> 0"
+    )
+    return {row["symbol"]: float(row["value"]) for row in rows if row["value"] is not None}
+
+async def load_daily_closes(pool, symbols: List[str], lookback_days: int) -> list:
+    """(symbol, day, close) rows rolled up from the hourly continuous aggregate"""
+    rows = await pool.fetch(
+        """
+        SELECT symbol, time_bucket('1 day', bucket) AS day, last(close, bucket) AS close
+        FROM market_data_hourly
+        WHERE symbol = ANY($1::text[]) AND bucket >= NOW() - make_interval(days => $2)
+        GROUP BY symbol, day
+        """,
+        symbols, lookback_days
+    )
+    return [(row["symbol"], row["day"], row["close"]) for row in rows]
+
+async def load_returns(pool, symbols: List[str], lookback_days: int) -> np.ndarray:
+    prices = align_price_history(await load_daily_closes(pool, symbols, lookback_days), symbols)
+    if len(prices) < 3:
+        raise HTTPException(status_code=422, detail="Not enough overlapping price history for the requested symbols")
+    return simple_returns(prices)
+
+async def load_covariance(pool, symbols: List[str], lookback_days: int) -> np.ndarray:
+    key = (tuple(symbols), lookback_days)
+    cached = covariance_cache.get(key)
+    if cached and (datetime.utcnow().timestamp() - cached[0]) < CACHE_TTL_SECONDS:
+        return cached[1]
+    cov = covariance_matrix(await load_returns(pool, symbols, lookback_days)) * 252
+    covariance_cache[key] = (datetime.utcnow().timestamp(), cov)
+    return cov
+
+@app.post("/api/v1/risk")
+async def get_portfolio_risk(request: RiskRequest = Body(default_factory=RiskRequest)):
+    """Historical, parametric and Monte Carlo VaR/CVaR with per-position risk contributions"""
+    if not all(0.5 < c < 1 for c in request.confidence_levels):
+        raise HTTPException(status_code=400, detail="confidence_levels must be between 0.5 and 1")
+    if not 0 <= request.simulations <= RISK_MAX_SIMULATIONS:
+        raise HTTPException(status_code=400, detail=f"simulations must be between 0 and {RISK_MAX_SIMULATIONS}")
+
+    pool = await get_pool()
+    if pool is None:
+        raise HTTPException(status_code=503, detail="Database not configured")
+
+    positions = {s.upper(): v for s, v in request.positions.items()} if request.positions else await load_positions(pool)
+    if not positions:
+        raise HTTPException(status_code=404, detail="No open positions")
+
+    symbols = sorted(positions)
+    returns = await load_returns(pool, symbols, request.lookback_days)
+
+    loop = asyncio.get_running_loop()
+    report = await loop.run_in_executor(None, partial(
+        portfolio_risk,
+        symbols,
+        [positions[s] for s in symbols],
+        returns,
+        confidence_levels=request.confidence_levels,
+        horizon_days=request.horizon_days,
+        simulations=request.simulations,
+        df=request.student_t_df,
+        ewma_halflife=request.ewma_halflife,
+        seed=request.seed,
+        executor=get_risk_pool()
+    ))
+    report["horizon_days"] = request.horizon_days
+    report["timestamp"] = datetime.utcnow().isoformat()
+    return report
+
+@app.post("/api/v1/optimize")
+async def optimize_portfolio(request: OptimizeRequest = Body(default_factory=OptimizeRequest)):
+    """Mean-variance, risk-parity and max-diversification weights using fused scores as views"""
+    unknown = set(request.methods) - set(OPTIMIZER_METHODS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown methods: {sorted(unknown)}")
+
+    pool = await get_pool()
+    if pool is None:
+        raise HTTPException(status_code=503, detail="Database not configured")
+
+    current = request.current_weights
+    if request.symbols:
+        symbols = sorted({s.strip().upper() for s in request.symbols if s.strip()})
+    else:
+        positions = await load_positions(pool)
+        symbols = sorted(positions)
+        if current is None and positions:
+            total = sum(abs(v) for v in positions.values()) or 1.0
+            current = {s: v / total for s, v in positions.items()}
+    if len(symbols) < 2:
+        raise HTTPException(status_code=400, detail="At least two symbols are required")
+
+    cov = await load_covariance(pool, symbols, request.lookback_days)
+    views = {s.upper(): v for s, v in (request.views or {}).items()}
+    scores = np.array([views.get(s, latest_fused_scores.get(s, 50.0)) for s in symbols])
+    mu = views_from_scores(scores, np.sqrt(np.diag(cov)), request.view_scale)
+    previous = None
+    if current is not None:
+        current = {s.upper(): w for s, w in current.items()}
+        previous = np.array([current.get(s, 0.0) for s in symbols])
+
+    loop = asyncio.get_running_loop()
+    try:
+        results = await loop.run_in_executor(None, partial(
+            optimizer.optimize,
+            symbols, cov, mu,
+            methods=request.methods,
+            min_weight=request.min_weight,
+            max_weight=request.max_weight,
+            risk_aversion=request.risk_aversion,
+            previous=previous,
+            max_turnover=request.max_turnover
+        ))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    portfolios = {}
+    for method, result in results.items():
+        portfolios[method] = {
+            "weights": {s: round(float(w), 6) for s, w in zip(symbols, result["weights"])},
+            "risk_contributions": {s: round(float(r), 6) for s, r in zip(symbols, result["risk_contributions"])},
+            "expected_return": round(result["expected_return"], 6),
+            "volatility": round(result["volatility"], 6),
+            "diversification_ratio": round(result["diversification_ratio"], 4),
+            "turnover": round(result["turnover"], 6) if result["turnover"] is not None else None,
+            "iterations": result["iterations"],
+            "warm_start": result["warm_start"]
+        }
+    return {
+        "symbols": symbols,
+        "views": {s: {"fused_score": float(score), "expected_return": round(float(m), 6)} for s, score, m in zip(symbols, scores, mu)},
+        "portfolios": portfolios,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+def to_timestamp(value: Optional[datetime]) -> float:
+    """Epoch seconds; naive datetimes are UTC like the rest of the service"""
+    if value is None:
+        return time.time()
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+async def rebuild_performance(pool):
+    """Replay valuations and closed trades in time order in a single streaming pass"""
+    query = """
+        SELECT 'valuation' AS kind, timestamp AS ts, total_value AS value FROM portfolio_history
+        UNION ALL
+        SELECT 'trade' AS kind, executed_at AS ts, pnl AS value FROM trade_history WHERE pnl IS NOT NULL
+        ORDER BY ts
+    """
+    count = 0
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            async for row in conn.cursor(query, prefetch=1000):
+                if row["kind"] == "valuation":
+                    performance_tracker.on_valuation(float(row["value"]), row["ts"].timestamp())
+                else:
+                    performance_tracker.on_trade(float(row["value"]))
+                count += 1
+    print(f"[Performance] Rebuilt from {count} rows")
+
+async def write_performance_snapshot(pool):
+    snap = performance_tracker.snapshot()
+    clamp = lambda value, limit: max(-limit, min(limit, value))  # fit the DECIMAL column precision
+    await pool.execute(
+        """
+        INSERT INTO portfolio_history (total_value, daily_pnl, daily_pnl_pct, sharpe_ratio, win_rate, max_drawdown, timestamp)
+        VALUES ($1, $2, $3, $4, $5, $6, $7)
+        """,
+        snap["total_value"], snap["daily_pnl"], clamp(snap["daily_pnl_pct"], 9999.9999),
+        clamp(snap["sharpe_ratio"], 99.9999), snap["win_rate"], snap["max_drawdown"],
+        datetime.fromtimestamp(performance_tracker.last_ts, tz=timezone.utc)
+    )
+
+async def load_performance():
+    pool = await get_pool()
+    if pool is None:
+        return
+    try:
+        await rebuild_performance(pool)
+    except Exception as e:
+        print(f"[Performance] Rebuild failed: {e}")
+
+@app.get("/api/v1/performance")
+async def get_performance():
+    """Running Sharpe/Sortino, win rate, drawdown and P&L"""
+    return {**performance_tracker.snapshot(), "timestamp": datetime.utcnow().isoformat()}
+
+@app.post("/api/v1/performance/valuations")
+async def record_valuation(tick: ValuationTick):
+    """Fold a portfolio mark into the tracker and persist it to portfolio_history"""
+    if tick.total_value <= 0:
+        raise HTTPException(status_code=400, detail="total_value must be positive")
+    if not performance_tracker.on_valuation(tick.total_value, to_timestamp(tick.timestamp)):
+        # Older than the latest mark: neither counted nor persisted
+        return {**performance_tracker.snapshot(), "accepted": False}
+    pool = await get_pool()
+    if pool is not None:
+        await write_performance_snapshot(pool)
+    return {**performance_tracker.snapshot(), "accepted": True}
+
+@app.post("/api/v1/performance/trades")
+async def record_trade(trade: TradeRecord):
+    """Persist a fill to trade_history and fold its realized P&L into the tracker"""
+    pool = await get_pool()
+    if pool is not None:
+        await pool.execute(
+            """
+            INSERT INTO trade_history (symbol, side, quantity, price, total_value, fees, pnl, strategy, signal_id, executed_at)
+            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
+            """,
+            trade.symbol.upper(), trade.side.upper(), trade.quantity, trade.price, trade.quantity * trade.price,
+            trade.fees, trade.pnl, trade.strategy, trade.signal_id,
+            datetime.fromtimestamp(to_timestamp(trade.executed_at), tz=timezone.utc)
+        )
+    performance_tracker.on_trade(trade.pnl)
+    return performance_tracker.snapshot()
+
+@app.get("/api/v1/metrics")
+async def get_metrics():
+    """Internal counters for caches, prewarming, screener and optimizer"""
+    return {
+        "indicator_cache": {"symbols": len(indicator_cache), "ttl_seconds": CACHE_TTL_SECONDS},
+        "prewarm": indicator_prewarmer.metrics(),
+        "snapshot": cache_snapshotter.metrics(),
+        "upstream_quota": await alpha_vantage_quota.metrics(),
+        "upstream_transport": transport_metrics(),
+        "insight_versions": insight_versions.metrics(),
+        "event_stream": event_stream.metrics(),
+        "triggers": trigger_engine.metrics(),
+        "event_bus": event_bus.metrics(),
+        "screener": screener.metrics_summary(),
+        "optimizer": optimizer.stats
+    }
 
 @app.get("/api/v1/signals/{symbol}", response_model=TradingSignal)
 async def get_trading_signal(symbol: str):
@@ -444,9 +1005,8 @@ async def get_trading_signal(symbol: str):
     symbol = symbol.upper()
     
     # Get current quote for entry price
-    async with httpx.AsyncClient() as client:
-        quote_response = await client.get(
-            ALPHA_VANTAGE_BASE_URL,
+    with span("signal.quote", symbol=symbol):
+        quote_response = await alpha_vantage_get(
             params={
                 "function": "GLOBAL_QUOTE",
                 "symbol": symbol,
@@ -454,16 +1014,22 @@ async def get_trading_signal(symbol: str):
             },
             timeout=30.0
         )
-        
-        current_price = 100.0
-        if quote_response.status_code == 200:
-            quote_data = quote_response.json()
-            if "Global Quote" in quote_data:
-                current_price = float(quote_data["Global Quote"].get("05. price", 100))
+    
+    # Levels are still derived around 100 without a quote, but such a signal is never tracked
+    current_price = 100.0
+    quoted = False
+    if quote_response.status_code == 200:
+        price = quote_response.json().get("Global Quote", {}).get("05. price")
+        try:
+            current_price = float(price)
+            quoted = current_price > 0
+        except (TypeError, ValueError):
+            current_price = 100.0
     
     # Get insight for the symbol
-    insights_response = await get_quant_insights(symbol)
-    insight = insights_response["insights"][0] if insights_response["insights"] else None
+    with span("signal.insights", symbol=symbol):
+        insights = await build_insights([symbol])
+    insight = insights[0].model_dump() if insights else None
     
     if not insight:
         raise HTTPException(status_code=404, detail="Could not generate signal")
@@ -500,38 +1066,254 @@ async def get_trading_signal(symbol: str):
         risk_reward_ratio=round(risk_reward, 2),
         timestamp=datetime.utcnow().isoformat()
     )
+    if not quoted:
+        print(f"[Signals] No quote for {symbol}; signal returned but not tracked or published")
+        return signal
+    await track_signal(signal)
     
-    await publish_to_kafka(KAFKA_TOPIC_TRADING_SIGNALS, signal.model_dump())
+    message = signal.model_dump()
+    await event_bus.publish(KAFKA_TOPIC_TRADING_SIGNALS, message, key=symbol)
+    event_stream.publish("signal", message)
     
     return signal
 
 @app.get("/api/v1/signals", response_model=Dict[str, List[TradingSignal]])
 async def get_recent_signals(limit: int = 10):
-    """Get recent generated trading signals"""
-    # In a real app, this would query the database/kafka store
-    mock_signals = [
-        TradingSignal(
-            symbol="BTC/USD", action="BUY", entry_price=43250, stop_loss=41500, 
-            take_profit=48000, position_size_pct=5.0, confidence=94, 
-            risk_reward_ratio=2.7, timestamp=datetime.utcnow().isoformat()
-        ),
-        TradingSignal(
-            symbol="NVDA", action="BUY", entry_price=485.2, stop_loss=460, 
-            take_profit=550, position_size_pct=5.0, confidence=91, 
-            risk_reward_ratio=2.5, timestamp=datetime.utcnow().isoformat()
-        ),
-        TradingSignal(
-            symbol="SOL/USD", action="SELL", entry_price=98.5, stop_loss=105, 
-            take_profit=85, position_size_pct=3.0, confidence=72, 
-            risk_reward_ratio=2.1, timestamp=datetime.utcnow().isoformat()
+    """
+    Get recent generated trading signals, newest first, from the event stream's replay
+    log. Nothing generated since startup falls back to the latest trading_signals rows.
+    """
+    recent = event_stream.recent("signal", limit)
+    if recent:
+        return {"signals": recent}
+    pool = await get_pool()
+    if pool is None:
+        return {"signals": []}
+    try:
+        rows = await pool.fetch(
+            """
+            SELECT id, symbol, action, entry_price::float8 AS entry_price, stop_loss::float8 AS stop_loss,
+                   target_price::float8 AS take_profit,
+                   COALESCE(position_size_pct, 0)::float8 AS position_size_pct,
+                   COALESCE(confidence, 0)::float8 AS confidence,
+                   COALESCE(risk_reward, 0)::float8 AS risk_reward_ratio, status, timestamp
+            FROM trading_signals
+            WHERE entry_price IS NOT NULL AND stop_loss IS NOT NULL AND target_price IS NOT NULL
+            ORDER BY timestamp DESC
+            LIMIT $1
+            """,
+            limit
         )
-    ]
-    return {"signals": mock_signals[:limit]}
+    except Exception as e:
+        print(f"[Signals] Could not load recent signals: {e}")
+        return {"signals": []}
+    return {"signals": [
+        TradingSignal(**{**dict(row), "timestamp": row["timestamp"].isoformat()}) for row in rows
+    ]}
 
-async def publish_to_kafka(topic: str, message: dict):
-    """Kafka producer - in production use aiokafka"""
-    print(f"[Kafka] Publishing to {topic}: {json.dumps(message)[:100]}...")
-    return True
+async def track_signal(signal: TradingSignal):
+    """
+    Record a BUY/SELL signal in trading_signals and watch its stop and target.
+    It is entered at the quoted price, so it starts 'active', and it supersedes
+    the symbol's previous active signal. HOLD signals are not recorded. The
+    triggers change only after the database commit, so a failed write leaves
+    the previous signal both active and watched.
+    """
+    if not signal.action.endswith(("BUY", "SELL")):
+        return
+    signal.status = "active"
+    created = datetime.fromisoformat(signal.timestamp).replace(tzinfo=timezone.utc)
+    pool = await get_pool()
+    if pool is not None:
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    """
+                    UPDATE trading_signals SET status = 'superseded', closed_at = $2
+                    WHERE symbol = $1 AND status = 'active'
+                    """,
+                    signal.symbol, created
+                )
+                signal.id = await conn.fetchval(
+                    """
+                    INSERT INTO trading_signals (symbol, action, entry_price, target_price, stop_loss,
+                                                 position_size_pct, confidence, risk_reward, status,
+                                                 executed_at, timestamp)
+                    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)
+                    RETURNING id
+                    """,
+                    signal.symbol, signal.action, signal.entry_price, signal.take_profit, signal.stop_loss,
+                    signal.position_size_pct, signal.confidence, signal.risk_reward_ratio, signal.status,
+                    created, created
+                )
+    previous = active_signal_groups.pop(signal.symbol, None)
+    if previous is not None:
+        trigger_engine.cancel_group(previous)
+    stop, _ = trigger_engine.add_signal(
+        (signal.id, created, signal.action, signal.entry_price),
+        signal.symbol, signal.action, signal.stop_loss, signal.take_profit
+    )
+    active_signal_groups[signal.symbol] = stop.group
+
+async def restore_signal_triggers():
+    """
+    Re-arm the stops and targets of signals still active in the database. Only
+    the newest per symbol is armed; older ones left active are marked superseded.
+    """
+    pool = await get_pool()
+    if pool is None:
+        return
+    try:
+        rows = await pool.fetch(
+            """
+            SELECT id, timestamp, symbol, action, entry_price::float8 AS entry_price,
+                   stop_loss::float8 AS stop_loss, target_price::float8 AS target_price
+            FROM trading_signals
+            WHERE status = 'active'
+            ORDER BY timestamp DESC
+            """
+        )
+    except Exception as e:
+        print(f"[Triggers] Could not load active signals: {e}")
+        return
+    superseded = []
+    for row in rows:
+        if row["symbol"] in active_signal_groups:
+            superseded.append((row["id"], row["timestamp"]))
+        elif row["stop_loss"] and row["target_price"] and row["entry_price"]:
+            stop, _ = trigger_engine.add_signal(
+                (row["id"], row["timestamp"], row["action"], row["entry_price"]),
+                row["symbol"], row["action"], row["stop_loss"], row["target_price"]
+            )
+            active_signal_groups[row["symbol"]] = stop.group
+    if superseded:
+        try:
+            await pool.executemany(
+                """
+                UPDATE trading_signals SET status = 'superseded', closed_at = NOW()
+                WHERE id = $1 AND timestamp = $2 AND status = 'active'
+                """,
+                superseded
+            )
+        except Exception as e:
+            print(f"[Triggers] Could not supersede {len(superseded)} duplicate signals: {e}")
+    print(f"[Triggers] Re-armed {len(active_signal_groups)} active signals, superseded {len(superseded)}")
+
+async def handle_fired(fired: list):
+    """Close the owning signals, then publish every fired trigger"""
+    closes = []
+    events = []
+    for f in fired:
+        event = f.to_dict()
+        trigger = f.trigger
+        if trigger.signal is not None:
+            if active_signal_groups.get(trigger.symbol) == trigger.group:
+                del active_signal_groups[trigger.symbol]
+            signal_id, created, action, entry_price = trigger.signal
+            pnl = f.price - entry_price if action.endswith("BUY") else entry_price - f.price
+            status = SIGNAL_STATUS_ON_FIRE[trigger.kind]
+            event.update(signal_id=signal_id, action=action, entry_price=entry_price,
+                         status=status, pnl_per_unit=round(pnl, 4))
+            if signal_id is not None:
+                closed_at = datetime.fromtimestamp(f.timestamp, tz=timezone.utc)
+                closes.append((signal_id, created, status, closed_at, pnl))
+        events.append(event)
+    if closes:
+        pool = await get_pool()
+        if pool is not None:
+            try:
+                await pool.executemany(
+                    """
+                    UPDATE trading_signals SET status = $3, closed_at = $4, actual_pnl = $5
+                    WHERE id = $1 AND timestamp = $2 AND status = 'active'
+                    """,
+                    closes
+                )
+            except Exception as e:
+                print(f"[Triggers] Could not update {len(closes)} signals: {e}")
+    for event in events:
+        await event_bus.publish(KAFKA_TOPIC_TRADE_TRIGGERS, event, key=event["symbol"])
+        event_stream.publish("trigger", event)
+    return events
+
+async def on_market_tick(message):
+    """raw_market_data consumer: check each tick against the trigger index"""
+    tick = message.value
+    timestamp = tick.get("timestamp")
+    fired = trigger_engine.on_tick(
+        tick["symbol"], float(tick["price"]),
+        to_timestamp(datetime.fromisoformat(timestamp)) if timestamp else None
+    )
+    if fired:
+        await handle_fired(fired)
+
+event_bus.subscribe(KAFKA_TOPIC_RAW_MARKET, "quant-triggers", on_market_tick)
+
+@app.post("/api/v1/triggers/ticks")
+async def ingest_trigger_ticks(ticks: List[TriggerTick]):
+    """Check a batch of ticks against the active stops, targets and alerts"""
+    fired = []
+    for tick in ticks:
+        fired.extend(trigger_engine.on_tick(
+            tick.symbol.upper(), tick.price, to_timestamp(tick.timestamp) if tick.timestamp else None
+        ))
+    events = await handle_fired(fired) if fired else []
+    return {"ticks": len(ticks), "fired": events}
+
+@app.post("/api/v1/alerts")
+async def create_price_alert(alert: PriceAlert):
+    """One-shot alert fired when the price trades at or through the level"""
+    direction = alert.direction.lower()
+    if direction not in (ABOVE, BELOW):
+        raise HTTPException(status_code=400, detail=f"direction must be '{ABOVE}' or '{BELOW}'")
+    try:
+        trigger = trigger_engine.add_level(alert.symbol, direction, alert.price, note=alert.note)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return trigger.to_dict()
+
+@app.delete("/api/v1/alerts/{alert_id}")
+async def delete_price_alert(alert_id: int):
+    trigger = trigger_engine.get(alert_id)
+    if trigger is None or trigger.kind != "alert":
+        raise HTTPException(status_code=404, detail="Alert not found")
+    trigger_engine.cancel(alert_id)
+    return {"deleted": alert_id}
+
+@app.get("/api/v1/triggers")
+async def list_triggers(
+    symbol: Optional[str] = None,
+    kind: Optional[str] = Query(None, description="stop_loss, take_profit or alert"),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """Active trigger levels"""
+    triggers = trigger_engine.active(symbol, kind, limit)
+    return {"triggers": [t.to_dict() for t in triggers], "count": len(triggers), "active": len(trigger_engine)}
+
+@app.get("/api/v1/stream")
+async def stream_events(
+    types: Optional[str] = Query(None, description="Comma-separated event types (insight, signal, trigger); default all"),
+    symbols: Optional[str] = Query(None, description="Comma-separated symbols; default all"),
+    actions: Optional[str] = Query(None, description="Comma-separated actions, e.g. BUY,STRONG_BUY; default all"),
+    last_event_id: Optional[int] = Query(None, description="Resume after this event id (initial connect)"),
+    last_event_id_header: Optional[int] = Header(None, alias="Last-Event-ID")
+):
+    """
+    Server-sent events of newly computed insights and trading signals. On
+    reconnect the browser's Last-Event-ID header resumes the stream from the
+    replay log; idle streams receive comment heartbeats.
+    """
+    event_filter = EventFilter(
+        types=parse_list(types, upper=False),
+        symbols=parse_list(symbols),
+        actions=parse_list(actions)
+    )
+    resume_from = last_event_id_header if last_event_id_header is not None else last_event_id
+    return StreamingResponse(
+        event_stream.stream(event_filter, resume_from),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 if __name__ == "__main__":
     import uvicorn
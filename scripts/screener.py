@@ -0,0 +1,135 @@
+"""
+Cross-Sectional Screener
+Rankings of the latest per-symbol insights, kept sorted as scores update.
+
+Every (metric, order, risk level, action) combination - with "*" for "any" -
+is a bucket holding its members and a bounded top-k list. A symbol update
+touches only the buckets it belongs to and usually just shifts one element in
+a k-sized list; a full refill (heapq.nsmallest over the bucket) is needed only
+when a top-k member falls back. Ranking queries slice a prebuilt list, so they
+cost O(limit) however large the universe is.
+"""
+
+import heapq
+import time
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+DEFAULT_METRICS = ("fused_score", "momentum", "sentiment_score")
+ORDERS = ("desc", "asc")
+ANY = "*"
+
+BucketKey = Tuple[str, str, str, str]  # metric, order, risk_level, action
+
+class TopKBucket:
+    """Members of one bucket and their k best, as sorted (-value, symbol) keys"""
+
+    __slots__ = ("k", "members", "top", "top_symbols")
+
+    def __init__(self, k: int):
+        self.k = k
+        self.members: Dict[str, float] = {}
+        self.top: List[Tuple[float, str]] = []
+        self.top_symbols: Set[str] = set()
+
+    def _refill(self):
+        self.top = heapq.nsmallest(self.k, ((-v, s) for s, v in self.members.items()))
+        self.top_symbols = {s for _, s in self.top}
+
+    def set(self, symbol: str, value: float):
+        old = self.members.get(symbol)
+        self.members[symbol] = value
+        key = (-value, symbol)
+        if symbol in self.top_symbols:
+            if value == old:
+                return
+            del self.top[bisect_left(self.top, (-old, symbol))]
+            if value > old or len(self.members) <= self.k:
+                insort(self.top, key)
+            else:
+                # Dropped within the list: a non-member might now outrank it
+                self._refill()
+        elif len(self.top) < self.k:
+            insort(self.top, key)
+            self.top_symbols.add(symbol)
+        elif key < self.top[-1]:
+            insort(self.top, key)
+            _, evicted = self.top.pop()
+            self.top_symbols.discard(evicted)
+            self.top_symbols.add(symbol)
+
+    def remove(self, symbol: str):
+        if self.members.pop(symbol, None) is not None and symbol in self.top_symbols:
+            self._refill()
+
+class Screener:
+    """Latest entry per symbol plus top-k rankings per metric/filter bucket"""
+
+    def __init__(self, k: int = 100, metrics: Iterable[str] = DEFAULT_METRICS):
+        self.k = k
+        self.metrics = tuple(metrics)
+        self.entries: Dict[str, Dict] = {}
+        self._buckets: Dict[BucketKey, TopKBucket] = {}
+        self.stats = {"updates": 0, "queries": 0}
+        self.last_update: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _bucket_keys(self, entry: Dict) -> List[BucketKey]:
+        keys = []
+        for metric in self.metrics:
+            if entry.get(metric) is None:
+                continue
+            for order in ORDERS:
+                for risk in (entry.get("risk_level", ANY), ANY):
+                    for action in (entry.get("action", ANY), ANY):
+                        keys.append((metric, order, risk, action))
+        return keys
+
+    def update(self, entry: Dict):
+        """Insert or replace a symbol's entry (needs 'symbol', 'risk_level', 'action' and the metrics)"""
+        symbol = entry["symbol"]
+        old = self.entries.get(symbol)
+        new_keys = self._bucket_keys(entry)
+        if old is not None:
+            for key in set(self._bucket_keys(old)) - set(new_keys):
+                self._buckets[key].remove(symbol)
+        for key in new_keys:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TopKBucket(self.k)
+            value = float(entry[key[0]])
+            bucket.set(symbol, value if key[1] == "desc" else -value)
+        self.entries[symbol] = entry
+        self.stats["updates"] += 1
+        self.last_update = time.time()
+
+    def remove(self, symbol: str):
+        entry = self.entries.pop(symbol, None)
+        if entry is not None:
+            for key in self._bucket_keys(entry):
+                self._buckets[key].remove(symbol)
+
+    def top(
+        self,
+        metric: str = "fused_score",
+        limit: int = 20,
+        risk_level: Optional[str] = None,
+        action: Optional[str] = None,
+        order: str = "desc"
+    ) -> List[Dict]:
+        self.stats["queries"] += 1
+        bucket = self._buckets.get((metric, order, risk_level or ANY, action or ANY))
+        if bucket is None:
+            return []
+        return [self.entries[symbol] for _, symbol in bucket.top[:limit]]
+
+    def metrics_summary(self) -> Dict:
+        return {
+            **self.stats,
+            "symbols": len(self.entries),
+            "buckets": len(self._buckets),
+            "k": self.k,
+            "last_update": self.last_update
+        }
@@ -0,0 +1,148 @@
+"""
+Sentiment Aggregates
+Incrementally maintained, exponentially time-decayed sentiment per ticker.
+
+Each scored article updates its tickers' running sums in O(1); queries decay the
+stored sums to "now" on read, so mean, counts and distribution are answered in
+O(1) per window without refetching or rescanning articles. Decay ages the
+counts but not the mean, so the index also records when each ticker's feed
+was last read (mark_fed); callers use it to decide when to refetch.
+"""
+
+import math
+import time
+from typing import Dict, Optional
+
+# Window name -> half-life in seconds
+DEFAULT_WINDOWS: Dict[str, float] = {"1h": 3600, "24h": 86400, "7d": 604800}
+
+BULLISH_THRESHOLD = 0.15
+BEARISH_THRESHOLD = -0.15
+
+def parse_windows(spec: str) -> Dict[str, float]:
+    """Parse "1h,24h,7d" (units s/m/h/d) into {name: half_life_seconds}"""
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    windows = {}
+    for name in (w.strip() for w in spec.split(",")):
+        if name and name[-1] in units and name[:-1].isdigit():
+            windows[name] = int(name[:-1]) * units[name[-1]]
+    return windows or dict(DEFAULT_WINDOWS)
+
+class DecayedAggregate:
+    """Exponentially decayed weight, weighted score sum and label counts for one window"""
+
+    __slots__ = ("rate", "weight", "score_sum", "bullish", "neutral", "bearish", "updated_at")
+
+    def __init__(self, half_life: float):
+        self.rate = math.log(2) / half_life
+        self.weight = 0.0
+        self.score_sum = 0.0
+        self.bullish = 0.0
+        self.neutral = 0.0
+        self.bearish = 0.0
+        self.updated_at = 0.0
+
+    def add(self, score: float, ts: float):
+        if ts >= self.updated_at:
+            # Newer observation: decay the accumulator forward to ts
+            factor = math.exp(-self.rate * (ts - self.updated_at)) if self.updated_at else 0.0
+            self.weight *= factor
+            self.score_sum *= factor
+            self.bullish *= factor
+            self.neutral *= factor
+            self.bearish *= factor
+            self.updated_at = ts
+            contribution = 1.0
+        else:
+            # Late arrival: discount it to the accumulator's reference time
+            contribution = math.exp(-self.rate * (self.updated_at - ts))
+
+        self.weight += contribution
+        self.score_sum += score * contribution
+        if score >= BULLISH_THRESHOLD:
+            self.bullish += contribution
+        elif score <= BEARISH_THRESHOLD:
+            self.bearish += contribution
+        else:
+            self.neutral += contribution
+
+    def snapshot(self, now: float) -> Dict:
+        factor = math.exp(-self.rate * max(0.0, now - self.updated_at)) if self.updated_at else 0.0
+        weight = self.weight * factor
+        return {
+            "avg_sentiment": round(self.score_sum / self.weight, 3) if self.weight > 0 else 0.0,
+            "effective_count": round(weight, 3),
+            "sentiment_distribution": {
+                "bullish": round(self.bullish * factor, 3),
+                "neutral": round(self.neutral * factor, 3),
+                "bearish": round(self.bearish * factor, 3)
+            }
+        }
+
+class TickerSentiment:
+    """All windows plus undecayed totals for a single ticker"""
+
+    __slots__ = ("windows", "article_count", "distribution", "last_published", "fed_at")
+
+    def __init__(self, windows: Dict[str, float]):
+        self.windows = {name: DecayedAggregate(half_life) for name, half_life in windows.items()}
+        self.article_count = 0
+        self.distribution = {"bullish": 0, "neutral": 0, "bearish": 0}
+        self.last_published = 0.0
+        self.fed_at = 0.0
+
+class SentimentAggregateIndex:
+    """Per-ticker decayed sentiment, updated as each scored article arrives"""
+
+    def __init__(self, windows: Optional[Dict[str, float]] = None, default_window: str = "24h"):
+        self.window_config = windows or dict(DEFAULT_WINDOWS)
+        self.default_window = default_window if default_window in self.window_config else next(iter(self.window_config))
+        self._tickers: Dict[str, TickerSentiment] = {}
+
+    def __contains__(self, ticker: str) -> bool:
+        return ticker.upper() in self._tickers
+
+    def __len__(self) -> int:
+        return len(self._tickers)
+
+    def _entry(self, ticker: str) -> TickerSentiment:
+        entry = self._tickers.get(ticker)
+        if entry is None:
+            entry = self._tickers[ticker] = TickerSentiment(self.window_config)
+        return entry
+
+    def update(self, ticker: str, score: float, published_ts: float):
+        entry = self._entry(ticker.upper())
+        for aggregate in entry.windows.values():
+            aggregate.add(score, published_ts)
+
+        entry.article_count += 1
+        if score >= BULLISH_THRESHOLD:
+            entry.distribution["bullish"] += 1
+        elif score <= BEARISH_THRESHOLD:
+            entry.distribution["bearish"] += 1
+        else:
+            entry.distribution["neutral"] += 1
+        entry.last_published = max(entry.last_published, published_ts)
+
+    def mark_fed(self, ticker: str, now: Optional[float] = None):
+        """Record that the ticker's own news feed was just read, even if it had no articles"""
+        self._entry(ticker.upper()).fed_at = time.time() if now is None else now
+
+    def snapshot(self, ticker: str, now: Optional[float] = None) -> Optional[Dict]:
+        """Aggregate for a ticker; top-level mean comes from the default window"""
+        entry = self._tickers.get(ticker.upper())
+        if entry is None:
+            return None
+        now = time.time() if now is None else now
+        windows = {name: aggregate.snapshot(now) for name, aggregate in entry.windows.items()}
+        return {
+            "ticker": ticker.upper(),
+            "avg_sentiment": windows[self.default_window]["avg_sentiment"],
+            "article_count": entry.article_count,
+            "sentiment_distribution": dict(entry.distribution),
+            "windows": windows,
+            "default_window": self.default_window,
+            "last_published": entry.last_published,
+            "fed_at": entry.fed_at
+        }
@@ -0,0 +1,243 @@
+"""
+Compiled Lexicon Sentiment Engine
+Single-pass, word-boundary-aware keyword sentiment scoring for financial headlines.
+
+The lexicon is compiled once into dictionaries keyed by token. A text is
+tokenized in one regex pass, and each token costs one dictionary lookup
+whatever the number of terms (or multi-word phrases) defined, instead of one
+substring scan per keyword. A batch is joined into one string around a
+break token, so it is lowercased, tokenized and looked up in a single pass
+instead of once per text.
+"""
+
+import re
+from itertools import compress
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Bump whenever the lexicon or scoring formula changes so cached scores are invalidated
+LEXICON_VERSION = "lexicon-3"
+
+# Term -> weight. Positive weights are bullish, negative weights are bearish.
+# Terms are base forms; every word also matches its inflections ("beat
+# expectation" matches "beats expectations"). Multi-word phrases are matched as
+# whole token sequences.
+DEFAULT_LEXICON: Dict[str, float] = {
+    # Bullish
+    "surge": 1.0, "growth": 1.0, "profit": 1.0, "bullish": 1.0, "upgrade": 1.0,
+    "record": 1.0, "beat": 1.0, "strong": 1.0, "soar": 1.0, "rally": 1.0,
+    "gain": 1.0, "boom": 1.0, "breakthrough": 1.0, "optimistic": 1.0,
+    "outperform": 1.0, "exceed": 1.0, "momentum": 1.0, "upside": 1.0,
+    "buy": 1.0, "accumulate": 1.0,
+    "beat expectation": 1.5, "raise guidance": 1.5, "price target raise": 1.5,
+    # Bearish
+    "crash": -1.0, "loss": -1.0, "bearish": -1.0, "downgrade": -1.0, "miss": -1.0,
+    "weak": -1.0, "decline": -1.0, "concern": -1.0, "fall": -1.0, "drop": -1.0,
+    "plunge": -1.0, "risk": -1.0, "warning": -1.0, "sell": -1.0,
+    "underperform": -1.0, "cut": -1.0, "layoff": -1.0, "recession": -1.0,
+    "default": -1.0, "bankruptcy": -1.0,
+    "miss expectation": -1.5, "cut guidance": -1.5, "price target cut": -1.5,
+}
+
+# Tokens that flip the polarity of a term appearing within the negation window after them
+DEFAULT_NEGATIONS = frozenset({
+    "no", "not", "never", "without", "neither", "nor", "isn't", "wasn't",
+    "aren't", "don't", "doesn't", "didn't", "won't", "cannot", "can't", "fails", "failed",
+})
+DEFAULT_NEGATION_WINDOW = 3
+
+# Curly quotes in wire copy ("don\u2019t") are read as plain apostrophes
+_APOSTROPHES = str.maketrans({"\u2019": "'", "\u2018": "'", "\u02bc": "'"})
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+# Word tokens plus runs of punctuation. A punctuation run never matches a phrase
+# word, so it ends any phrase in progress; it counts as one token of a negation window.
+_SCAN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?|[^\sa-z0-9']+")
+# Base form recorded for negators, so one lookup classifies every token
+NEGATOR = "<not>"
+# Token separating the texts of a batch, and its base form. It never matches a
+# phrase word, and it resets the negation window.
+TEXT_BREAK = "\x00"
+BREAK = "<break>"
+_BATCH_SEPARATOR = f" {TEXT_BREAK} "
+_VOWELS = frozenset("aeiou")
+
+def _inflections(word: str) -> List[str]:
+    """Expand a base word into its common inflected forms (surge -> surges, surged, surging)"""
+    forms = {word, word + "s", word + "es", word + "ed", word + "ing"}
+    if word.endswith("e"):
+        forms.update({word + "d", word[:-1] + "ing"})
+    if word.endswith("y") and len(word) > 1 and word[-2] not in _VOWELS:
+        forms.update({word[:-1] + "ies", word[:-1] + "ied"})
+    # Consonant-vowel-consonant endings double the final consonant (cut -> cutting, drop -> dropped)
+    if (len(word) >= 3 and word[-1] not in _VOWELS and word[-1] not in "wxy"
+            and word[-2] in _VOWELS and word[-3] not in _VOWELS):
+        forms.update({word + word[-1] + "ed", word + word[-1] + "ing"})
+    return sorted(forms)
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens; punctuation and whitespace act as word boundaries"""
+    return _TOKEN_RE.findall(text.lower().translate(_APOSTROPHES))
+
+class CompiledLexicon:
+    """
+    Lexicon compiled into token-level lookup tables.
+
+    Every inflected form of every word in the lexicon maps to its base form
+    (`lemmas`), so "beats", "beat" and "beating" all resolve to "beat".
+    Unigram weights are keyed by base form. Phrases are keyed by their first
+    base form and hold the remaining base forms, longest first, so
+    "price target raised" wins over anything shorter starting with "price".
+    Negators map to NEGATOR and the batch separator to BREAK. Punctuation
+    tokens have no base form, so a phrase never spans "beat, expectations".
+    """
+
+    def __init__(
+        self,
+        lexicon: Dict[str, float],
+        negations: Iterable[str] = (),
+        expand_inflections: bool = True,
+    ):
+        self.lemmas: Dict[str, str] = {}
+        self.unigrams: Dict[str, float] = {}
+        self.phrases: Dict[str, List[Tuple[List[str], float]]] = {}
+        for phrase, weight in lexicon.items():
+            words = tokenize(phrase)
+            if not words:
+                continue
+            for word in words:
+                for form in (_inflections(word) if expand_inflections else [word]):
+                    # Exact base forms take precedence over another word's inflection
+                    if form == word or form not in self.lemmas:
+                        self.lemmas[form] = word
+            if len(words) == 1:
+                self.unigrams[words[0]] = weight
+            else:
+                self.phrases.setdefault(words[0], []).append((words[1:], weight))
+        for candidates in self.phrases.values():
+            candidates.sort(key=lambda entry: -len(entry[0]))
+        self.negations = frozenset(" ".join(tokenize(n)) for n in negations)
+        for negation in self.negations:
+            self.lemmas.setdefault(negation, NEGATOR)
+        self.lemmas[TEXT_BREAK] = BREAK
+
+class LexiconSentimentEngine:
+    """Weighted-term sentiment scorer with negation handling and a batch API"""
+
+    def __init__(
+        self,
+        lexicon: Optional[Dict[str, float]] = None,
+        negations: Iterable[str] = DEFAULT_NEGATIONS,
+        negation_window: int = DEFAULT_NEGATION_WINDOW,
+    ):
+        self.tables = CompiledLexicon(lexicon or DEFAULT_LEXICON, negations)
+        self.negation_window = negation_window
+
+    def _lemmas(self, text: str) -> List[Optional[str]]:
+        """Base form per token (None for everything outside the lexicon), looked up in C"""
+        lowered = text.lower()
+        if not lowered.isascii():
+            lowered = lowered.translate(_APOSTROPHES)
+        return list(map(self.tables.lemmas.get, _SCAN_RE.findall(lowered)))
+
+    def _weights(self, found: List[Optional[str]]) -> List[Tuple[float, float]]:
+        """(positive_weight, negative_weight) per BREAK-separated segment of `found`"""
+        phrases = self.tables.phrases
+        unigrams = self.tables.unigrams
+        window = self.negation_window
+        segments = []
+        pos = neg = 0.0
+        negated_at = -1 - window
+        resume = 0
+        # Only positions holding a term, negator or break are visited in Python
+        for i in compress(range(len(found)), found):
+            if i < resume:
+                continue  # inside a phrase already counted
+            lemma = found[i]
+            if lemma is NEGATOR:
+                negated_at = i
+                continue
+            if lemma is BREAK:
+                segments.append((pos, neg))
+                pos = neg = 0.0
+                negated_at = -1 - window
+                continue
+            weight = None
+            for rest, phrase_weight in phrases.get(lemma, ()):
+                end = i + 1 + len(rest)
+                if found[i + 1:end] == rest:
+                    weight = phrase_weight
+                    resume = end
+                    break
+            if weight is None:
+                weight = unigrams.get(lemma)
+                if weight is None:
+                    continue
+            # A negator flips terms starting fewer than `window` tokens after it
+            if i - negated_at <= window:
+                weight = -weight
+            if weight > 0:
+                pos += weight
+            else:
+                neg -= weight
+        segments.append((pos, neg))
+        return segments
+
+    def score_weights(self, text: str) -> Tuple[float, float]:
+        """Return (positive_weight, negative_weight) for a text in one tokenizing pass"""
+        segments = self._weights(self._lemmas(text))
+        if len(segments) == 1:
+            return segments[0]
+        return sum(pos for pos, _ in segments), sum(neg for _, neg in segments)
+
+    def score(self, text: str) -> Tuple[float, str, float]:
+        """Score one text, returning (score, label, confidence)"""
+        return self._score_weights(*self.score_weights(text))
+
+    @staticmethod
+    def _score_weights(pos: float, neg: float) -> Tuple[float, str, float]:
+        total = pos + neg
+        if total == 0:
+            return 0.0, "neutral", 0.5
+
+        score = (pos - neg) / total * 0.8
+        score = max(-1.0, min(1.0, score))
+
+        if score > 0.15:
+            label = "positive"
+        elif score < -0.15:
+            label = "negative"
+        else:
+            label = "neutral"
+
+        confidence = min(0.95, 0.5 + abs(score) * 0.5)
+        return round(score, 3), label, round(confidence, 3)
+
+    def score_batch(self, texts: Iterable[str]) -> List[Tuple[float, str, float]]:
+        """
+        Score a list of texts (e.g. a page of headlines) in one tokenizing pass over
+        the whole batch. Syndicated headlines repeat heavily, so identical texts are
+        scored once per batch.
+        """
+        texts = list(texts)
+        unique = list(dict.fromkeys(texts))
+        if not unique:
+            return []
+        segments = self._weights(self._lemmas(_BATCH_SEPARATOR.join(unique)))
+        if len(segments) != len(unique):
+            # A text contained the break token itself; score the texts one by one
+            segments = [self.score_weights(text) for text in unique]
+        # Few distinct weight pairs occur, so each is turned into a score once
+        scored: Dict[Tuple[float, float], Tuple[float, str, float]] = {}
+        by_text = {}
+        for text, weights in zip(unique, segments):
+            result = scored.get(weights)
+            if result is None:
+                result = scored[weights] = self._score_weights(*weights)
+            by_text[text] = result
+        return [by_text[text] for text in texts]
+
+# Shared engine, compiled once at import
+default_engine = LexiconSentimentEngine()
+
+def score_texts(texts: List[str]) -> List[Tuple[float, str, float]]:
+    """Module-level entry point for process pool workers (picklable by reference)"""
+    return default_engine.score_batch(texts)
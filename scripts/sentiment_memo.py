@@ -0,0 +1,202 @@
+"""
+Sentiment Memo
+Content-addressed memoization of sentiment scores across endpoints and restarts.
+
+Scores are keyed by a hash of the normalized text plus the scorer version, held in
+an in-memory LRU and backed by a SQLite file so each unique article is analyzed
+once no matter which endpoint (or cache key) surfaced it.
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+Score = Tuple[float, str, float]
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for hashing: NFKC, casefolded, whitespace collapsed"""
+    return _WHITESPACE_RE.sub(" ", unicodedata.normalize("NFKC", text).casefold()).strip()
+
+def content_key(text: str, scorer_version: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(scorer_version.encode("utf-8"))
+    digest.update(b"\x1f")
+    digest.update(normalize_text(text).encode("utf-8"))
+    return digest.hexdigest()
+
+class SentimentMemo:
+    """
+    Two-tier (LRU memory + SQLite disk) memo of (score, label, confidence).
+
+    Nothing touches disk until open(), which the service lifespan calls. After
+    that the SQLite connection is used only from one dedicated thread. Lookups
+    that miss memory await a single query on that thread. New scores are served
+    from memory at once and written to disk in batches by run(), so the event
+    loop never waits on a commit.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_memory_entries: int = 50000,
+        flush_interval_seconds: float = 2.0,
+        flush_batch_size: int = 5000,
+    ):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.flush_interval = flush_interval_seconds
+        self.flush_batch_size = flush_batch_size
+        self._memory: "OrderedDict[str, Score]" = OrderedDict()
+        # Scored but not yet on disk; also consulted by lookups in case the LRU dropped them
+        self._pending: Dict[str, Score] = {}
+        self._db: Optional[sqlite3.Connection] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._wake = asyncio.Event()
+        # All counters are per unique key of a lookup or write
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "flushes": 0, "flush_errors": 0}
+
+    async def open(self):
+        if not self.path or self._db is not None:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sentiment-memo")
+        try:
+            self._db = await asyncio.get_running_loop().run_in_executor(self._executor, self._connect)
+        except (OSError, sqlite3.Error) as e:
+            print(f"[SentimentMemo] Could not open {self.path}, memoizing in memory only: {e}")
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _connect(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS sentiment_memo ("
+            "key TEXT PRIMARY KEY, score REAL NOT NULL, label TEXT NOT NULL, confidence REAL NOT NULL)"
+        )
+        db.commit()
+        return db
+
+    async def close(self):
+        """Write out pending scores and close the database"""
+        if self._db is None:
+            return
+        await self.flush()
+        db, self._db = self._db, None
+        await asyncio.get_running_loop().run_in_executor(self._executor, db.close)
+        self._executor.shutdown(wait=False)
+        self._executor = None
+
+    def _remember(self, key: str, value: Score):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    async def get_many(self, keys: Sequence[str]) -> Dict[str, Score]:
+        """Look up keys in memory, then fetch the remainder from disk in one query off the loop"""
+        found: Dict[str, Score] = {}
+        missing: List[str] = []
+        for key in dict.fromkeys(keys):
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                found[key] = value
+                continue
+            value = self._pending.get(key)
+            if value is not None:
+                self._remember(key, value)
+                found[key] = value
+            else:
+                missing.append(key)
+        self.stats["memory_hits"] += len(found)
+
+        if missing and self._db is not None:
+            rows = await asyncio.get_running_loop().run_in_executor(self._executor, self._select, missing)
+            for key, score, label, confidence in rows:
+                value = (score, label, confidence)
+                found[key] = value
+                self._remember(key, value)
+            self.stats["disk_hits"] += len(rows)
+            self.stats["misses"] += len(missing) - len(rows)
+        else:
+            self.stats["misses"] += len(missing)
+        return found
+
+    def _select(self, keys: List[str]) -> List[Tuple[str, float, str, float]]:
+        rows = []
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows += self._db.execute(
+                f"SELECT key, score, label, confidence FROM sentiment_memo "
+                f"WHERE key IN ({','.join('?' * len(chunk))})",
+                chunk
+            ).fetchall()
+        return rows
+
+    def put_many(self, items: Dict[str, Score]):
+        """Remember new scores; they reach disk on the next flush"""
+        for key, value in items.items():
+            self._remember(key, value)
+        self.stats["writes"] += len(items)
+        if self._db is not None and items:
+            self._pending.update(items)
+            if len(self._pending) >= self.flush_batch_size:
+                self._wake.set()
+
+    async def flush(self) -> int:
+        if self._db is None or not self._pending:
+            return 0
+        batch, self._pending = self._pending, {}
+        try:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._write, batch)
+        except sqlite3.Error as e:
+            self.stats["flush_errors"] += 1
+            print(f"[SentimentMemo] Flush of {len(batch)} scores failed: {e}")
+            # Keep them for the next attempt, behind anything scored meanwhile
+            self._pending = {**batch, **self._pending}
+            return 0
+        self.stats["flushes"] += 1
+        return len(batch)
+
+    def _write(self, batch: Dict[str, Score]):
+        self._db.executemany(
+            "INSERT OR REPLACE INTO sentiment_memo (key, score, label, confidence) VALUES (?, ?, ?, ?)",
+            [(key, *value) for key, value in batch.items()]
+        )
+        self._db.commit()
+
+    async def run(self):
+        """Flush pending scores every interval, or sooner once a full batch has built up"""
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    def metrics(self) -> Dict:
+        lookups = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["misses"]
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        return {
+            **self.stats,
+            "lookups": lookups,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_hit_rate": round(self.stats["memory_hits"] / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "pending_writes": len(self._pending),
+            "persistent": self._db is not None
+        }
@@ -0,0 +1,139 @@
+"""
+Single-Node Runner
+All three services in one process, connected through the in-process event bus.
+
+For small deployments without Kafka, Zookeeper and kafka-ui, the market
+ingestor is mounted at /market, the news ingestor at /news and the quant
+engine at /quant, all on one port. The services share this process's event
+bus (EVENT_TRANSPORT=memory unless set otherwise). Ticks the market ingestor
+publishes reach the quant engine's trigger consumer without leaving the
+process. The quant engine's calls to the news ingestor go to the /news mount
+of the same server.
+
+    python single_node.py --port 8000
+    python load_driver.py --market-url http://localhost:8000/market \\
+        --news-url http://localhost:8000/news --quant-url http://localhost:8000/quant
+
+--bench-bus N skips the HTTP server. It publishes N synthetic ticks through a
+memory bus into a trigger-engine consumer, then reports throughput, delivery
+latency and drops under the chosen overflow policy.
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Dict, List, Optional
+
+def create_app(port: int):
+    os.environ.setdefault("EVENT_TRANSPORT", "memory")
+    os.environ.setdefault("NEWS_INGESTOR_URL", f"http://localhost:{port}/news")
+    from fastapi import FastAPI
+
+    import market_data_ingestor
+    import news_ingestor
+    import quant_engine
+    from event_bus import event_bus
+
+    services = {"/market": market_data_ingestor, "/news": news_ingestor, "/quant": quant_engine}
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # Mounted apps do not get lifespan events, so run each service's here
+        async with AsyncExitStack() as stack:
+            for module in services.values():
+                await stack.enter_async_context(module.lifespan(module.app))
+            yield
+
+    app = FastAPI(title="Quant Platform (single node)", lifespan=lifespan)
+    for prefix, module in services.items():
+        app.mount(prefix, module.app)
+
+    @app.get("/api/v1/bus")
+    async def bus_metrics():
+        return event_bus.metrics()
+
+    return app
+
+async def bench_bus(
+    messages: int, symbols: List[str], policy: str, queue_size: int, levels: int, batch: int, seed: int
+) -> Dict:
+    import numpy as np
+
+    from event_bus import MemoryBus
+    from synthetic_data import SyntheticMarket
+    from trigger_engine import TriggerEngine, ABOVE, BELOW
+
+    market = SyntheticMarket(symbols, seed=seed)
+    engine = TriggerEngine()
+    rng = np.random.default_rng(seed)
+    for tick in market.ticks(1):
+        for offset in rng.uniform(0.001, 0.05, size=levels):
+            engine.add_level(tick["symbol"], ABOVE, tick["price"] * (1 + offset))
+            engine.add_level(tick["symbol"], BELOW, tick["price"] * (1 - offset))
+
+    bus = MemoryBus(max_queue=queue_size, policy_override=policy)
+    latencies: List[float] = []
+    fired = 0
+
+    async def on_tick(message):
+        nonlocal fired
+        tick = message.value
+        fired += len(engine.on_tick(tick["symbol"], tick["price"]))
+        latencies.append(time.perf_counter() - tick["sent"])
+
+    bus.subscribe("raw_market_data", "bench", on_tick)
+    await bus.start()
+    steps = max(1, messages // len(symbols))
+    ticks = market.ticks(steps)
+    started = time.perf_counter()
+    for i, tick in enumerate(ticks, 1):
+        tick["sent"] = time.perf_counter()
+        await bus.publish("raw_market_data", tick, key=tick["symbol"])
+        if i % batch == 0:
+            # Like a producer handling one request per batch, let the consumers run
+            await asyncio.sleep(0)
+    published_in = time.perf_counter() - started
+    await bus.stop(timeout=60)
+    elapsed = time.perf_counter() - started
+    topic = bus.metrics()["topics"]["raw_market_data"]
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000 if latencies else (0.0, 0.0)
+    return {
+        "published": len(ticks),
+        "delivered": len(latencies),
+        "dropped": topic["dropped"],
+        "policy": topic["policy"],
+        "publish_rate": round(len(ticks) / published_in, 1),
+        "delivery_rate": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(float(p50), 3),
+        "p99_ms": round(float(p99), 3),
+        "active_levels": levels * 2 * len(symbols),
+        "fired": fired
+    }
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--bench-bus", type=int, metavar="N", help="publish N synthetic ticks through the bus and exit")
+    parser.add_argument("--policy", default="block", help="overflow policy for --bench-bus (block, drop_newest, drop_oldest)")
+    parser.add_argument("--queue-size", type=int, default=10000, help="per-partition queue bound for --bench-bus")
+    parser.add_argument("--levels", type=int, default=10000, help="alert levels per symbol and side for --bench-bus")
+    parser.add_argument("--batch", type=int, default=100, help="ticks published between yields for --bench-bus")
+    parser.add_argument("--symbols", type=lambda s: [x.strip().upper() for x in s.split(",")],
+                        default=["AAPL", "NVDA", "MSFT", "TSLA", "AMZN", "GOOGL", "META", "AMD"])
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.bench_bus:
+        result = asyncio.run(bench_bus(
+            args.bench_bus, args.symbols, args.policy, args.queue_size, args.levels, args.batch, args.seed
+        ))
+        for name, value in result.items():
+            print(f"{name:>14}: {value}")
+    else:
+        import uvicorn
+        uvicorn.run(create_app(args.port), host=args.host, port=args.port)
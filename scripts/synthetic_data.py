@@ -0,0 +1,215 @@
+"""
+Synthetic Market and News Data
+Seeded generators of correlated price ticks and timestamped headlines for load tests.
+
+SyntheticMarket simulates geometric Brownian motion for a universe of symbols
+with a constant pairwise correlation (or a full correlation matrix), plus
+volume that rises with the size of each move and a bid/ask spread around the
+price. SyntheticNews emits headlines as a Poisson process. Each headline is
+built from lexicon terms whose balance follows a target sentiment, so the
+scorers see the sentiment you asked for. That target is a base bias plus,
+optionally, a loading on the symbol's recent return. Ticks and articles use
+the same fields as the Kafka messages and NewsArticle, with simulated
+timestamps. The same seed always reproduces the same stream.
+"""
+
+import math
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+from sentiment_lexicon import DEFAULT_LEXICON
+
+SECONDS_PER_YEAR = 365.25 * 86400
+
+BULLISH_TERMS = sorted(t for t, w in DEFAULT_LEXICON.items() if w > 0)
+BEARISH_TERMS = sorted(t for t, w in DEFAULT_LEXICON.items() if w < 0)
+NEUTRAL_PHRASES = [
+    "shares trade", "files quarterly report", "schedules investor day", "announces board meeting",
+    "updates product lineup", "comments on sector", "holds annual meeting"
+]
+HEADLINE_TEMPLATES = [
+    "{symbol} {a} as analysts see {b}",
+    "{symbol} shares {a} on {b} outlook",
+    "{symbol}: {a} and {b} dominate earnings call",
+    "Analysts flag {a} for {symbol} amid {b}",
+    "{symbol} {a} after {b} in quarterly results",
+]
+SOURCES = ["Synthetic Wire", "Market Sim", "Load Test News", "Replay Daily"]
+TOPICS = ["technology", "earnings", "financial_markets", "economy_macro", "mergers_and_acquisitions"]
+
+def correlation_matrix(n: int, correlation: Union[float, Sequence[Sequence[float]]]) -> np.ndarray:
+    if np.isscalar(correlation):
+        if not -1.0 / max(n - 1, 1) < correlation < 1.0:
+            raise ValueError("Constant correlation must be in (-1/(n-1), 1)")
+        matrix = np.full((n, n), float(correlation))
+        np.fill_diagonal(matrix, 1.0)
+        return matrix
+    matrix = np.asarray(correlation, dtype=float)
+    if matrix.shape != (n, n):
+        raise ValueError(f"Correlation matrix must be {n}x{n}")
+    return matrix
+
+class SyntheticMarket:
+    """Correlated GBM ticks for a universe of symbols"""
+
+    def __init__(
+        self,
+        symbols: Sequence[str],
+        seed: int = 0,
+        tick_seconds: float = 1.0,
+        drift: Union[float, Sequence[float]] = 0.05,
+        volatility: Union[float, Sequence[float]] = 0.30,
+        correlation: Union[float, Sequence[Sequence[float]]] = 0.3,
+        start_prices: Optional[Sequence[float]] = None,
+        base_volume: float = 1000.0,
+        spread_bps: float = 2.0,
+        start: Optional[datetime] = None
+    ):
+        self.symbols = list(symbols)
+        n = len(self.symbols)
+        self.rng = np.random.default_rng(seed)
+        self.tick_seconds = tick_seconds
+        dt = tick_seconds / SECONDS_PER_YEAR
+        drift = np.broadcast_to(np.asarray(drift, dtype=float), n)
+        self.sigma = np.broadcast_to(np.asarray(volatility, dtype=float), n)
+        # Per-tick log-return mean and volatility
+        self.step_mu = (drift - 0.5 * self.sigma ** 2) * dt
+        self.step_sigma = self.sigma * math.sqrt(dt)
+        self.chol = np.linalg.cholesky(correlation_matrix(n, correlation))
+        self.prices = (
+            np.asarray(start_prices, dtype=float) if start_prices is not None
+            else self.rng.uniform(20.0, 500.0, n).round(2)
+        )
+        self.base_volume = base_volume
+        self.spread = spread_bps / 10000.0
+        self.clock = start or datetime.utcnow()
+        self.last_returns = np.zeros(n)
+
+    def paths(self, steps: int) -> Dict[str, np.ndarray]:
+        """Advance `steps` ticks at once; prices/volumes/returns are (steps, n_symbols)"""
+        shocks = self.rng.standard_normal((steps, len(self.symbols))) @ self.chol.T
+        log_returns = self.step_mu + self.step_sigma * shocks
+        prices = self.prices * np.exp(np.cumsum(log_returns, axis=0))
+        # Volume scales with the move measured in standard deviations, with lognormal noise
+        intensity = 1.0 + np.abs(shocks)
+        volumes = np.maximum(1, self.base_volume * intensity * self.rng.lognormal(0.0, 0.5, prices.shape)).astype(np.int64)
+        self.prices = prices[-1]
+        self.last_returns = log_returns[-1]
+        times = [self.clock + timedelta(seconds=self.tick_seconds * (i + 1)) for i in range(steps)]
+        self.clock = times[-1]
+        return {"prices": prices, "volumes": volumes, "returns": log_returns, "timestamps": times}
+
+    def ticks(self, steps: int = 1) -> List[Dict]:
+        """Ticks in the raw_market_data message shape"""
+        batch = self.paths(steps)
+        half_spread = self.spread / 2
+        messages = []
+        for i, ts in enumerate(batch["timestamps"]):
+            stamp = ts.isoformat()
+            for j, symbol in enumerate(self.symbols):
+                price = float(batch["prices"][i, j])
+                bid = round(price * (1 - half_spread), 4)
+                ask = round(price * (1 + half_spread), 4)
+                messages.append({
+                    "symbol": symbol,
+                    "price": round(price, 4),
+                    "volume": int(batch["volumes"][i, j]),
+                    "bid": bid,
+                    "ask": ask,
+                    "spread": round(ask - bid, 4),
+                    "timestamp": stamp
+                })
+        return messages
+
+    def stream(self) -> Iterator[Dict]:
+        while True:
+            yield from self.ticks(1)
+
+class SyntheticNews:
+    """Poisson headline arrivals with controllable per-symbol sentiment"""
+
+    def __init__(
+        self,
+        symbols: Sequence[str],
+        seed: int = 0,
+        rate_per_minute: float = 30.0,
+        sentiment_bias: Union[float, Dict[str, float]] = 0.0,
+        sentiment_noise: float = 0.3,
+        return_loading: float = 0.0,
+        market: Optional[SyntheticMarket] = None,
+        start: Optional[datetime] = None
+    ):
+        self.symbols = list(symbols)
+        self.rng = np.random.default_rng(seed)
+        self.rate_per_second = rate_per_minute / 60.0
+        self.sentiment_bias = sentiment_bias
+        self.sentiment_noise = sentiment_noise
+        self.return_loading = return_loading
+        self.market = market
+        self.clock = start or (market.clock if market else datetime.utcnow())
+        self._counter = 0
+
+    def target_sentiment(self, symbol: str) -> float:
+        bias = self.sentiment_bias.get(symbol, 0.0) if isinstance(self.sentiment_bias, dict) else self.sentiment_bias
+        if self.market is not None and self.return_loading:
+            j = self.market.symbols.index(symbol)
+            # Last move in standard deviations, so the loading is scale-free
+            z = (self.market.last_returns[j] - self.market.step_mu[j]) / self.market.step_sigma[j]
+            bias += self.return_loading * math.tanh(z)
+        return float(np.clip(bias + self.rng.normal(0.0, self.sentiment_noise), -1.0, 1.0))
+
+    def headline(self, symbol: str, sentiment: float) -> str:
+        # Each slot is bullish with probability (1 + s) / 2, bearish otherwise; near zero,
+        # neutral phrases dilute the signal
+        slots = []
+        for _ in range(2):
+            if self.rng.random() > abs(sentiment) and self.rng.random() < 0.5:
+                slots.append(NEUTRAL_PHRASES[self.rng.integers(len(NEUTRAL_PHRASES))])
+            elif self.rng.random() < (1 + sentiment) / 2:
+                slots.append(BULLISH_TERMS[self.rng.integers(len(BULLISH_TERMS))])
+            else:
+                slots.append(BEARISH_TERMS[self.rng.integers(len(BEARISH_TERMS))])
+        template = HEADLINE_TEMPLATES[self.rng.integers(len(HEADLINE_TEMPLATES))]
+        return template.format(symbol=symbol, a=slots[0], b=slots[1])
+
+    def article(self, symbol: Optional[str] = None, published_at: Optional[datetime] = None) -> Dict:
+        """One article in the NewsArticle shape; sentiment_score is the generator's target"""
+        symbol = symbol or self.symbols[self.rng.integers(len(self.symbols))]
+        sentiment = self.target_sentiment(symbol)
+        self._counter += 1
+        published = published_at or self.clock
+        label = "positive" if sentiment > 0.2 else "negative" if sentiment < -0.2 else "neutral"
+        headline = self.headline(symbol, sentiment)
+        return {
+            "id": f"synthetic-{self._counter}",
+            "headline": headline,
+            "summary": f"{headline}. Generated for load testing.",
+            "source": SOURCES[self.rng.integers(len(SOURCES))],
+            "url": f"https://example.com/synthetic/{self._counter}",
+            "published_at": published.strftime("%Y%m%dT%H%M%S"),
+            "symbols": [symbol],
+            "sentiment_score": round(sentiment, 4),
+            "sentiment_label": label,
+            "relevance_score": round(float(self.rng.uniform(0.3, 1.0)), 4),
+            "ticker_scores": {symbol: round(sentiment, 4)},
+            "topics": [TOPICS[self.rng.integers(len(TOPICS))]]
+        }
+
+    def until(self, end: datetime) -> List[Dict]:
+        """Articles arriving between the generator clock and `end`"""
+        articles = []
+        if self.rate_per_second <= 0:
+            self.clock = max(self.clock, end)
+            return articles
+        while True:
+            arrival = self.clock + timedelta(seconds=float(self.rng.exponential(1.0 / self.rate_per_second)))
+            if arrival > end:
+                break
+            self.clock = arrival
+            articles.append(self.article(published_at=arrival))
+        return articles
+
+    def articles(self, count: int) -> List[Dict]:
+        return [self.article() for _ in range(count)]
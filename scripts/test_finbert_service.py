@@ -0,0 +1,115 @@
+"""
+Tests for the micro-batched FinBERT backend.
+
+No network is used. The model tests build a tiny random BERT classifier in a
+temporary directory, or load the one at FINBERT_TEST_MODEL (for example a local
+copy of hf-internal-testing/tiny-random-bert). They are skipped when torch or
+transformers is not installed. The batching and shutdown tests replace the
+model with a stub and always run.
+
+    python -m pytest -q test_finbert_service.py
+"""
+
+import asyncio
+import os
+import threading
+
+import pytest
+
+from finbert_service import FinBERTBatcher
+
+LABELS = {0: "positive", 1: "negative", 2: "neutral"}
+VOCAB = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "apple", "beats", "misses", "expectations", "shares", "fall"]
+
+@pytest.fixture(scope="module")
+def tiny_model(tmp_path_factory) -> str:
+    pytest.importorskip("torch")
+    transformers = pytest.importorskip("transformers")
+    if os.getenv("FINBERT_TEST_MODEL"):
+        return os.environ["FINBERT_TEST_MODEL"]
+
+    path = tmp_path_factory.mktemp("tiny-finbert")
+    vocab_file = path / "vocab.txt"
+    vocab_file.write_text("\n".join(VOCAB) + "\n")
+    transformers.BertTokenizer(str(vocab_file)).save_pretrained(str(path))
+    config = transformers.BertConfig(
+        vocab_size=len(VOCAB), hidden_size=8, num_hidden_layers=1, num_attention_heads=2,
+        intermediate_size=16, max_position_embeddings=64, num_labels=len(LABELS),
+        id2label=LABELS, label2id={label: i for i, label in LABELS.items()}
+    )
+    transformers.BertForSequenceClassification(config).save_pretrained(str(path))
+    return str(path)
+
+class StubBatcher(FinBERTBatcher):
+    """Batcher whose model is a function; `gate` holds inference until set"""
+
+    def __init__(self, **kwargs):
+        super().__init__(model_name="stub", **kwargs)
+        self.gate = threading.Event()
+        self.gate.set()
+        self.batch_sizes = []
+
+    def _load(self):
+        pass
+
+    def _infer(self, texts):
+        self.gate.wait(5)
+        self.batch_sizes.append(len(texts))
+        return [(0.5, "positive", 0.75) for _ in texts]
+
+def test_scores_with_tiny_model(tiny_model):
+    async def run():
+        batcher = FinBERTBatcher(model_name=tiny_model, max_batch_size=4, max_wait_ms=20)
+        await batcher.start()
+        try:
+            texts = ["apple beats expectations", "apple shares fall", "apple misses expectations"] * 3
+            return batcher, await batcher.score_many(texts)
+        finally:
+            await batcher.stop()
+
+    batcher, results = asyncio.run(run())
+    assert len(results) == 9
+    for score, label, confidence in results:
+        assert -1.0 <= score <= 1.0
+        assert label in LABELS.values()
+        assert 0.0 < confidence <= 1.0
+    # Identical texts score the same, whichever batch (and padding) they landed in
+    assert results[3][0] == pytest.approx(results[0][0], abs=2e-3)
+    assert results[6][0] == pytest.approx(results[0][0], abs=2e-3)
+    assert batcher.stats["batches"] < batcher.stats["requests"]
+    assert batcher.stats["token_cache_hits"] + batcher.stats["token_cache_misses"] == 9
+    assert batcher.stats["token_cache_hits"] > 0
+
+def test_concurrent_requests_are_batched():
+    async def run():
+        batcher = StubBatcher(max_batch_size=8, max_wait_ms=50)
+        await batcher.start()
+        try:
+            results = await batcher.score_many([f"headline {i}" for i in range(20)])
+        finally:
+            await batcher.stop()
+        return batcher, results
+
+    batcher, results = asyncio.run(run())
+    assert results == [(0.5, "positive", 0.75)] * 20
+    assert batcher.batch_sizes == [8, 8, 4]
+
+def test_score_before_start_raises():
+    with pytest.raises(RuntimeError):
+        asyncio.run(StubBatcher().score("apple beats expectations"))
+
+def test_stop_fails_pending_requests():
+    async def run():
+        batcher = StubBatcher(max_batch_size=2, max_wait_ms=1)
+        batcher.gate.clear()
+        await batcher.start()
+        # Two requests reach the (blocked) model, the rest wait in the queue
+        calls = [asyncio.create_task(batcher.score(f"headline {i}")) for i in range(5)]
+        await asyncio.sleep(0.05)
+        await batcher.stop()
+        batcher.gate.set()
+        return await asyncio.wait_for(asyncio.gather(*calls, return_exceptions=True), 1)
+
+    outcomes = asyncio.run(run())
+    assert len(outcomes) == 5
+    assert all(isinstance(outcome, RuntimeError) for outcome in outcomes)
@@ -0,0 +1,101 @@
+"""
+Tests for the sorted per-symbol trigger index.
+
+    python -m pytest -q test_trigger_engine.py
+"""
+
+import pytest
+
+from trigger_engine import ABOVE, BELOW, TriggerEngine, _Side
+
+def test_fired_stop_cancels_its_target():
+    engine = TriggerEngine()
+    stop, target = engine.add_signal("ref", "AAPL", "BUY", stop_loss=95.0, take_profit=112.0)
+    assert stop.group == target.group
+
+    assert engine.on_tick("AAPL", 100.0) == []
+    fired = engine.on_tick("AAPL", 94.5, timestamp=1.0)
+
+    assert [(f.trigger.kind, f.price, f.timestamp) for f in fired] == [("stop_loss", 94.5, 1.0)]
+    assert fired[0].trigger.signal == "ref"
+    assert engine.get(target.id) is None
+    assert engine.on_tick("AAPL", 120.0) == []
+    assert len(engine) == 0
+    assert engine.metrics()["signal_groups"] == 0
+    assert engine.stats["fired"] == 1
+    assert engine.stats["cancelled"] == 1
+
+def test_sell_signal_levels_are_mirrored():
+    engine = TriggerEngine()
+    engine.add_signal("ref", "TSLA", "STRONG_SELL", stop_loss=105.0, take_profit=88.0)
+
+    fired = engine.on_tick("TSLA", 87.0)
+
+    assert [f.trigger.kind for f in fired] == ["take_profit"]
+    assert len(engine) == 0
+
+def test_hold_signal_adds_nothing():
+    engine = TriggerEngine()
+    assert engine.add_signal("ref", "AAPL", "HOLD", stop_loss=97.0, take_profit=105.0) == []
+    assert len(engine) == 0
+
+def test_one_tick_crossing_both_sides():
+    engine = TriggerEngine()
+    upside = engine.add_level("NVDA", ABOVE, 99.0)
+    downside = engine.add_level("NVDA", BELOW, 101.0)
+    untouched = engine.add_level("NVDA", ABOVE, 100.5)
+
+    fired = engine.on_tick("NVDA", 100.0)
+
+    assert {f.trigger.id for f in fired} == {upside.id, downside.id}
+    assert [t.id for t in engine.active("NVDA")] == [untouched.id]
+
+def test_one_tick_crossing_both_levels_of_a_group_fires_one():
+    engine = TriggerEngine()
+    # A stop above the target: one price crosses both levels of the pair
+    engine.add_signal("ref", "AMD", "BUY", stop_loss=105.0, take_profit=100.0)
+
+    fired = engine.on_tick("AMD", 102.0)
+
+    assert len(fired) == 1
+    assert len(engine) == 0
+    assert engine.metrics()["signal_groups"] == 0
+
+@pytest.mark.parametrize("sign, levels, price, expected", [
+    # Above-levels fire nearest first as the price rises through them
+    (-1.0, [103.0, 101.0, 105.0, 102.0], 103.0, [101.0, 102.0, 103.0]),
+    # Below-levels fire nearest first as the price falls through them
+    (1.0, [97.0, 99.0, 95.0, 98.0], 97.0, [99.0, 98.0, 97.0]),
+])
+def test_pop_crossed_returns_the_suffix_in_crossing_order(sign, levels, price, expected):
+    engine = TriggerEngine()
+    side = _Side(sign)
+    direction = ABOVE if sign < 0 else BELOW
+    for level in levels:
+        side.add(engine.add_level("MSFT", direction, level))
+
+    crossed = side.pop_crossed(price)
+
+    assert [t.level for t in crossed] == expected
+    assert sorted(side.keys) == side.keys
+    assert [t.level for t in side.triggers] == [level for level in sorted(levels, key=lambda l: sign * l)
+                                                if level not in expected]
+    assert side.pop_crossed(price) == []
+
+def test_cancel_removes_level_from_index():
+    engine = TriggerEngine()
+    first = engine.add_level("META", ABOVE, 110.0)
+    second = engine.add_level("META", ABOVE, 110.0)
+
+    assert engine.cancel(first.id)
+    assert not engine.cancel(first.id)
+    assert [f.trigger.id for f in engine.on_tick("META", 111.0)] == [second.id]
+
+def test_rejects_invalid_levels():
+    engine = TriggerEngine()
+    with pytest.raises(ValueError):
+        engine.add_level("AAPL", "sideways", 100.0)
+    with pytest.raises(ValueError):
+        engine.add_level("AAPL", ABOVE, float("nan"))
+    with pytest.raises(ValueError):
+        engine.add_level("AAPL", BELOW, 0.0)
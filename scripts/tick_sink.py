@@ -0,0 +1,274 @@
+"""
+Tick Sink
+Batched, non-blocking persistence of ticks into the market_data hypertable.
+
+Request handlers hand rows to offer(), which appends them to a bounded
+in-memory queue and returns at once. A full queue drops the rows and counts
+them; it never blocks. Streaming producers that can wait use put_many(),
+which applies backpressure: it waits for queue space up to a timeout. A few
+writer tasks drain the queue with asyncpg's binary COPY
+(copy_records_to_table). Each writer flushes when a batch fills or
+`flush_seconds` after the last flush, whichever comes first. Writers use
+separate pool connections, so COPYs overlap.
+
+A batch that fails on bad data (a value the column rejects) is split in
+half and each half written again, down to single rows; rows that fail on
+their own are set aside and counted as rejected, so one bad row cannot stop
+persistence. A batch that fails for any other reason (no pool, lost
+connection) is retried after `retry_seconds`, at most `max_retries` times,
+and then dropped. At shutdown a failed batch goes back to the queue instead.
+"""
+
+import asyncio
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+MARKET_DATA_COLUMNS = ("symbol", "price", "volume", "bid", "ask", "spread", "timestamp", "source")
+
+TickRow = Tuple  # values in MARKET_DATA_COLUMNS order
+
+def is_data_error(error: Exception) -> bool:
+    """True when the database rejected the rows themselves rather than failing to take them"""
+    try:
+        import asyncpg
+    except ImportError:
+        return False
+    return isinstance(error, (asyncpg.DataError, asyncpg.IntegrityConstraintViolationError))
+
+def tick_row(
+    symbol: str,
+    price: float,
+    volume: int,
+    timestamp: Optional[datetime] = None,
+    bid: Optional[float] = None,
+    ask: Optional[float] = None,
+    source: str = "unknown"
+) -> TickRow:
+    """market_data row; naive timestamps are taken as UTC"""
+    if timestamp is None:
+        timestamp = datetime.now(timezone.utc)
+    elif timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    spread = ask - bid if bid is not None and ask is not None else None
+    return (symbol, price, int(volume), bid, ask, spread, timestamp, source)
+
+class CumulativeVolume:
+    """
+    Per-trade volume for snapshot quotes. Quote endpoints report the day's
+    cumulative volume, and every refresh would otherwise persist the whole
+    figure again. delta() returns the volume added since the symbol's last
+    observed cumulative value. The first observation returns 0, since what
+    came before it is unknown. A value below the last one means the day
+    rolled over, and the new day's count so far is returned. Zero readings
+    (sources without volume) are ignored.
+    """
+
+    def __init__(self):
+        self._last: Dict[str, int] = {}
+
+    def delta(self, symbol: str, cumulative: int) -> int:
+        if cumulative <= 0:
+            return 0
+        last = self._last.get(symbol)
+        self._last[symbol] = cumulative
+        if last is None:
+            return 0
+        return cumulative - last if cumulative >= last else cumulative
+
+class TickSink:
+    def __init__(
+        self,
+        get_pool: Callable[[], Awaitable],
+        table: str = "market_data",
+        columns: Sequence[str] = MARKET_DATA_COLUMNS,
+        max_queue: int = 200000,
+        batch_size: int = 5000,
+        flush_seconds: float = 1.0,
+        writers: int = 2,
+        retry_seconds: float = 2.0,
+        max_retries: int = 5
+    ):
+        self.get_pool = get_pool
+        self.table = table
+        self.columns = tuple(columns)
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.writers = writers
+        self.retry_seconds = retry_seconds
+        self.max_retries = max_retries
+        self._rows: Deque[TickRow] = deque()
+        self._data = asyncio.Event()
+        self._space = asyncio.Event()
+        self._space.set()
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = False
+        self.running = False
+        self.stats = {
+            "enqueued": 0, "dropped": 0, "written": 0, "batches": 0,
+            "write_failures": 0, "requeued": 0, "rejected": 0, "high_water": 0
+        }
+        self._last_flush_ms = 0.0
+        self._rate_window: Deque[Tuple[float, int]] = deque()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _push(self, rows: Sequence[TickRow]) -> int:
+        accepted = min(len(rows), self.max_queue - len(self._rows))
+        if accepted <= 0:
+            self._space.clear()
+            return 0
+        self._rows.extend(rows[:accepted] if accepted < len(rows) else rows)
+        self.stats["enqueued"] += accepted
+        depth = len(self._rows)
+        if depth > self.stats["high_water"]:
+            self.stats["high_water"] = depth
+        if depth >= self.batch_size:
+            self._data.set()
+        if depth >= self.max_queue:
+            self._space.clear()
+        return accepted
+
+    def offer(self, row: TickRow) -> bool:
+        """Enqueue without waiting; False (and counted as dropped) when full or not running"""
+        return self.offer_many((row,)) == 1
+
+    def offer_many(self, rows: Sequence[TickRow]) -> int:
+        if not self.running:
+            return 0
+        accepted = self._push(rows)
+        self.stats["dropped"] += len(rows) - accepted
+        return accepted
+
+    async def put_many(self, rows: Sequence[TickRow], timeout: float = 1.0) -> int:
+        """Enqueue, waiting up to `timeout` for space; rows still not queued are dropped"""
+        if not self.running:
+            return 0
+        deadline = time.monotonic() + timeout
+        done = self._push(rows)
+        while done < len(rows):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                await asyncio.wait_for(self._space.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+            done += self._push(rows[done:])
+        self.stats["dropped"] += len(rows) - done
+        return done
+
+    async def _write(self, batch: List[TickRow]) -> bool:
+        pool = await self.get_pool()
+        if pool is None:
+            return False
+        started = time.perf_counter()
+        async with pool.acquire() as conn:
+            await conn.copy_records_to_table(self.table, records=batch, columns=self.columns)
+        self._last_flush_ms = (time.perf_counter() - started) * 1000
+        now = time.monotonic()
+        self._rate_window.append((now, len(batch)))
+        while self._rate_window and now - self._rate_window[0][0] > 10:
+            self._rate_window.popleft()
+        self.stats["written"] += len(batch)
+        self.stats["batches"] += 1
+        return True
+
+    async def _persist(self, batch: List[TickRow]) -> List[TickRow]:
+        """
+        Write `batch`, bisecting around rows the database rejects. Returns the
+        rows a non-data failure left unwritten, in order, for the caller to retry.
+        """
+        parts = [batch]
+        while parts:
+            part = parts.pop()
+            try:
+                if await self._write(part):
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if is_data_error(e):
+                    if len(part) == 1:
+                        self.stats["rejected"] += 1
+                        print(f"[TickSink] Rejected row {part[0]!r}: {e}")
+                    else:
+                        middle = len(part) // 2
+                        parts.append(part[middle:])
+                        parts.append(part[:middle])
+                    continue
+                print(f"[TickSink] COPY of {len(part)} rows failed: {e}")
+            return [row for rows in [part, *reversed(parts)] for row in rows]
+        return []
+
+    async def _writer(self):
+        while True:
+            if len(self._rows) < self.batch_size and not self._stopping:
+                try:
+                    await asyncio.wait_for(self._data.wait(), self.flush_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                self._data.clear()
+            if not self._rows:
+                if self._stopping:
+                    return
+                continue
+            count = min(self.batch_size, len(self._rows))
+            batch = [self._rows.popleft() for _ in range(count)]
+            self._space.set()
+            attempts = 0
+            while True:
+                batch = await self._persist(batch)
+                if not batch:
+                    break
+                self.stats["write_failures"] += 1
+                attempts += 1
+                if self._stopping:
+                    room = self.max_queue - len(self._rows)
+                    if room > 0:
+                        # Oldest rows first, so the rows keep their order
+                        self._rows.extendleft(reversed(batch[:room]))
+                        self.stats["requeued"] += min(room, len(batch))
+                    self.stats["dropped"] += max(0, len(batch) - room)
+                    return
+                if attempts > self.max_retries:
+                    print(f"[TickSink] Dropping {len(batch)} rows after {self.max_retries} retries")
+                    self.stats["dropped"] += len(batch)
+                    break
+                await asyncio.sleep(self.retry_seconds)
+
+    def start(self):
+        self.running = True
+        self._stopping = False
+        self._tasks = [asyncio.create_task(self._writer()) for _ in range(self.writers)]
+
+    async def stop(self, timeout: float = 10.0):
+        """Stop accepting rows and drain what is queued, giving up after `timeout`"""
+        self.running = False
+        self._stopping = True
+        self._data.set()
+        if not self._tasks:
+            return
+        _, pending = await asyncio.wait(self._tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._rows:
+            print(f"[TickSink] {len(self._rows)} rows not persisted at shutdown")
+        self._tasks = []
+
+    def metrics(self) -> Dict:
+        window = self._rate_window
+        span = window[-1][0] - window[0][0] if len(window) > 1 else 0.0
+        rate = sum(n for _, n in list(window)[1:]) / span if span > 0 else 0.0
+        return {
+            **self.stats,
+            "running": self.running,
+            "queue_depth": len(self._rows),
+            "max_queue": self.max_queue,
+            "last_flush_ms": round(self._last_flush_ms, 2),
+            "rows_per_second": round(rate, 1)
+        }
@@ -0,0 +1,185 @@
+"""
+Distributed Tracing
+OpenTelemetry spans around upstream calls, cache lookups, scoring and publishing.
+
+Tracing is off unless TRACING_ENABLED=true and the opentelemetry SDK is
+installed. Otherwise span() yields a no-op span and the header helpers return
+nothing, so instrumented code runs unchanged and at no cost. Trace context
+travels between services in W3C traceparent headers: instrument_app extracts
+it from incoming HTTP requests, http_headers() injects it into internal calls,
+and kafka_headers()/extract_context() carry it on Kafka messages. Spans are
+exported to an OTLP collector, to a JSON-lines file per service, or to the
+console, as set by TRACING_EXPORTER.
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "otlp")  # otlp | file | console
+TRACING_FILE_DIR = os.getenv("TRACING_FILE_DIR", "traces")
+TRACING_SAMPLE_RATIO = float(os.getenv("TRACING_SAMPLE_RATIO", "1.0"))
+OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318")
+
+_tracer = None
+_provider = None
+_span_kinds: Dict[str, Any] = {}
+
+class _NoopSpan:
+    """Stands in for an OpenTelemetry span when tracing is disabled"""
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, attributes: Dict[str, Any]):
+        pass
+
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        pass
+
+    def record_exception(self, exception: BaseException):
+        pass
+
+    def update_name(self, name: str):
+        pass
+
+    def is_recording(self) -> bool:
+        return False
+
+NOOP_SPAN = _NoopSpan()
+
+def _json_file_exporter(path: str):
+    from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+    class JsonLinesSpanExporter(SpanExporter):
+        """One JSON object per finished span, appended to `path`"""
+
+        def __init__(self):
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._lock = threading.Lock()
+
+        def export(self, spans):
+            lines = [json.dumps(json.loads(s.to_json()), separators=(",", ":")) for s in spans]
+            with self._lock, open(path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+            return SpanExportResult.SUCCESS
+
+        def shutdown(self):
+            pass
+
+    return JsonLinesSpanExporter()
+
+def init_tracing(service_name: str) -> bool:
+    """Install the tracer provider for this process; returns whether tracing is active"""
+    global _tracer, _provider
+    if not TRACING_ENABLED or _tracer is not None:
+        return _tracer is not None
+    try:
+        from opentelemetry import trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+        from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+    except ImportError:
+        print("[Tracing] opentelemetry SDK not installed; tracing disabled")
+        return False
+
+    if TRACING_EXPORTER == "file":
+        exporter = _json_file_exporter(os.path.join(TRACING_FILE_DIR, f"{service_name}.jsonl"))
+    elif TRACING_EXPORTER == "console":
+        exporter = ConsoleSpanExporter()
+    else:
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            print("[Tracing] OTLP exporter not installed; tracing disabled")
+            return False
+        exporter = OTLPSpanExporter(endpoint=f"{OTLP_ENDPOINT.rstrip('/')}/v1/traces")
+
+    _provider = TracerProvider(
+        resource=Resource.create({"service.name": service_name}),
+        sampler=ParentBased(TraceIdRatioBased(TRACING_SAMPLE_RATIO))
+    )
+    _provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(_provider)
+    _tracer = trace.get_tracer(service_name)
+    _span_kinds.update({
+        "internal": trace.SpanKind.INTERNAL,
+        "server": trace.SpanKind.SERVER,
+        "client": trace.SpanKind.CLIENT,
+        "producer": trace.SpanKind.PRODUCER,
+        "consumer": trace.SpanKind.CONSUMER
+    })
+    print(f"[Tracing] Exporting {service_name} spans via {TRACING_EXPORTER}")
+    return True
+
+def shutdown_tracing():
+    """Flush pending spans"""
+    global _tracer, _provider
+    if _provider is not None:
+        _provider.shutdown()
+    _tracer = None
+    _provider = None
+
+@contextmanager
+def span(name: str, kind: str = "internal", context=None, **attributes):
+    """Child of the current span (or of `context`); None-valued attributes are dropped"""
+    if _tracer is None:
+        yield NOOP_SPAN
+        return
+    with _tracer.start_as_current_span(
+        name,
+        context=context,
+        kind=_span_kinds[kind],
+        attributes={k: v for k, v in attributes.items() if v is not None}
+    ) as current:
+        yield current
+
+def _inject() -> Dict[str, str]:
+    carrier: Dict[str, str] = {}
+    if _tracer is not None:
+        from opentelemetry import propagate
+        propagate.inject(carrier)
+    return carrier
+
+def http_headers() -> Dict[str, str]:
+    """traceparent/tracestate for an outgoing internal HTTP call"""
+    return _inject()
+
+def kafka_headers() -> List[Tuple[str, bytes]]:
+    """Trace context as Kafka record headers"""
+    return [(key, value.encode("utf-8")) for key, value in _inject().items()]
+
+def extract_context(headers: Union[Dict[str, str], Iterable[Tuple[str, Union[str, bytes]]], None]):
+    """Parent context from HTTP headers or Kafka record headers (None when tracing is off)"""
+    if _tracer is None or not headers:
+        return None
+    from opentelemetry import propagate
+    items = headers.items() if hasattr(headers, "items") else headers
+    carrier = {k.lower(): v.decode("utf-8") if isinstance(v, bytes) else v for k, v in items}
+    return propagate.extract(carrier)
+
+def instrument_app(app):
+    """Server span per request, continuing the caller's trace when headers carry one"""
+
+    @app.middleware("http")
+    async def trace_requests(request, call_next):
+        if _tracer is None:
+            return await call_next(request)
+        with span(
+            f"{request.method} {request.url.path}",
+            kind="server",
+            context=extract_context(dict(request.headers)),
+            **{"http.method": request.method, "http.target": request.url.path}
+        ) as current:
+            response = await call_next(request)
+            route = request.scope.get("route")
+            if route is not None:
+                current.update_name(f"{request.method} {route.path}")
+            current.set_attribute("http.status_code", response.status_code)
+            return response
+
+    return app
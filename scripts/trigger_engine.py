@@ -0,0 +1,270 @@
+"""
+Trigger Engine
+Per-symbol sorted price-level indexes of signal stops/targets and user alerts, checked on every tick.
+
+Every active level sits in its symbol's book on one of two sides. "above" levels
+fire when the price trades at or above them (long targets, short stops, upside
+alerts). "below" levels fire at or below them (long stops, short targets,
+downside alerts). Each side is a pair of parallel lists kept sorted with
+bisect. Above-levels are stored negated, so on both sides the crossed levels
+are a suffix of the list. A tick therefore costs one bisect per side plus the
+fired levels: O(log n + k). The common case, a tick that crosses nothing,
+stops after comparing against each side's nearest level. Firing removes the
+suffix in one slice. The stop and target of a signal form a one-cancels-other
+group: when one fires, its sibling is withdrawn. The engine is synchronous and
+does no I/O. Callers persist status changes and publish the fired events.
+"""
+
+import math
+import time
+from bisect import bisect_left, bisect_right
+from itertools import count
+from typing import Any, Dict, Hashable, List, Optional, Set
+
+ABOVE = "above"
+BELOW = "below"
+
+class Trigger:
+    __slots__ = ("id", "symbol", "kind", "direction", "level", "signal", "group", "note", "created_at")
+
+    def __init__(
+        self,
+        trigger_id: int,
+        symbol: str,
+        kind: str,
+        direction: str,
+        level: float,
+        signal: Any = None,
+        group: Optional[Hashable] = None,
+        note: Optional[str] = None
+    ):
+        self.id = trigger_id
+        self.symbol = symbol
+        self.kind = kind  # stop_loss, take_profit or alert
+        self.direction = direction
+        self.level = level
+        self.signal = signal  # caller's reference to the owning signal, if any
+        self.group = group
+        self.note = note
+        self.created_at = time.time()
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "symbol": self.symbol,
+            "kind": self.kind,
+            "direction": self.direction,
+            "level": self.level,
+            "note": self.note,
+            "created_at": self.created_at
+        }
+
+class Fired:
+    __slots__ = ("trigger", "price", "timestamp")
+
+    def __init__(self, trigger: Trigger, price: float, timestamp: float):
+        self.trigger = trigger
+        self.price = price
+        self.timestamp = timestamp
+
+    def to_dict(self) -> Dict:
+        return {**self.trigger.to_dict(), "price": self.price, "fired_at": self.timestamp}
+
+class _Side:
+    """Levels ordered by key ascending; crossed levels are always a suffix"""
+    __slots__ = ("sign", "keys", "triggers")
+
+    def __init__(self, sign: float):
+        self.sign = sign  # -1 for above-levels, +1 for below-levels
+        self.keys: List[float] = []
+        self.triggers: List[Trigger] = []
+
+    def add(self, trigger: Trigger):
+        key = self.sign * trigger.level
+        i = bisect_right(self.keys, key)
+        self.keys.insert(i, key)
+        self.triggers.insert(i, trigger)
+
+    def remove(self, trigger: Trigger) -> bool:
+        key = self.sign * trigger.level
+        i = bisect_left(self.keys, key)
+        while i < len(self.keys) and self.keys[i] == key:
+            if self.triggers[i] is trigger:
+                del self.keys[i]
+                del self.triggers[i]
+                return True
+            i += 1
+        return False
+
+    def pop_crossed(self, price: float) -> List[Trigger]:
+        keys = self.keys
+        if not keys or keys[-1] < self.sign * price:
+            return []
+        i = bisect_left(keys, self.sign * price)
+        crossed = self.triggers[i:]
+        del keys[i:]
+        del self.triggers[i:]
+        # In the order a moving price crosses them
+        crossed.reverse()
+        return crossed
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+class _Book:
+    __slots__ = ("above", "below")
+
+    def __init__(self):
+        self.above = _Side(-1.0)
+        self.below = _Side(1.0)
+
+    def side(self, direction: str) -> _Side:
+        return self.above if direction == ABOVE else self.below
+
+    def __len__(self) -> int:
+        return len(self.above) + len(self.below)
+
+class TriggerEngine:
+    def __init__(self):
+        self._books: Dict[str, _Book] = {}
+        self._triggers: Dict[int, Trigger] = {}
+        self._groups: Dict[Hashable, Set[int]] = {}
+        self._by_kind: Dict[str, int] = {}
+        self._ids = count(1)
+        self._group_ids = count(1)
+        self.stats = {"ticks": 0, "fired": 0, "cancelled": 0, "added": 0, "tick_seconds": 0.0}
+
+    def __len__(self) -> int:
+        return len(self._triggers)
+
+    def add_level(
+        self,
+        symbol: str,
+        direction: str,
+        level: float,
+        kind: str = "alert",
+        signal: Any = None,
+        group: Optional[Hashable] = None,
+        note: Optional[str] = None
+    ) -> Trigger:
+        if direction not in (ABOVE, BELOW):
+            raise ValueError(f"direction must be '{ABOVE}' or '{BELOW}'")
+        if not math.isfinite(level) or level <= 0:
+            raise ValueError("level must be a positive price")
+        trigger = Trigger(next(self._ids), symbol.upper(), kind, direction, float(level), signal, group, note)
+        book = self._books.get(trigger.symbol)
+        if book is None:
+            book = self._books[trigger.symbol] = _Book()
+        book.side(direction).add(trigger)
+        self._triggers[trigger.id] = trigger
+        if group is not None:
+            self._groups.setdefault(group, set()).add(trigger.id)
+        self._by_kind[kind] = self._by_kind.get(kind, 0) + 1
+        self.stats["added"] += 1
+        return trigger
+
+    def add_signal(
+        self,
+        signal: Any,
+        symbol: str,
+        action: str,
+        stop_loss: float,
+        take_profit: float
+    ) -> List[Trigger]:
+        """
+        Stop and target of a BUY/SELL signal as a one-cancels-other pair, both
+        carrying `signal` (the caller's reference); other actions add nothing.
+        """
+        action = action.upper()
+        if action.endswith("BUY"):
+            stop_direction, target_direction = BELOW, ABOVE
+        elif action.endswith("SELL"):
+            stop_direction, target_direction = ABOVE, BELOW
+        else:
+            return []
+        group = ("signal", next(self._group_ids))
+        return [
+            self.add_level(symbol, stop_direction, stop_loss, "stop_loss", signal, group),
+            self.add_level(symbol, target_direction, take_profit, "take_profit", signal, group)
+        ]
+
+    def _forget(self, trigger: Trigger):
+        if self._triggers.pop(trigger.id, None) is None:
+            return
+        self._by_kind[trigger.kind] -= 1
+        if trigger.group is not None:
+            members = self._groups.get(trigger.group)
+            if members is not None:
+                members.discard(trigger.id)
+                if not members:
+                    del self._groups[trigger.group]
+        book = self._books.get(trigger.symbol)
+        if book is not None and not book:
+            del self._books[trigger.symbol]
+
+    def cancel(self, trigger_id: int) -> bool:
+        trigger = self._triggers.get(trigger_id)
+        if trigger is None:
+            return False
+        book = self._books.get(trigger.symbol)
+        if book is not None:
+            book.side(trigger.direction).remove(trigger)
+        self._forget(trigger)
+        self.stats["cancelled"] += 1
+        return True
+
+    def cancel_group(self, group: Hashable) -> int:
+        return sum(self.cancel(trigger_id) for trigger_id in list(self._groups.get(group, ())))
+
+    def on_tick(self, symbol: str, price: float, timestamp: Optional[float] = None) -> List[Fired]:
+        """Fire and remove every level of `symbol` crossed by `price`"""
+        self.stats["ticks"] += 1
+        book = self._books.get(symbol)
+        if book is None or not math.isfinite(price) or price <= 0:
+            return []
+        started = time.perf_counter()
+        crossed = book.above.pop_crossed(price) + book.below.pop_crossed(price)
+        fired = []
+        if crossed:
+            timestamp = time.time() if timestamp is None else timestamp
+            done_groups = set()
+            for trigger in crossed:
+                if trigger.group is not None and trigger.group in done_groups:
+                    self._forget(trigger)  # sibling already fired on this tick
+                    continue
+                self._forget(trigger)
+                fired.append(Fired(trigger, price, timestamp))
+                if trigger.group is not None:
+                    done_groups.add(trigger.group)
+                    self.cancel_group(trigger.group)
+            self.stats["fired"] += len(fired)
+        self.stats["tick_seconds"] += time.perf_counter() - started
+        return fired
+
+    def get(self, trigger_id: int) -> Optional[Trigger]:
+        return self._triggers.get(trigger_id)
+
+    def active(self, symbol: Optional[str] = None, kind: Optional[str] = None, limit: int = 100) -> List[Trigger]:
+        if symbol is not None:
+            book = self._books.get(symbol.upper())
+            candidates = (book.above.triggers + book.below.triggers) if book else []
+        else:
+            candidates = self._triggers.values()
+        found = []
+        for trigger in candidates:
+            if kind is None or trigger.kind == kind:
+                found.append(trigger)
+                if len(found) >= limit:
+                    break
+        return found
+
+    def metrics(self) -> Dict:
+        ticks = self.stats["ticks"]
+        return {
+            **{k: v for k, v in self.stats.items() if k != "tick_seconds"},
+            "active": len(self._triggers),
+            "active_by_kind": {k: v for k, v in self._by_kind.items() if v},
+            "symbols": len(self._books),
+            "signal_groups": len(self._groups),
+            "avg_tick_us": round(self.stats["tick_seconds"] / ticks * 1e6, 3) if ticks else 0.0
+        }
@@ -0,0 +1,404 @@
+"""
+Upstream Access
+Shared HTTP client and a prioritized, adaptive call quota for the Alpha Vantage key.
+
+Every Alpha Vantage request takes a permit from a QuotaCoordinator first. Permits
+come from a token bucket refilled at the current rate. Interactive requests can use
+the full rate; prewarm and backfill calls also draw from their own lanes, capped at
+a share of it, so background work can never starve user-facing requests. Within a
+process, waiting lower-priority callers also yield to waiting higher-priority ones.
+
+With QUOTA_BACKEND=redis the bucket lives in Redis (updated atomically by Lua
+scripts), so every service sharing the key shares one budget. Otherwise each
+process keeps its own. Callers outside these services (the Next.js API routes) take
+their permits from the market data service's /api/v1/upstream/alpha-vantage/permit
+endpoint, so they draw from the same bucket. Throttling responses (HTTP 429, or Alpha Vantage's
+"Note"/"Information" payloads) halve the rate and pause the bucket briefly;
+successful calls raise the rate additively back towards the configured maximum.
+"""
+
+import asyncio
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+import httpx
+from fastapi import Request
+from fastapi.responses import JSONResponse
+
+from cassettes import UPSTREAM_MODE, transport_from_env
+from tracing import span
+
+ALPHA_VANTAGE_BASE_URL = "https://www.alphavantage.co/query"
+
+QUOTA_BACKEND = os.getenv("QUOTA_BACKEND", "local")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+ALPHA_VANTAGE_RATE_PER_MINUTE = float(os.getenv("ALPHA_VANTAGE_RATE_PER_MINUTE", "5"))
+ALPHA_VANTAGE_BURST = float(os.getenv("ALPHA_VANTAGE_BURST", "1"))
+ALPHA_VANTAGE_DAILY_LIMIT = int(os.getenv("ALPHA_VANTAGE_DAILY_LIMIT", "0"))  # 0 = no daily cap
+
+# Priorities, highest first
+INTERACTIVE = 0
+PREWARM = 1
+BACKFILL = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", PREWARM: "prewarm", BACKFILL: "backfill"}
+
+# Share of the rate each priority may use, and how long it waits for a permit
+DEFAULT_SHARES = {INTERACTIVE: 1.0, PREWARM: 0.5, BACKFILL: 0.25}
+DEFAULT_TIMEOUTS = {INTERACTIVE: 20.0, PREWARM: 5.0, BACKFILL: 300.0}
+
+_priority: ContextVar[int] = ContextVar("upstream_priority", default=INTERACTIVE)
+
+@contextmanager
+def priority_scope(priority: int):
+    """Upstream calls made inside the block (and tasks it spawns) use `priority`"""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+def current_priority() -> int:
+    return _priority.get()
+
+class QuotaExceeded(Exception):
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+async def quota_exceeded_handler(request: Request, exc: QuotaExceeded):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(max(1, int(exc.retry_after + 0.5)))}
+    )
+
+def _utc_day(now: float) -> str:
+    return datetime.utcfromtimestamp(now).strftime("%Y%m%d")
+
+def _seconds_to_midnight(now: float) -> float:
+    current = datetime.utcfromtimestamp(now)
+    midnight = (current + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (midnight - current).total_seconds()
+
+class LocalQuotaBackend:
+    """Token buckets in process memory"""
+
+    name = "local"
+
+    def __init__(self):
+        self._state: Dict[str, Dict] = {}
+
+    def _get(self, quota: str, now: float, base_rate: float, burst: float) -> Dict:
+        state = self._state.get(quota)
+        if state is None:
+            state = self._state[quota] = {
+                "tokens": burst, "ts": now, "rate": base_rate, "paused_until": 0.0,
+                "day": _utc_day(now), "count": 0, "lanes": {}
+            }
+        return state
+
+    async def take(self, quota, now, priority, base_rate, burst, share, daily_limit) -> float:
+        """0 when a permit was granted, seconds to wait otherwise, -1 when the daily cap is reached"""
+        state = self._get(quota, now, base_rate, burst)
+        if now < state["paused_until"]:
+            return state["paused_until"] - now
+        day = _utc_day(now)
+        if state["day"] != day:
+            state["day"], state["count"] = day, 0
+        if daily_limit and state["count"] >= daily_limit:
+            return -1.0
+
+        rate = state["rate"]
+        tokens = min(burst, state["tokens"] + (now - state["ts"]) * rate / 60)
+        state["tokens"], state["ts"] = tokens, now
+        wait = (1 - tokens) * 60 / rate if tokens < 1 else 0.0
+
+        lane = None
+        if share < 1:
+            lane_rate = rate * share
+            lane = state["lanes"].setdefault(priority, {"tokens": burst, "ts": now})
+            lane["tokens"] = min(burst, lane["tokens"] + (now - lane["ts"]) * lane_rate / 60)
+            lane["ts"] = now
+            if lane["tokens"] < 1:
+                wait = max(wait, (1 - lane["tokens"]) * 60 / lane_rate)
+
+        if wait > 0:
+            return wait
+        state["tokens"] -= 1
+        if lane is not None:
+            lane["tokens"] -= 1
+        state["count"] += 1
+        return 0.0
+
+    async def throttled(self, quota, now, base_rate, burst, min_rate, pause_seconds) -> float:
+        state = self._get(quota, now, base_rate, burst)
+        state["rate"] = max(min_rate, state["rate"] * 0.5)
+        state["tokens"] = 0.0
+        state["ts"] = now
+        state["paused_until"] = now + pause_seconds
+        return state["rate"]
+
+    async def succeeded(self, quota, now, base_rate, burst, step) -> float:
+        state = self._get(quota, now, base_rate, burst)
+        state["rate"] = min(base_rate, state["rate"] + step)
+        return state["rate"]
+
+    async def usage(self, quota: str) -> Dict:
+        state = self._state.get(quota, {})
+        return {"rate_per_minute": state.get("rate"), "calls_today": state.get("count", 0)}
+
+# KEYS: bucket hash, day counter. ARGV: now, priority, base_rate, burst, share, daily_limit
+_TAKE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local lane = 'lane' .. ARGV[2]
+local base_rate = tonumber(ARGV[3])
+local burst = tonumber(ARGV[4])
+local share = tonumber(ARGV[5])
+local daily_limit = tonumber(ARGV[6])
+local h = redis.call('HMGET', KEYS[1], 'tokens', 'ts', 'rate', 'paused_until', lane .. '_tokens', lane .. '_ts')
+local rate = tonumber(h[3]) or base_rate
+local paused = tonumber(h[4]) or 0
+if now < paused then return tostring(paused - now) end
+if daily_limit > 0 and tonumber(redis.call('GET', KEYS[2]) or '0') >= daily_limit then return '-1' end
+local tokens = math.min(burst, (tonumber(h[1]) or burst) + (now - (tonumber(h[2]) or now)) * rate / 60)
+local wait = 0
+if tokens < 1 then wait = (1 - tokens) * 60 / rate end
+local lane_tokens = burst
+if share < 1 then
+  local lane_rate = rate * share
+  lane_tokens = math.min(burst, (tonumber(h[5]) or burst) + (now - (tonumber(h[6]) or now)) * lane_rate / 60)
+  if lane_tokens < 1 then wait = math.max(wait, (1 - lane_tokens) * 60 / lane_rate) end
+end
+if wait == 0 then
+  tokens = tokens - 1
+  lane_tokens = lane_tokens - 1
+  redis.call('INCR', KEYS[2])
+  redis.call('EXPIRE', KEYS[2], 172800)
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now, 'rate', rate)
+if share < 1 then redis.call('HSET', KEYS[1], lane .. '_tokens', lane_tokens, lane .. '_ts', now) end
+return tostring(wait)
+"""
+
+# KEYS: bucket hash. ARGV: now, base_rate, min_rate, pause_seconds (throttle) or step (success), mode
+_ADJUST_SCRIPT = """
+local now = tonumber(ARGV[1])
+local base_rate = tonumber(ARGV[2])
+local rate = tonumber(redis.call('HGET', KEYS[1], 'rate') or ARGV[2])
+if ARGV[5] == 'throttle' then
+  rate = math.max(tonumber(ARGV[3]), rate * 0.5)
+  redis.call('HSET', KEYS[1], 'rate', rate, 'tokens', 0, 'ts', now, 'paused_until', now + tonumber(ARGV[4]))
+else
+  rate = math.min(base_rate, rate + tonumber(ARGV[4]))
+  redis.call('HSET', KEYS[1], 'rate', rate)
+end
+return tostring(rate)
+"""
+
+class RedisQuotaBackend:
+    """Token buckets shared by every process through Redis"""
+
+    name = "redis"
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+        self._redis = redis.from_url(url)
+        self._take = self._redis.register_script(_TAKE_SCRIPT)
+        self._adjust = self._redis.register_script(_ADJUST_SCRIPT)
+
+    @staticmethod
+    def _keys(quota: str, now: float):
+        return [f"quota:{quota}", f"quota:{quota}:day:{_utc_day(now)}"]
+
+    async def take(self, quota, now, priority, base_rate, burst, share, daily_limit) -> float:
+        result = await self._take(keys=self._keys(quota, now), args=[now, priority, base_rate, burst, share, daily_limit])
+        return float(result)
+
+    async def throttled(self, quota, now, base_rate, burst, min_rate, pause_seconds) -> float:
+        result = await self._adjust(keys=self._keys(quota, now)[:1], args=[now, base_rate, min_rate, pause_seconds, "throttle"])
+        return float(result)
+
+    async def succeeded(self, quota, now, base_rate, burst, step) -> float:
+        result = await self._adjust(keys=self._keys(quota, now)[:1], args=[now, base_rate, 0, step, "success"])
+        return float(result)
+
+    async def usage(self, quota: str) -> Dict:
+        now = time.time()
+        bucket_key, day_key = self._keys(quota, now)
+        rate = await self._redis.hget(bucket_key, "rate")
+        count = await self._redis.get(day_key)
+        return {"rate_per_minute": float(rate) if rate else None, "calls_today": int(count or 0)}
+
+    async def close(self):
+        await self._redis.close()
+
+class QuotaCoordinator:
+    """Hands out upstream call permits by priority and adapts the rate to throttling (AIMD)"""
+
+    def __init__(
+        self,
+        name: str,
+        rate_per_minute: float,
+        burst: float = 1.0,
+        daily_limit: int = 0,
+        backend: str = "local",
+        redis_url: str = REDIS_URL,
+        shares: Optional[Dict[int, float]] = None,
+        timeouts: Optional[Dict[int, float]] = None,
+        min_rate_per_minute: Optional[float] = None,
+        pause_seconds: float = 60.0,
+        increase_fraction: float = 0.05
+    ):
+        self.name = name
+        self.rate_per_minute = rate_per_minute
+        self.burst = max(1.0, burst)
+        self.daily_limit = daily_limit
+        self.shares = shares or dict(DEFAULT_SHARES)
+        self.timeouts = timeouts or dict(DEFAULT_TIMEOUTS)
+        self.min_rate = min_rate_per_minute or rate_per_minute / 16
+        self.pause_seconds = pause_seconds
+        self.step = rate_per_minute * increase_fraction
+        self._backend_name = backend
+        self._redis_url = redis_url
+        self._backend = None
+        self._waiting = {p: 0 for p in PRIORITY_NAMES}
+        self.stats = {"granted": {n: 0 for n in PRIORITY_NAMES.values()}, "rejected": 0, "throttled": 0, "waited_seconds": 0.0}
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = LocalQuotaBackend()
+            if self._backend_name == "redis":
+                try:
+                    self._backend = RedisQuotaBackend(self._redis_url)
+                except ImportError as e:
+                    print(f"[Quota] Redis backend unavailable ({e}), using local quota")
+        return self._backend
+
+    async def _call(self, method: str, *args):
+        """Run a backend operation, dropping to the local backend if Redis fails"""
+        try:
+            return await getattr(self.backend, method)(self.name, *args)
+        except Exception as e:
+            if isinstance(self._backend, LocalQuotaBackend):
+                raise
+            print(f"[Quota] {self._backend.name} backend failed ({e}), falling back to local quota")
+            self._backend = LocalQuotaBackend()
+            return await getattr(self._backend, method)(self.name, *args)
+
+    async def acquire(self, priority: Optional[int] = None, timeout: Optional[float] = None):
+        """Wait for a permit; raises QuotaExceeded on timeout or when the daily cap is used up"""
+        priority = current_priority() if priority is None else priority
+        timeout = self.timeouts.get(priority, 30.0) if timeout is None else timeout
+        started = time.time()
+        deadline = started + timeout
+        self._waiting[priority] += 1
+        try:
+            while True:
+                now = time.time()
+                if any(self._waiting[p] for p in PRIORITY_NAMES if p < priority):
+                    wait = 0.25  # let higher-priority callers in this process go first
+                else:
+                    wait = await self._call(
+                        "take", now, priority, self.rate_per_minute, self.burst,
+                        self.shares.get(priority, 1.0), self.daily_limit
+                    )
+                if wait == 0:
+                    self.stats["granted"][PRIORITY_NAMES[priority]] += 1
+                    self.stats["waited_seconds"] += now - started
+                    return
+                if wait < 0:
+                    self.stats["rejected"] += 1
+                    raise QuotaExceeded(f"{self.name} daily call limit reached", _seconds_to_midnight(now))
+                if now + wait > deadline:
+                    self.stats["rejected"] += 1
+                    raise QuotaExceeded(f"{self.name} call quota exhausted, retry later", wait)
+                await asyncio.sleep(min(wait, 1.0))
+        finally:
+            self._waiting[priority] -= 1
+
+    async def record_throttle(self):
+        self.stats["throttled"] += 1
+        rate = await self._call("throttled", time.time(), self.rate_per_minute, self.burst, self.min_rate, self.pause_seconds)
+        print(f"[Quota] {self.name} throttled upstream; rate lowered to {rate:.2f}/min, pausing {self.pause_seconds:.0f}s")
+
+    async def record_success(self):
+        await self._call("succeeded", time.time(), self.rate_per_minute, self.burst, self.step)
+
+    async def metrics(self) -> Dict:
+        try:
+            usage = await self.backend.usage(self.name)
+        except Exception as e:
+            usage = {"error": str(e)}
+        return {
+            **self.stats,
+            **usage,
+            "backend": self.backend.name,
+            "max_rate_per_minute": self.rate_per_minute,
+            "daily_limit": self.daily_limit or None,
+            "waiting": {PRIORITY_NAMES[p]: n for p, n in self._waiting.items()}
+        }
+
+alpha_vantage_quota = QuotaCoordinator(
+    "alpha_vantage",
+    ALPHA_VANTAGE_RATE_PER_MINUTE,
+    burst=ALPHA_VANTAGE_BURST,
+    daily_limit=ALPHA_VANTAGE_DAILY_LIMIT,
+    backend=QUOTA_BACKEND
+)
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """Process-wide client so upstream calls reuse pooled keep-alive connections"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        limits = httpx.Limits(max_connections=50, max_keepalive_connections=20)
+        _http_client = httpx.AsyncClient(limits=limits, transport=transport_from_env(limits=limits))
+    return _http_client
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+def transport_metrics() -> Dict:
+    transport = _http_client._transport if _http_client is not None else None
+    if hasattr(transport, "metrics"):
+        return transport.metrics()
+    return {"mode": UPSTREAM_MODE}
+
+def is_throttled(response: httpx.Response) -> bool:
+    if response.status_code == 429:
+        return True
+    if response.status_code != 200:
+        return False
+    try:
+        data = response.json()
+    except ValueError:
+        return False
+    return isinstance(data, dict) and ("Note" in data or "Information" in data)
+
+async def alpha_vantage_get(params: Dict, timeout: float = 30.0, priority: Optional[int] = None) -> httpx.Response:
+    """GET the Alpha Vantage query endpoint under the shared quota (not applied when replaying cassettes)"""
+    with span(
+        "upstream.alpha_vantage",
+        kind="client",
+        **{"av.function": params.get("function"), "av.symbol": params.get("symbol") or params.get("tickers")}
+    ) as current:
+        if UPSTREAM_MODE != "replay":
+            with span("upstream.quota_wait"):
+                await alpha_vantage_quota.acquire(priority)
+        response = await get_http_client().get(ALPHA_VANTAGE_BASE_URL, params=params, timeout=timeout)
+        throttled = is_throttled(response)
+        current.set_attributes({"http.status_code": response.status_code, "av.throttled": throttled})
+        if throttled:
+            await alpha_vantage_quota.record_throttle()
+        else:
+            await alpha_vantage_quota.record_success()
+        return response
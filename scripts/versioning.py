@@ -0,0 +1,119 @@
+"""
+Response Versioning
+Per-symbol change versions behind the ETag and delta modes of polled endpoints.
+
+Every value a polled endpoint returns is passed through observe(). A value
+whose content (ignoring volatile fields such as its fetch timestamp) differs
+from the last one seen for its key gets a new version. Versions come from one
+counter per tracker, seeded from the wall clock in milliseconds, so they only
+grow, also across restarts. A response's version is the highest version among
+its keys. Its weak ETag combines that version with a hash of the key set, so
+a client re-polling an unchanged watchlist gets a 304 without the body being
+serialized. In delta mode the client sends the version it last saw and gets
+only the keys that changed after it. A version the tracker cannot answer for
+(newer than anything it issued, or older than an evicted key) gets the full
+set, flagged with "full": true.
+"""
+
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from fastapi.responses import Response
+
+def model_fingerprint(exclude: Iterable[str] = ("timestamp",)) -> Callable[[Any], Any]:
+    """Fingerprint for pydantic models: their fields minus the volatile ones"""
+    excluded = set(exclude)
+    return lambda value: value.model_dump(exclude=excluded)
+
+class VersionTracker:
+    def __init__(self, fingerprint: Callable[[Any], Any] = model_fingerprint(), max_keys: int = 10000):
+        self.fingerprint = fingerprint
+        self.max_keys = max_keys
+        self._version = int(time.time() * 1000)
+        self._floor = self._version  # versions at or below this may have been forgotten
+        # key -> (version, fingerprint, last value seen), least recently changed first
+        self._entries: "OrderedDict[Hashable, Tuple[int, Any, Any]]" = OrderedDict()
+        self.stats = {"observed": 0, "changes": 0, "evicted": 0, "not_modified": 0, "deltas": 0, "full_resyncs": 0}
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def observe(self, key: Hashable, value: Any) -> int:
+        """Record the value now served for key; returns the key's version"""
+        self.stats["observed"] += 1
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[2] is value:
+                return entry[0]
+            fingerprint = self.fingerprint(value)
+            if entry[1] == fingerprint:
+                self._entries[key] = (entry[0], fingerprint, value)
+                return entry[0]
+        else:
+            fingerprint = self.fingerprint(value)
+        self._version = max(self._version + 1, int(time.time() * 1000))
+        self._entries[key] = (self._version, fingerprint, value)
+        self._entries.move_to_end(key)
+        self.stats["changes"] += 1
+        while len(self._entries) > self.max_keys:
+            _, (evicted_version, _, _) = self._entries.popitem(last=False)
+            self._floor = max(self._floor, evicted_version)
+            self.stats["evicted"] += 1
+        return self._version
+
+    def observe_all(self, items: List[Tuple[Hashable, Any]]) -> List[int]:
+        return [self.observe(key, value) for key, value in items]
+
+    def etag(self, keys: Iterable[Hashable], version: int) -> str:
+        key_hash = zlib.crc32(",".join(sorted(str(k) for k in keys)).encode())
+        return f'W/"{version:x}-{key_hash:08x}"'
+
+    def can_delta(self, since: int) -> bool:
+        return self._floor <= since <= self._version
+
+    def respond(
+        self,
+        items: List[Tuple[Hashable, Any]],
+        response: Response,
+        if_none_match: Optional[str] = None,
+        since: Optional[int] = None
+    ) -> Tuple[Optional[Response], List[Any], Dict]:
+        """
+        Version the served items and set ETag headers on `response`. Returns
+        (304 response or None, items to send, version fields for the body).
+        """
+        versions = self.observe_all(items)
+        version = max(versions, default=0)
+        etag = self.etag((key for key, _ in items), version)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if if_none_match and etag_matches(if_none_match, etag):
+            self.stats["not_modified"] += 1
+            return Response(status_code=304, headers=headers), [], {}
+        response.headers.update(headers)
+        if since is None:
+            return None, [value for _, value in items], {"version": version}
+        if not self.can_delta(since):
+            self.stats["full_resyncs"] += 1
+            return None, [value for _, value in items], {"version": version, "since": since, "full": True}
+        self.stats["deltas"] += 1
+        changed = [value for (_, value), v in zip(items, versions) if v > since]
+        return None, changed, {"version": version, "since": since, "full": False}
+
+    def metrics(self) -> Dict:
+        return {**self.stats, "keys": len(self._entries), "version": self._version}
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison against an If-None-Match header (list or *)"""
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == bare:
+            return True
+    return False